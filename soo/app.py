@@ -1,14 +1,15 @@
 import streamlit as st
 import pandas as pd
 import os
-from openai import OpenAI
-from langchain_openai import ChatOpenAI
-from langchain.chains import ConversationChain
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import PromptTemplate
 from dotenv import load_dotenv
 import time
 import json
+import sys
+from pathlib import Path
+
+# 컬럼형 카탈로그 로더(ingrevia/catalog.py) 공유
+sys.path.append(str(Path(__file__).parent / "ingrevia"))
+from catalog import load_catalog
 
 # --- ⚙️ 환경 설정 ---
 load_dotenv()
@@ -18,13 +19,15 @@ if api_key is None:
     st.error("❌ .env 파일에서 OPENAI_API_KEY를 찾을 수 없습니다.")
     st.stop()
 
-# OpenAI 클라이언트 설정
-client = OpenAI(api_key=api_key)
-
-# LangChain 설정
+# LangChain 설정 (무거운 import/클라이언트 생성은 첫 호출 때 한 번만)
 @st.cache_resource
 def init_langchain():
-    llm = ChatOpenAI(model_name="gpt-4o", temperature=0.7, openai_api_key=api_key)
+    from http_client import get_chat_model
+    from langchain.chains import ConversationChain
+    from langchain.memory import ConversationBufferMemory
+    from langchain.prompts import PromptTemplate
+
+    llm = get_chat_model("gpt-4o", 0.7, api_key)  # 공유 연결 풀(ingrevia/http_client.py)
     memory = ConversationBufferMemory(memory_key="history", return_messages=True)
     
     template = """당신은 친절하고 전문적인 화장품 추천 전문가 'INGREVIA'입니다.
@@ -217,7 +220,8 @@ def load_product_data():
     # CSV 파일이 있으면 로드, 없으면 샘플 데이터 사용
     if os.path.exists(csv_path):
         try:
-            df = pd.read_csv(csv_path)
+            # 컬럼형 바이너리 카탈로그 우선, 오래됐으면 CSV로 자동 폴백
+            df = load_catalog(csv_path).to_frame().drop(columns=['카테고리_norm'])
             # 데이터 정보 출력 (디버깅용)
             print(f"✅ 제품 데이터 로드 완료: {len(df)}개 제품")
             print(f"카테고리 종류: {df['카테고리'].unique()}")
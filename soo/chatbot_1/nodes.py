@@ -1,16 +1,19 @@
 import re
 import json
+import sys
+from pathlib import Path
 from typing import Dict, Any, List
 
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage, AIMessage
 
 from utils import find_and_rank_products
-from langchain_community.tools.tavily_search import TavilySearchResults
+
+# 공유 연결 풀(ingrevia/http_client.py) — LLM·웹검색이 keep-alive 연결을 함께 사용
+sys.path.append(str(Path(__file__).parent.parent / "ingrevia"))
+from http_client import get_chat_model, web_search
 
 # ===== 모델 & 웹검색 =====
-llm = ChatOpenAI(model_name="gpt-4o", temperature=0)
-search = TavilySearchResults(k=3)
+llm = get_chat_model("gpt-4o", 0.0)
 
 # ===== 동의어/정규화 =====
 SKIN_TYPES = {"지성", "건성", "복합성", "민감성", "아토피성"}
@@ -255,12 +258,12 @@ PREFERRED_SITES = ["hwahae.co.kr"]
 def search_prefer(query: str):
     for site in PREFERRED_SITES:
         try:
-            r = search.run(f"site:{site} {query}")
+            r = web_search(f"site:{site} {query}")
             if (isinstance(r, str) and r.strip()) or (isinstance(r, list) and len(r) > 0):
                 return r
         except Exception:
             pass
-    return search.run(query)
+    return web_search(query)
 
 # ===== 웹 요약 유틸 =====
 def fetch_warnings_for_ingredients(ingredients: List[str], efficacy_ings: List[str] = None) -> str:
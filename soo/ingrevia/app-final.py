@@ -1,12 +1,14 @@
 import streamlit as st
 import pandas as pd
 import os
-from openai import OpenAI
 from dotenv import load_dotenv
 import json
 from typing import List, Dict, Any
 import time
 
+from catalog import load_catalog
+from ingredient_canon import load_canon
+
 # --- 1. 기본 설정 및 API/데이터 로딩 ---
 
 st.set_page_config(
@@ -28,7 +30,11 @@ else:
         st.error("OpenAI API 키가 설정되지 않았습니다. .env 파일을 확인하거나 Streamlit Secrets를 설정해주세요.")
         st.stop()
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+# OpenAI 클라이언트는 재실행(rerun)마다 새로 만들지 않고 프로세스당 한 번만 생성 (공유 연결 풀 사용)
+@st.cache_resource
+def get_client():
+    from http_client import get_openai_client
+    return get_openai_client(OPENAI_API_KEY)
 
 # 업그레이드된 브랜드 색상 정의
 COLORS = {
@@ -45,7 +51,8 @@ COLORS = {
 @st.cache_data
 def load_data(filepath):
     try:
-        df = pd.read_csv(filepath)
+        # 컬럼형 바이너리 카탈로그 우선, 오래됐으면 CSV로 자동 폴백
+        df = load_catalog(filepath).to_frame().drop(columns=['카테고리_norm'])
         df['효능'] = df['효능'].fillna('')
         df['가격'] = pd.to_numeric(df['가격'], errors='coerce').fillna(0)
         df['유해성_점수'] = pd.to_numeric(df['유해성_점수'], errors='coerce').fillna(0)
@@ -87,7 +94,7 @@ def analyze_ingredients_with_search(product_name: str, skin_type: str, skin_conc
         주의: 모든 내용을 반드시 한국어로만 작성하세요. 영어 단어나 설명은 절대 포함하지 마세요.
         """
         
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             model="gpt-4o", messages=[{"role": "user", "content": analysis_prompt}],
             response_format={"type": "json_object"}, temperature=0.1
         )
@@ -456,6 +463,14 @@ def load_css():
     </style>
     """, unsafe_allow_html=True)
 
+def badge_ingredients(rec: Dict[str, Any]):
+    """배지용 성분 목록: 표기(INCI/염/농도)를 정규명으로 통일해 중복 제거, 효능 성분과 겹치는 주의 성분은 제외."""
+    canon = load_canon('product_data.csv')
+    beneficial = canon.dedupe_names(rec.get("beneficial_ingredients", []))
+    beneficial_keys = {canon.key(b) for b in beneficial}
+    caution = [c for c in canon.dedupe_names(rec.get("caution_ingredients", [])) if canon.key(c) not in beneficial_keys]
+    return beneficial, caution
+
 def render_product_card(rec: Dict[str, Any], rank: int, title: str = None):
     # --- 제목 설정 ---
     if title:
@@ -467,10 +482,10 @@ def render_product_card(rec: Dict[str, Any], rank: int, title: str = None):
         rank_emoji = {1: "🥇", 2: "🥈", 3: "🥉"}.get(rank, "🏅")
         header_html = f'<h2 style="margin-bottom: 0.8rem; color: {COLORS['primary']}; font-weight: 600;">{rank_emoji} TOP {rank}</h2>'
     
-    beneficial_html = "".join([f'<a href="https://www.google.com/search?q={ing.strip()}" target="_blank" style="text-decoration: none; margin: 4px;"><span class="ingredient-badge beneficial-badge">{ing.strip()}</span></a>' for ing in rec.get("beneficial_ingredients", [])])
+    beneficial_ingredients, caution_ingredients = badge_ingredients(rec)
+    beneficial_html = "".join([f'<a href="https://www.google.com/search?q={ing.strip()}" target="_blank" style="text-decoration: none; margin: 4px;"><span class="ingredient-badge beneficial-badge">{ing.strip()}</span></a>' for ing in beneficial_ingredients])
     if not beneficial_html: beneficial_html = "<p>핵심 효능 성분을 분석 중입니다.</p>"
 
-    caution_ingredients = rec.get("caution_ingredients", [])
     if caution_ingredients:
         caution_html = "".join([f'<a href="https://www.google.com/search?q={ing.strip()}" target="_blank" style="text-decoration: none; margin: 4px;"><span class="ingredient-badge caution-badge">{ing.strip()}</span></a>' for ing in caution_ingredients])
     else:
@@ -546,7 +561,7 @@ def handle_chat_input(prompt: str):
         - product_categories: ['스킨/토너', '로션/에멀전', '에센스/앰플/세럼', '크림', '선크림/로션', '클렌징 폼'] 중 여러 개 가능. 없으면 null
         사용자 입력: "{prompt}"
         """
-        response = client.chat.completions.create(
+        response = get_client().chat.completions.create(
             model="gpt-4o", messages=[{"role": "user", "content": parser_prompt}],
             response_format={"type": "json_object"}
         )
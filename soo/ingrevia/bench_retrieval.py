@@ -0,0 +1,76 @@
+# bench_retrieval.py
+"""
+임베딩 저장 정밀도별(float32 / float16 / int8) 메모리·지연·recall@k 비교.
+
+- 기준: float32 정확 검색 결과
+- 질의: 저장된 제품 벡터에 잡음을 섞어 만든 근사 질의 (모델 없이 재현 가능)
+- --synthetic N 을 주면 N×dim 합성 벡터로 대규모 카탈로그를 흉내냄
+
+사용 예:
+    python bench_retrieval.py                    # product_data.embeddings 사용
+    python bench_retrieval.py --synthetic 200000 -k 10
+"""
+import time
+import json
+import tempfile
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+from retrieval import DATA_PATH, EmbeddingIndex, index_dir_for, write_compressed
+
+
+def _synthetic(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(n // 50, 1), dim)).astype(np.float32)
+    vecs = centers[rng.integers(0, len(centers), n)] + 0.5 * rng.normal(size=(n, dim)).astype(np.float32)
+    return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+def _queries(vecs: np.ndarray, n: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    base = vecs[rng.integers(0, len(vecs), n)]
+    q = base + 0.3 * rng.normal(size=base.shape).astype(np.float32)
+    return (q / np.linalg.norm(q, axis=1, keepdims=True)).astype(np.float32)
+
+def run(vecs: np.ndarray, k: int, n_queries: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp)
+        np.save(out / "vectors.npy", vecs)
+        write_compressed(out, vecs)
+        (out / "meta.json").write_text(json.dumps({"rows": len(vecs)}), encoding="utf-8")
+
+        queries = _queries(vecs, n_queries)
+        exact = EmbeddingIndex.open(out, dtype="float32")
+        truth = [{i for i, _ in exact.search(q, k)} for q in queries]
+
+        print(f"N={len(vecs)}, dim={vecs.shape[1]}, k={k}, queries={n_queries}")
+        print(f"{'store':<18}{'resident MB':>12}{'recall@k':>10}{'ms/query':>10}")
+        for dtype, rescore in [("float32", False), ("float16", False), ("float16", True),
+                               ("int8", False), ("int8", True)]:
+            index = EmbeddingIndex.open(out, dtype=dtype)
+            t0 = time.perf_counter()
+            results = [index.search(q, k, rescore=rescore) for q in queries]
+            ms = (time.perf_counter() - t0) * 1000 / n_queries
+            recall = np.mean([len({i for i, _ in r} & t) / max(len(t), 1) for r, t in zip(results, truth)])
+            label = dtype + (" +rescore" if rescore else "")
+            print(f"{label:<18}{index.resident_bytes / 2**20:>12.2f}{recall:>10.4f}{ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="임베딩 저장 정밀도별 recall@k 벤치마크")
+    parser.add_argument("--csv", default=str(DATA_PATH))
+    parser.add_argument("--synthetic", type=int, default=0, help="합성 벡터 개수(0이면 저장된 인덱스 사용)")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        vecs = _synthetic(args.synthetic, args.dim)
+    else:
+        path = index_dir_for(args.csv) / "vectors.npy"
+        if not path.exists():
+            raise SystemExit(f"❌ {path} 가 없습니다. 먼저 `python retrieval.py`로 임베딩을 빌드하거나 --synthetic 을 사용하세요.")
+        vecs = np.load(path).astype(np.float32)
+    run(vecs, args.k, args.queries)
@@ -0,0 +1,67 @@
+# bench_startup.py
+"""
+콜드 스타트(새 프로세스에서 모듈 import) 시간 측정.
+
+- 모듈마다 새 파이썬 프로세스를 N번 띄워 import 소요 시간의 중앙값/최소값을 출력
+- --first-call 을 주면 import 직후 LLM 클라이언트 생성(get_llm)까지의 시간도 함께 측정
+- 지연 import 전후 비교용: `git stash` 전후로 같은 명령을 실행
+
+사용 예:
+    python bench_startup.py                       # main, nodes
+    python bench_startup.py -n 10 --module utils --module retrieval
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+HERE = Path(__file__).parent
+
+_SNIPPET = """
+import time, json
+t0 = time.perf_counter()
+import {module}
+t1 = time.perf_counter()
+first = None
+if {first_call}:
+    import nodes
+    nodes.get_llm()
+    first = time.perf_counter() - t1
+print(json.dumps({{"import": t1 - t0, "first_call": first}}))
+"""
+
+
+def measure(module: str, runs: int, first_call: bool = False) -> dict:
+    env = {**os.environ, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-bench")}
+    imports, firsts = [], []
+    for _ in range(runs):
+        code = _SNIPPET.format(module=module, first_call=first_call)
+        out = subprocess.run([sys.executable, "-c", code], cwd=HERE, env=env,
+                             capture_output=True, text=True, check=True)
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        imports.append(r["import"] * 1000)
+        if r["first_call"] is not None:
+            firsts.append(r["first_call"] * 1000)
+    return {
+        "module": module,
+        "median_ms": statistics.median(imports),
+        "min_ms": min(imports),
+        "first_call_ms": statistics.median(firsts) if firsts else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="모듈 import(콜드 스타트) 시간 벤치마크")
+    parser.add_argument("--module", action="append", default=None)
+    parser.add_argument("-n", "--runs", type=int, default=5)
+    parser.add_argument("--first-call", action="store_true", help="get_llm() 첫 호출 시간도 측정")
+    args = parser.parse_args()
+
+    print(f"{'module':<12}{'median ms':>12}{'min ms':>10}{'first call ms':>16}")
+    for m in args.module or ["main", "nodes"]:
+        r = measure(m, args.runs, args.first_call)
+        first = f"{r['first_call_ms']:.1f}" if r["first_call_ms"] is not None else "-"
+        print(f"{m:<12}{r['median_ms']:>12.1f}{r['min_ms']:>10.1f}{first:>16}")
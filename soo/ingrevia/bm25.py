@@ -0,0 +1,70 @@
+# bm25.py
+"""
+제품 문서용 인메모리 BM25(Okapi) 색인.
+
+- 토큰: 소문자 단어 + 한글 단어의 문자 bigram (복합 성분명 부분 일치용)
+- 색인: 토큰 → (문서 번호 배열, 빈도 배열) 포스팅 리스트
+- '나이아신아마이드'처럼 정확한 성분명이 들어간 질의는 밀집 벡터보다 BM25가 강함
+"""
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+_SPLIT = re.compile(r"[^0-9a-z가-힣]+")
+_HANGUL = re.compile(r"^[가-힣]+$")
+
+
+def tokenize(text: str) -> List[str]:
+    words = [w for w in _SPLIT.split(str(text or "").lower()) if w]
+    tokens = list(words)
+    for w in words:
+        if len(w) > 2 and _HANGUL.match(w):
+            tokens.extend(w[i:i + 2] for i in range(len(w) - 1))
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, docs: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1, self.b = k1, b
+        self.n_docs = len(docs)
+        postings: Dict[str, Dict[int, int]] = {}
+        lengths = np.zeros(self.n_docs, dtype=np.float32)
+        for d, doc in enumerate(docs):
+            toks = tokenize(doc)
+            lengths[d] = len(toks)
+            for t in toks:
+                row = postings.setdefault(t, {})
+                row[d] = row.get(d, 0) + 1
+        self.doc_len = lengths
+        self.avgdl = float(lengths.mean()) if self.n_docs else 0.0
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray, float]] = {}
+        for t, row in postings.items():
+            ids = np.fromiter(row.keys(), dtype=np.int32, count=len(row))
+            tfs = np.fromiter(row.values(), dtype=np.float32, count=len(row))
+            df = len(row)
+            idf = float(np.log(1.0 + (self.n_docs - df + 0.5) / (df + 0.5)))
+            self.postings[t] = (ids, tfs, idf)
+
+    def scores(self, query: str) -> np.ndarray:
+        out = np.zeros(self.n_docs, dtype=np.float32)
+        if not self.n_docs:
+            return out
+        for t in dict.fromkeys(tokenize(query)):
+            hit = self.postings.get(t)
+            if hit is None:
+                continue
+            ids, tfs, idf = hit
+            norm = self.k1 * (1 - self.b + self.b * self.doc_len[ids] / self.avgdl)
+            out[ids] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+        return out
+
+    def search(self, query: str, k: int = 10, mask: np.ndarray = None) -> List[Tuple[int, float]]:
+        s = self.scores(query)
+        if mask is not None:
+            s = np.where(mask, s, 0.0)
+        cand = np.flatnonzero(s > 0)
+        if cand.size == 0:
+            return []
+        top = cand[np.argsort(-s[cand], kind="stable")[:k]]
+        return [(int(i), float(s[i])) for i in top]
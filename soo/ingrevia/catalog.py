@@ -0,0 +1,271 @@
+# catalog.py
+"""
+제품 카탈로그를 컬럼형 바이너리(NumPy 배열 + 문자열 테이블)로 컴파일/로딩합니다.
+
+- 빌드: CSV → `<csv이름>.catalog/` 디렉터리 (전성분은 미리 분리해 성분 id 리스트(CSR)로 저장,
+  카테고리는 정규화 코드, 가격/유해성_점수는 숫자 컬럼)
+- 로딩: np.load(mmap_mode="r")로 메모리 매핑 → 시작 시 CSV 파싱 없음
+- 바이너리가 없거나 원본 CSV보다 오래됐으면(stale) 자동으로 CSV를 직접 읽어 같은 구조로 구성
+
+사용 예:
+    python catalog.py product_data.csv     # 바이너리 빌드
+"""
+import json
+import hashlib
+import argparse
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:  # pandas는 DataFrame이 실제로 필요할 때만 import (바이너리 로딩 경로엔 불필요)
+    import pandas as pd
+
+from ingredient_vocab import IngredientVocab, IngredientMatrix
+
+FORMAT_VERSION = 2
+
+# CSV 텍스트 컬럼 ↔ 바이너리 파일 키
+TEXT_COLUMNS = {
+    "제품명": "name",
+    "브랜드명": "brand",
+    "카테고리": "category_raw",
+    "효능": "efficacy",
+    "용량": "volume",
+    "링크": "link",
+}
+
+
+# =========================
+# 문자열 테이블
+# =========================
+class StringTable:
+    """UTF-8 바이트 덩어리 + 오프셋 배열. i번째 문자열은 blob[off[i]:off[i+1]]."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings: List[str]) -> "StringTable":
+        encoded = [s.encode("utf-8") for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+        blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(blob, offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def tolist(self) -> List[str]:
+        return [self[i] for i in range(len(self))]
+
+
+def _file_stat(path: Path) -> Tuple[int, int]:
+    st = Path(path).stat()
+    return st.st_size, st.st_mtime_ns
+
+def _file_sha1(path: Path) -> str:
+    return hashlib.sha1(Path(path).read_bytes()).hexdigest()
+
+def binary_dir_for(csv_path) -> Path:
+    p = Path(csv_path)
+    return p.with_name(p.stem + ".catalog")
+
+
+# =========================
+# 카탈로그
+# =========================
+class Catalog:
+    """
+    컬럼형 제품 카탈로그. 행 i = 제품 i (CSV 행 순서와 동일).
+    - category: 정규화 카테고리 코드(uint8) → categories[code]
+    - price / harm: float64 (결측은 NaN)
+    - ing_offsets / ing_ids: 제품별 성분 id 리스트(CSR). id는 전역 성분 사전(vocab) 기준
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], strings: StringTable,
+                 categories: List[str], version: str):
+        self.arrays = arrays
+        self.strings = strings
+        self.categories = categories
+        self.version = version
+        self.category = arrays["category"]
+        self.price = arrays["price"]
+        self.harm = arrays["harm"]
+        self.ing_offsets = arrays["ing_offsets"]
+        self.ing_ids = arrays["ing_ids"]
+        self.vocab = IngredientVocab.from_lists(
+            [strings[int(s)] for s in arrays["ing_vocab"]],
+            [strings[int(s)] for s in arrays["ing_inci"]],
+        )
+        self.matrix = IngredientMatrix(self.ing_ids, self.ing_offsets)
+        self._frame: Optional["pd.DataFrame"] = None
+
+    def __len__(self) -> int:
+        return int(self.category.shape[0])
+
+    def text(self, key: str, i: int) -> str:
+        return self.strings[int(self.arrays[key][i])]
+
+    def ingredient_ids(self, i: int) -> np.ndarray:
+        return self.ing_ids[self.ing_offsets[i]:self.ing_offsets[i + 1]]
+
+    def ingredients(self, i: int) -> List[str]:
+        return [self.vocab.names[int(x)] for x in self.ingredient_ids(i)]
+
+    def to_frame(self) -> "pd.DataFrame":
+        """CSV와 같은 컬럼 구성의 DataFrame(+카테고리_norm). 캐시된 객체이므로 수정하지 말 것."""
+        if self._frame is None:
+            import pandas as pd
+            n = len(self)
+            data: Dict[str, Any] = {col: [self.text(key, i) for i in range(n)]
+                                    for col, key in TEXT_COLUMNS.items()}
+            data["전성분"] = [";".join(self.ingredients(i)) for i in range(n)]
+            price = np.asarray(self.price)
+            data["가격"] = price.astype(np.int64) if np.isfinite(price).all() else price.copy()
+            data["유해성_점수"] = np.asarray(self.harm).copy()
+            data["카테고리_norm"] = [self.categories[int(c)] for c in self.category]
+            cols = ["제품명", "브랜드명", "카테고리", "효능", "전성분", "가격", "용량", "링크", "유해성_점수", "카테고리_norm"]
+            self._frame = pd.DataFrame(data)[cols]
+        return self._frame
+
+    # ---- 빌드 ----
+    @classmethod
+    def from_frame(cls, df: "pd.DataFrame", version: str = "") -> "Catalog":
+        import pandas as pd
+        from utils import _normalize_category
+
+        df = df.fillna("")
+        strings: List[str] = []
+        sid: Dict[str, int] = {}
+
+        def intern(s: str) -> int:
+            if s not in sid:
+                sid[s] = len(strings)
+                strings.append(s)
+            return sid[s]
+
+        arrays: Dict[str, np.ndarray] = {}
+        for col, key in TEXT_COLUMNS.items():
+            values = df[col].astype(str).tolist() if col in df.columns else [""] * len(df)
+            arrays[key] = np.array([intern(v) for v in values], dtype=np.int32)
+
+        norm = df["카테고리"].astype(str).map(_normalize_category).tolist() if "카테고리" in df.columns else []
+        categories = sorted(set(norm))
+        arrays["category"] = np.array([categories.index(c) for c in norm], dtype=np.uint8)
+
+        arrays["price"] = pd.to_numeric(df.get("가격"), errors="coerce").to_numpy(dtype=np.float64)
+        arrays["harm"] = pd.to_numeric(df.get("유해성_점수"), errors="coerce").to_numpy(dtype=np.float64)
+
+        # 전역 성분 사전(ICNI 매핑 + 카탈로그 전용 성분)으로 전성분을 정수 id로 인코딩
+        vocab = IngredientVocab.from_icni()
+        ids: List[int] = []
+        offsets = [0]
+        for ings in df["전성분"].astype(str).tolist():
+            for ing in (x.strip() for x in ings.split(";")):
+                if ing:
+                    ids.append(vocab.add(ing))
+            offsets.append(len(ids))
+        id_dtype = np.uint16 if len(vocab) < 2 ** 16 else np.uint32
+        arrays["ing_ids"] = np.array(ids, dtype=id_dtype)
+        arrays["ing_offsets"] = np.array(offsets, dtype=np.int64)
+        arrays["ing_vocab"] = np.array([intern(v) for v in vocab.names], dtype=np.int32)
+        arrays["ing_inci"] = np.array([intern(v) for v in vocab.inci], dtype=np.int32)
+
+        return cls(arrays, StringTable.from_strings(strings), categories, version)
+
+    @classmethod
+    def from_csv(cls, csv_path) -> "Catalog":
+        import pandas as pd
+        return cls.from_frame(pd.read_csv(csv_path), version=_file_sha1(csv_path)[:12])
+
+    def save(self, out_dir: Path, source: Path) -> None:
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for key, arr in self.arrays.items():
+            np.save(out_dir / f"{key}.npy", arr)
+        np.save(out_dir / "strings.blob.npy", self.strings.blob)
+        np.save(out_dir / "strings.offsets.npy", self.strings.offsets)
+        size, mtime_ns = _file_stat(source)
+        manifest = {
+            "format": FORMAT_VERSION,
+            "source": Path(source).name,
+            "source_size": size,
+            "source_mtime_ns": mtime_ns,
+            "source_sha1": _file_sha1(source),
+            "rows": len(self),
+            "categories": self.categories,
+            "columns": sorted(self.arrays),
+        }
+        (out_dir / "manifest.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    @classmethod
+    def open(cls, bin_dir: Path) -> "Catalog":
+        bin_dir = Path(bin_dir)
+        manifest = json.loads((bin_dir / "manifest.json").read_text(encoding="utf-8"))
+        arrays = {key: np.load(bin_dir / f"{key}.npy", mmap_mode="r") for key in manifest["columns"]}
+        strings = StringTable(
+            np.load(bin_dir / "strings.blob.npy", mmap_mode="r"),
+            np.load(bin_dir / "strings.offsets.npy", mmap_mode="r"),
+        )
+        return cls(arrays, strings, manifest["categories"], manifest["source_sha1"][:12])
+
+
+def is_stale(csv_path, bin_dir: Optional[Path] = None) -> bool:
+    """바이너리가 없거나 포맷/원본 CSV가 바뀌었으면 True. (mtime만 바뀐 경우 해시로 재확인)"""
+    bin_dir = Path(bin_dir) if bin_dir else binary_dir_for(csv_path)
+    mf = bin_dir / "manifest.json"
+    if not mf.exists():
+        return True
+    try:
+        manifest = json.loads(mf.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return True
+    if manifest.get("format") != FORMAT_VERSION:
+        return True
+    size, mtime_ns = _file_stat(csv_path)
+    if size != manifest.get("source_size"):
+        return True
+    if mtime_ns == manifest.get("source_mtime_ns"):
+        return False
+    return _file_sha1(csv_path) != manifest.get("source_sha1")
+
+def build_catalog(csv_path, bin_dir: Optional[Path] = None) -> Path:
+    """CSV를 컬럼형 바이너리로 컴파일."""
+    bin_dir = Path(bin_dir) if bin_dir else binary_dir_for(csv_path)
+    Catalog.from_csv(csv_path).save(bin_dir, Path(csv_path))
+    return bin_dir
+
+
+# 프로세스 단위 메모이즈: 경로 → ((크기, mtime), 카탈로그)
+_CACHE: Dict[str, Tuple[Tuple[int, int], Catalog]] = {}
+
+def load_catalog(csv_path) -> Catalog:
+    """
+    최신 바이너리가 있으면 메모리 매핑으로 열고, 없거나 stale이면 CSV에서 직접 구성.
+    원본 CSV가 없으면 FileNotFoundError.
+    """
+    csv_path = Path(csv_path)
+    key, stat = str(csv_path.resolve()), _file_stat(csv_path)
+    hit = _CACHE.get(key)
+    if hit and hit[0] == stat:
+        return hit[1]
+    bin_dir = binary_dir_for(csv_path)
+    try:
+        cat = Catalog.open(bin_dir) if not is_stale(csv_path, bin_dir) else Catalog.from_csv(csv_path)
+    except (OSError, ValueError, KeyError):
+        cat = Catalog.from_csv(csv_path)
+    _CACHE[key] = (stat, cat)
+    return cat
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="제품 CSV를 컬럼형 바이너리 카탈로그로 빌드합니다.")
+    parser.add_argument("csv", nargs="?", default=str(Path(__file__).parent / "product_data.csv"))
+    args = parser.parse_args()
+    out = build_catalog(args.csv)
+    print(f"✅ 카탈로그 빌드 완료: {out}")
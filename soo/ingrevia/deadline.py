@@ -0,0 +1,48 @@
+# deadline.py
+"""
+턴(run) 단위 시간 예산.
+
+- parse_user_input이 턴 시작 시 state["deadline"](epoch 초)을 정하고 그래프 전체로 전달
+- 보강 단계(웹 검색 + LLM 요약 등)는 run_within으로 실행:
+  * 남은 시간이 MIN_STEP_S보다 적으면 아예 시작하지 않고 로컬 폴백
+  * 실행 중 남은 시간을 넘기면 기다리지 않고 로컬 폴백 (늦게 끝난 결과는 버림)
+- 폴백된 단계 이름은 state["degraded_steps"]에 남고 로그("ingrevia.deadline")로도 기록
+"""
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, List, Optional
+
+TURN_BUDGET_S = float(os.getenv("INGREVIA_TURN_BUDGET_S", "12"))
+MIN_STEP_S = 0.5
+
+logger = logging.getLogger("ingrevia.deadline")
+_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="deadline")
+
+
+def new_deadline(budget_s: Optional[float] = None) -> float:
+    return time.time() + (TURN_BUDGET_S if budget_s is None else budget_s)
+
+def remaining(deadline: Optional[float]) -> float:
+    return float("inf") if deadline is None else deadline - time.time()
+
+def run_within(step: str, deadline: Optional[float], fn: Callable[[], Any],
+               fallback: Callable[[], Any], degraded: List[str]) -> Any:
+    """fn을 남은 예산 안에서 실행. 시간이 없거나 초과하면 fallback() 결과를 쓰고 degraded에 step 기록."""
+    left = remaining(deadline)
+    if left == float("inf"):
+        return fn()
+    if left < MIN_STEP_S:
+        return _degrade(step, "budget exhausted", fallback, degraded)
+    future = _POOL.submit(fn)
+    try:
+        return future.result(timeout=left)
+    except FutureTimeout:
+        future.cancel()
+        return _degrade(step, f"timeout after {left:.2f}s", fallback, degraded)
+
+def _degrade(step: str, why: str, fallback: Callable[[], Any], degraded: List[str]) -> Any:
+    degraded.append(step)
+    logger.warning("degraded step=%s (%s)", step, why)
+    return fallback()
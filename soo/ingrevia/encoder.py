@@ -0,0 +1,121 @@
+# encoder.py
+"""
+ko-sbert(jhgan/ko-sbert-nli) 인코더.
+
+- 문서(오프라인 빌드): sentence-transformers(PyTorch)
+- 질의(서빙): ONNX Runtime + int8 동적 양자화 모델 → PyTorch 없이 CPU에서 수 ms
+  * 모델은 첫 질의 때 한 번만 로드(지연 로딩, 프로세스 단위 메모이즈)
+  * 같은 질의는 LRU 캐시로 재인코딩 없이 반환
+  * ONNX 모델/런타임이 없으면 sentence-transformers로 자동 폴백
+
+사용 예:
+    python encoder.py --export            # ONNX 변환 + int8 양자화 → ko-sbert-onnx/
+"""
+import argparse
+from functools import lru_cache
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+EMBED_MODEL = "jhgan/ko-sbert-nli"
+ONNX_DIR = Path(__file__).parent / "ko-sbert-onnx"
+ONNX_FILE = "model_quantized.onnx"
+MAX_QUERY_TOKENS = 128
+
+
+# =========================
+# 문서 인코더 (sentence-transformers)
+# =========================
+@lru_cache(maxsize=1)
+def _get_st_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBED_MODEL)
+
+def encode_texts(texts: List[str], batch_size: int = 32) -> np.ndarray:
+    vecs = _get_st_model().encode(texts, batch_size=batch_size, normalize_embeddings=True)
+    return np.asarray(vecs, dtype=np.float32)
+
+
+# =========================
+# 질의 인코더 (ONNX Runtime, int8)
+# =========================
+class OnnxQueryEncoder:
+    """토크나이저(tokenizers) + ONNX 세션. 평균 풀링 후 L2 정규화(ko-sbert와 동일)."""
+
+    def __init__(self, model_dir: Path = ONNX_DIR, threads: int = 1):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.tokenizer = Tokenizer.from_file(str(Path(model_dir) / "tokenizer.json"))
+        self.tokenizer.enable_truncation(MAX_QUERY_TOKENS)
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = threads
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(Path(model_dir) / ONNX_FILE), opts, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, text: str) -> np.ndarray:
+        enc = self.tokenizer.encode(text)
+        feeds = {
+            "input_ids": np.array([enc.ids], dtype=np.int64),
+            "attention_mask": np.array([enc.attention_mask], dtype=np.int64),
+            "token_type_ids": np.array([enc.type_ids], dtype=np.int64),
+        }
+        feeds = {k: v for k, v in feeds.items() if k in self.input_names}
+        hidden = self.session.run(None, feeds)[0]          # (1, T, D)
+        mask = feeds["attention_mask"][..., None].astype(np.float32)
+        vec = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        vec = vec[0].astype(np.float32)
+        return vec / max(float(np.linalg.norm(vec)), 1e-12)
+
+
+@lru_cache(maxsize=1)
+def get_query_encoder():
+    """ONNX 모델이 준비돼 있으면 ONNX, 아니면 None(→ sentence-transformers 폴백)."""
+    if not (ONNX_DIR / ONNX_FILE).exists():
+        return None
+    try:
+        return OnnxQueryEncoder(ONNX_DIR)
+    except Exception:
+        return None
+
+@lru_cache(maxsize=1024)
+def _encode_query_cached(text: str) -> np.ndarray:
+    enc = get_query_encoder()
+    vec = enc.encode(text) if enc is not None else encode_texts([text])[0]
+    vec.setflags(write=False)  # 캐시 공유 객체 보호
+    return vec
+
+def encode_query(text: str) -> np.ndarray:
+    """질의 임베딩(정규화). 공백 정리 후 LRU 캐시."""
+    return _encode_query_cached(" ".join(str(text or "").split()))
+
+
+# =========================
+# 오프라인 변환
+# =========================
+def export_onnx(out_dir: Path = ONNX_DIR) -> Path:
+    """ko-sbert → ONNX 변환 후 int8 동적 양자화. (optimum, onnxruntime 필요)"""
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    from transformers import AutoTokenizer
+
+    out_dir = Path(out_dir)
+    ORTModelForFeatureExtraction.from_pretrained(EMBED_MODEL, export=True).save_pretrained(out_dir)
+    AutoTokenizer.from_pretrained(EMBED_MODEL).save_pretrained(out_dir)
+    quantize_dynamic(str(out_dir / "model.onnx"), str(out_dir / ONNX_FILE), weight_type=QuantType.QInt8)
+    return out_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ko-sbert 질의 인코더 ONNX 변환")
+    parser.add_argument("--export", action="store_true")
+    parser.add_argument("--out", default=str(ONNX_DIR))
+    args = parser.parse_args()
+    if args.export:
+        print(f"✅ ONNX(int8) 변환 완료: {export_onnx(Path(args.out))}")
+    else:
+        parser.print_help()
@@ -0,0 +1,196 @@
+# harm_score.py
+"""
+EWG 등급이 수정됐을 때 유해성_점수를 '바뀐 제품만' 다시 계산합니다.
+
+- 등급표(ewg_ratings.csv / ingredient_data.csv)를 직전 스냅샷과 비교해 바뀐 성분만 추림
+- 성분→제품 역색인으로 영향받는 제품만 골라 유해성_점수 갱신 (나머지 행은 원문 그대로)
+- 변경 내역을 JSONL 로그로 남겨 캐시 무효화에 사용
+
+사용 예:
+    python harm_score.py                       # 기본 경로(soo/ 데이터 + 서비스용 product_data.csv)
+    python harm_score.py --products a.csv b.csv
+"""
+import csv
+import json
+import time
+import hashlib
+import argparse
+from pathlib import Path
+from typing import Dict, Any, List, Set, Optional
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = Path(__file__).parent
+DATA_DIR = BASE_DIR.parent  # soo/
+
+INGREDIENT_DATA_PATH = DATA_DIR / "ingredient_data.csv"
+EWG_RATINGS_PATH = DATA_DIR / "ewg_ratings.csv"
+PRODUCT_PATHS = [DATA_DIR / "product_with_score.csv", BASE_DIR / "product_data.csv"]
+CHANGELOG_PATH = BASE_DIR / "harm_score_changes.jsonl"
+
+SCORE_COL = "유해성_점수"
+
+
+# =========================
+# 등급표 로딩
+# =========================
+def _read_str_csv(path: Path) -> pd.DataFrame:
+    # 문자열 그대로 읽어야 다시 쓸 때 바뀌지 않은 행이 원문과 동일하게 유지됨
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+def _to_grade(x) -> Optional[float]:
+    try:
+        v = float(x)
+    except (TypeError, ValueError):
+        return None
+    return None if np.isnan(v) else v
+
+def load_ewg_ratings(path: Path = EWG_RATINGS_PATH) -> Dict[str, Optional[float]]:
+    """영문표준명 → EWG 등급."""
+    df = _read_str_csv(path)
+    return {r["영문표준명"].strip(): _to_grade(r["EWG등급"]) for _, r in df.iterrows()}
+
+def load_ingredient_ratings(path: Path = INGREDIENT_DATA_PATH) -> Dict[str, Optional[float]]:
+    """한국어성분명 → EWG 등급 (노트북의 ewg_ratings_dict와 동일한 기준)."""
+    df = _read_str_csv(path)
+    return {r["한국어성분명"].strip(): _to_grade(r["EWG등급"]) for _, r in df.iterrows()}
+
+def _diff_keys(old: Dict[str, Any], new: Dict[str, Any]) -> Set[str]:
+    return {k for k in set(old) | set(new) if old.get(k) != new.get(k)}
+
+def sync_ingredient_data(changed_inci: Set[str], ewg: Dict[str, Optional[float]],
+                         path: Path = INGREDIENT_DATA_PATH) -> Set[str]:
+    """
+    ewg_ratings.csv에서 바뀐 영문표준명의 등급을 ingredient_data.csv에 반영.
+    반환: 등급이 실제로 바뀐 한국어성분명 집합
+    """
+    if not changed_inci:
+        return set()
+    df = _read_str_csv(path)
+    touched: Set[str] = set()
+    for idx, row in df.iterrows():
+        inci = row["영문표준명"].strip()
+        if inci not in changed_inci:
+            continue
+        grade = ewg.get(inci)
+        new_txt = "" if grade is None else str(float(grade))
+        if row["EWG등급"] != new_txt:
+            df.at[idx, "EWG등급"] = new_txt
+            touched.add(row["한국어성분명"].strip())
+    if touched:
+        df.to_csv(path, index=False, encoding="utf-8-sig")
+    return touched
+
+
+# =========================
+# 점수 계산
+# =========================
+def calculate_product_score(ingredients_str: str, ratings: Dict[str, Optional[float]]) -> Optional[float]:
+    """전성분(세미콜론 구분)의 EWG 등급 평균. 등급이 하나도 없으면 None."""
+    if not ingredients_str:
+        return None
+    scores = [ratings[i] for i in (x.strip() for x in ingredients_str.split(";"))
+              if ratings.get(i) is not None]
+    return float(np.mean(scores)) if scores else None
+
+def build_ingredient_index(df: pd.DataFrame) -> Dict[str, List[int]]:
+    """성분명 → 해당 성분을 포함한 제품 행 번호 리스트."""
+    index: Dict[str, List[int]] = {}
+    for pos, ings in enumerate(df["전성분"].tolist()):
+        for ing in dict.fromkeys(x.strip() for x in str(ings).split(";")):
+            if ing:
+                index.setdefault(ing, []).append(pos)
+    return index
+
+def file_digest(path: Path) -> str:
+    """카탈로그 버전(내용 해시). 캐시 키/무효화 기준으로 사용."""
+    return hashlib.sha1(Path(path).read_bytes()).hexdigest()[:12]
+
+def _quoting_of(path: Path) -> int:
+    # 서비스용 product_data.csv는 전 필드 따옴표, 원본 산출물은 최소 따옴표
+    head = Path(path).read_text(encoding="utf-8-sig")[:1]
+    return csv.QUOTE_ALL if head == '"' else csv.QUOTE_MINIMAL
+
+def _snapshot_path(product_path: Path) -> Path:
+    return Path(product_path).with_name(Path(product_path).name + ".ratings.json")
+
+
+# =========================
+# 증분 재계산
+# =========================
+def recompute_incremental(
+    product_path: Path,
+    ingredient_path: Path = INGREDIENT_DATA_PATH,
+    ewg_path: Path = EWG_RATINGS_PATH,
+    changelog_path: Path = CHANGELOG_PATH,
+) -> List[Dict[str, Any]]:
+    """
+    직전 스냅샷 대비 바뀐 등급만 찾아 영향받는 제품의 유해성_점수만 갱신.
+    스냅샷이 없으면(첫 실행) 전체를 한 번 계산하고 스냅샷을 만든다.
+    반환: 변경 로그 레코드 리스트 (점수가 실제로 바뀐 제품만)
+    """
+    product_path = Path(product_path)
+    snap_path = _snapshot_path(product_path)
+    snapshot = json.loads(snap_path.read_text(encoding="utf-8")) if snap_path.exists() else None
+
+    # 1) ewg_ratings.csv 수정분 → ingredient_data.csv 동기화
+    ewg = load_ewg_ratings(ewg_path)
+    changed_inci = _diff_keys(snapshot["ewg"], ewg) if snapshot else set()
+    sync_ingredient_data(changed_inci, ewg, ingredient_path)
+
+    # 2) 한국어성분명 기준 등급 diff
+    ratings = load_ingredient_ratings(ingredient_path)
+    changed_ings = _diff_keys(snapshot["ingredients"], ratings) if snapshot else None
+
+    # 3) 역색인으로 영향 제품만 추림
+    df = _read_str_csv(product_path)
+    index = build_ingredient_index(df)
+    if changed_ings is None:
+        affected = set(range(len(df)))
+    else:
+        affected = {pos for ing in changed_ings for pos in index.get(ing, [])}
+
+    changes: List[Dict[str, Any]] = []
+    for pos in sorted(affected):
+        old_txt = df.at[pos, SCORE_COL]
+        new_score = calculate_product_score(df.at[pos, "전성분"], ratings)
+        if _to_grade(old_txt) == new_score or (
+            new_score is not None and _to_grade(old_txt) is not None
+            and np.isclose(_to_grade(old_txt), new_score)
+        ):
+            continue
+        df.at[pos, SCORE_COL] = "" if new_score is None else repr(new_score)
+        ings = {x.strip() for x in df.at[pos, "전성분"].split(";")}
+        changes.append({
+            "product": df.at[pos, "제품명"],
+            "brand": df.at[pos, "브랜드명"],
+            "old_score": _to_grade(old_txt),
+            "new_score": new_score,
+            "ingredients": sorted(ings & changed_ings) if changed_ings is not None else [],
+        })
+
+    if changes:
+        df.to_csv(product_path, index=False, encoding="utf-8-sig", quoting=_quoting_of(product_path))
+
+    # 4) 변경 로그(JSONL) — 캐시 계층은 catalog/catalog_version으로 무효화
+    if changes:
+        version = file_digest(product_path)
+        ts = time.time()
+        with open(changelog_path, "a", encoding="utf-8") as f:
+            for c in changes:
+                c.update({"ts": ts, "catalog": product_path.name, "catalog_version": version})
+                f.write(json.dumps(c, ensure_ascii=False) + "\n")
+
+    # 5) 스냅샷 갱신
+    snap_path.write_text(json.dumps({"ewg": ewg, "ingredients": ratings}, ensure_ascii=False), encoding="utf-8")
+    return changes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EWG 등급 변경분만 반영해 유해성_점수를 갱신합니다.")
+    parser.add_argument("--products", nargs="*", default=[str(p) for p in PRODUCT_PATHS])
+    args = parser.parse_args()
+    for p in args.products:
+        log = recompute_incremental(Path(p))
+        print(f"✅ {Path(p).name}: {len(log)}개 제품 점수 갱신")
@@ -0,0 +1,92 @@
+# http_client.py
+"""
+프로세스 전역 HTTP 연결 풀 (OpenAI · 웹 검색 공용).
+
+- httpx.Client 하나를 모든 외부 호출이 공유 → keep-alive로 DNS/TCP/TLS 핸드셰이크 재사용
+- 연결 수 제한(Limits)과 타임아웃을 한 곳에서 관리
+- h2 패키지가 설치돼 있으면 HTTP/2(한 연결에서 다중 요청), 없으면 HTTP/1.1 keep-alive
+- 클라이언트는 첫 호출 때 생성하고 프로세스 단위로 재사용 (lru_cache)
+
+사용 예:
+    from http_client import get_chat_model, get_openai_client, web_search
+"""
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+MAX_CONNECTIONS = int(os.getenv("INGREVIA_HTTP_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE = int(os.getenv("INGREVIA_HTTP_MAX_KEEPALIVE", "10"))
+KEEPALIVE_EXPIRY = 60.0
+TAVILY_URL = "https://api.tavily.com/search"
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+@lru_cache(maxsize=1)
+def get_http_client():
+    """공유 httpx.Client (동기)."""
+    import httpx
+    return httpx.Client(
+        http2=_http2_available(),
+        limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(60.0, connect=5.0),
+    )
+
+
+# =========================
+# OpenAI
+# =========================
+@lru_cache(maxsize=4)
+def get_openai_client(api_key: Optional[str] = None):
+    """openai.OpenAI — 공유 연결 풀 사용."""
+    from openai import OpenAI
+    return OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"), http_client=get_http_client())
+
+@lru_cache(maxsize=8)
+def get_chat_model(model: str = "gpt-4o", temperature: float = 0.0, api_key: Optional[str] = None,
+                   max_retries: Optional[int] = None):
+    """langchain ChatOpenAI — 공유 연결 풀 사용. (모델, 온도)별로 한 번만 생성.
+    max_retries=0: 재시도를 호출부(resilience.py)가 직접 관리할 때 SDK 자체 재시도 끔."""
+    from langchain_openai import ChatOpenAI
+    kwargs: Dict[str, Any] = {"model": model, "temperature": temperature, "http_client": get_http_client()}
+    if api_key:
+        kwargs["api_key"] = api_key
+    if max_retries is not None:
+        kwargs["max_retries"] = max_retries
+    return ChatOpenAI(**kwargs)
+
+
+# =========================
+# 웹 검색 (Tavily REST)
+# =========================
+def search_available() -> bool:
+    return bool(os.getenv("TAVILY_API_KEY"))
+
+def web_search(query: str, k: int = 3) -> List[Dict[str, str]]:
+    """
+    Tavily 검색을 공유 연결 풀로 직접 호출.
+    반환 형식은 TavilySearchResults.run과 같음: [{"url": ..., "content": ...}]
+    키가 없으면 빈 리스트, 요청 실패는 예외로 올림(호출부에서 폴백).
+    """
+    api_key = os.getenv("TAVILY_API_KEY")
+    if not api_key:
+        return []
+    resp = get_http_client().post(TAVILY_URL, json={
+        "api_key": api_key,
+        "query": query,
+        "max_results": k,
+        "search_depth": "advanced",
+    }, timeout=15.0)
+    resp.raise_for_status()
+    return [{"url": r.get("url", ""), "content": r.get("content", "")}
+            for r in resp.json().get("results", [])]
@@ -0,0 +1,252 @@
+# ingredient_canon.py
+"""
+성분 표기 정규화(동의어 · INCI · 성분군) 색인.
+
+같은 성분이 "히알루론산" / "하이알루로닉애씨드" / "Sodium Hyaluronate" / "소듐하이알루로네이트(100ppm)"처럼
+여러 표기로 들어오는 것을 한 곳에서 정규화합니다. 매칭(utils.score_positions), 주의 성분, UI 배지가 공유.
+
+- 정규 id = 카탈로그 성분 사전(IngredientVocab) id. 농도 표기 "(51ppm)", "0.25%", "(구명칭)" 등은 떼고
+  같은 이름끼리 하나의 정규 id로 묶음
+- 별칭: ICNI_mapping.csv / ingredient_data.csv의 한국어명 ↔ 영문표준명(INCI) + 구 표기(에칠 → 에틸 등)
+- 성분군(FAMILIES): 염/유도체를 대표 성분 아래로 묶은 큐레이션 표 (히알루론산 → 소듐하이알루로네이트 …)
+- 조회: 정규화 문자열 → id 딕셔너리(O(1)), 못 찾으면 음절 bigram 유사도로 오타 보정
+
+사용 예:
+    from ingredient_canon import load_canon
+    canon = load_canon(DATA_PATH)
+    canon.resolve("sodium hyaluronate")    # → 정규 id
+    canon.match_ids("히알루론산")            # → 성분군 전체 id 배열 (제품 매칭용)
+"""
+import csv
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Iterable, Tuple
+
+import numpy as np
+
+from catalog import load_catalog
+from ingredient_vocab import IngredientVocab, ICNI_PATH
+
+INGREDIENT_DATA_PATH = Path(__file__).parent.parent / "ingredient_data.csv"
+
+FUZZY_THRESHOLD = 0.75
+MAX_NAME_LEN = 60  # 전성분 분리 실패로 붙어 버린 행(수백 자) 제외
+
+# 구 표기 → 현 표기 (양쪽 모두 같은 규칙으로 정규화)
+SPELLING_RULES = [("에칠", "에틸"), ("메칠", "메틸"), ("에텔", "에터"), ("히알루론", "하이알루론")]
+
+# 성분군: 대표명 → (이름에 포함되면 소속, 별칭)
+FAMILIES: Dict[str, Tuple[List[str], List[str]]] = {
+    "히알루론산": (["하이알루로"], ["하이알루론산", "히알루론", "hyaluronic acid", "HA"]),
+    "세라마이드": (["세라마이드"], ["ceramide", "ceramides"]),
+    "병풀(시카)": (["병풀", "마데카소사이드", "마데카식애씨드", "아시아티코사이드", "아시아틱애씨드"],
+                ["병풀", "시카", "센텔라", "centella", "centella asiatica", "cica"]),
+    "비타민C": (["아스코빅애씨드", "아스코빌"], ["비타민c", "비타민씨", "아스코르빈산", "ascorbic acid", "vitamin c"]),
+    "레티노이드": (["레티놀", "레티닐", "레티노에이트"], ["레티노이드", "비타민a", "retinol", "retinoid"]),
+    "나이아신아마이드": (["나이아신아마이드"], ["나이아신", "비타민b3", "niacinamide"]),
+    "판테놀": (["판테놀"], ["비타민b5", "panthenol"]),
+    "살리실산(BHA)": (["살리실릭애씨드"], ["살리실산", "bha", "salicylic acid"]),
+    "펩타이드": (["펩타이드"], ["peptide", "peptides"]),
+    "토코페롤(비타민E)": (["토코페롤", "토코페릴"], ["비타민e", "tocopherol"]),
+    "스쿠알란": (["스쿠알란"], ["squalane"]),
+    "베타-글루칸": (["베타-글루칸"], ["베타글루칸", "beta-glucan"]),
+}
+
+_ANNOTATION = re.compile(r"\([^)]*\)|\d[\d,.]*\s*(%|ppm|ppb)\s*$", re.IGNORECASE)
+
+
+def normalize(surface: str) -> str:
+    """비교용 키: 소문자, 농도/괄호 표기 제거, 공백 제거, 구 표기 통일."""
+    s = _ANNOTATION.sub("", str(surface or "")).strip().lower()
+    s = re.sub(r"\s+", "", s)
+    for old, new in SPELLING_RULES:
+        s = s.replace(old, new)
+    return s
+
+def _bigrams(key: str) -> set:
+    padded = f"^{key}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+class CanonIndex:
+    def __init__(self, vocab: IngredientVocab, aliases: Iterable[Tuple[str, str]] = (),
+                 freq: Optional[np.ndarray] = None):
+        """freq: 사전 id별 제품 등장 횟수 (성분군 대표 성분 선택용)."""
+        self.vocab = vocab
+        n = len(vocab)
+        self._surface: Dict[str, int] = {}          # 정규화 표기 → 정규 id
+        self.canon_of = np.arange(n, dtype=np.int64)  # 사전 id → 정규 id
+        self._variants: Dict[int, List[int]] = {}   # 정규 id → 같은 성분의 사전 id들
+
+        # 1) 사전 이름/INCI: 정규화 키가 같으면 먼저 나온(보통 농도 표기 없는) id로 묶음
+        for i in range(n):
+            name = vocab.names[i]
+            if len(name) > MAX_NAME_LEN:
+                continue
+            key = normalize(name)
+            if not key:
+                continue
+            c = self._surface.setdefault(key, i)
+            self.canon_of[i] = c
+            self._variants.setdefault(c, []).append(i)
+            if vocab.inci[i]:
+                self._surface.setdefault(normalize(vocab.inci[i]), c)
+
+        weights = np.zeros(n) if freq is None else np.asarray(freq, dtype=np.float64)[:n]
+        self._freq = np.bincount(self.canon_of, weights=weights, minlength=n)  # 정규 id별 등장 횟수
+
+        # 2) 외부 별칭 (한국어명 ↔ INCI): 어느 한쪽이 사전에 있으면 다른 쪽도 같은 id로
+        for kr, en in aliases:
+            c = self._surface.get(normalize(kr))
+            if c is None:
+                c = self._surface.get(normalize(en))
+            if c is not None:
+                for s in (kr, en):
+                    if normalize(s):
+                        self._surface.setdefault(normalize(s), c)
+
+        # 3) 성분군
+        self.family_of: Dict[int, str] = {}
+        self._family_ids: Dict[str, np.ndarray] = {}
+        self._family_surface: Dict[str, str] = {}
+        for fam, (patterns, fam_aliases) in FAMILIES.items():
+            pats = [normalize(p) for p in patterns]
+            members = sorted({c for key, c in self._surface.items() if any(p in key for p in pats)})
+            for c in members:
+                self.family_of.setdefault(c, fam)
+            self._family_ids[fam] = np.array(
+                sorted(i for c in members for i in self._variants.get(c, [c])), dtype=np.int64)
+            for s in [fam] + fam_aliases:
+                self._family_surface.setdefault(normalize(s), fam)
+
+        # 4) 오타 보정용 bigram 역색인 (정규화 표기 + 성분군 표기)
+        self._grams: Dict[str, List[str]] = {}
+        for key in list(self._surface) + list(self._family_surface):
+            for g in _bigrams(key):
+                self._grams.setdefault(g, []).append(key)
+        self._fuzzy_cache: Dict[str, Optional[str]] = {}
+
+    # -------------------------
+    # 조회
+    # -------------------------
+    def _fuzzy_key(self, key: str) -> Optional[str]:
+        """bigram Dice 유사도가 가장 높은 등록 표기 (임계값 미만이면 None)."""
+        if key in self._fuzzy_cache:
+            return self._fuzzy_cache[key]
+        best, best_score = None, FUZZY_THRESHOLD
+        if len(key) >= 3:
+            grams = _bigrams(key)
+            counts: Dict[str, int] = {}
+            for g in grams:
+                for cand in self._grams.get(g, ()):
+                    counts[cand] = counts.get(cand, 0) + 1
+            for cand, inter in counts.items():
+                score = 2 * inter / (len(grams) + len(cand) + 1)
+                if score > best_score or (score == best_score and best is not None and len(cand) < len(best)):
+                    best, best_score = cand, score
+        self._fuzzy_cache[key] = best
+        return best
+
+    def lookup(self, surface: str, fuzzy: bool = True) -> Tuple[Optional[int], Optional[str]]:
+        """(정규 id, 성분군) — 성분군 이름/별칭이면 id는 None."""
+        key = normalize(surface)
+        if not key:
+            return None, None
+        if key in self._surface:
+            c = self._surface[key]
+            return c, self.family_of.get(c)
+        if key in self._family_surface:
+            return None, self._family_surface[key]
+        if fuzzy:
+            hit = self._fuzzy_key(key)
+            if hit is not None:
+                return self.lookup(hit, fuzzy=False)
+        return None, None
+
+    def resolve(self, surface: str, fuzzy: bool = True) -> Optional[int]:
+        """표기 → 정규 id. 성분군 이름(예: 히알루론산)이면 군에서 제품에 가장 많이 쓰인 성분."""
+        c, fam = self.lookup(surface, fuzzy)
+        if c is None and fam is not None:
+            c = self._family_rep(fam)
+        return c
+
+    def family(self, surface: str, fuzzy: bool = True) -> Optional[str]:
+        return self.lookup(surface, fuzzy)[1]
+
+    def name(self, surface: str, fuzzy: bool = True) -> str:
+        """표시용 정규 한국어명 (못 찾으면 입력 그대로)."""
+        c = self.resolve(surface, fuzzy)
+        return self.vocab.names[c] if c is not None else str(surface or "").strip()
+
+    def key(self, surface: str, fuzzy: bool = True) -> str:
+        """같은 성분(성분군 포함)이면 같은 값 — 중복 제거/겹침 판단용."""
+        c, fam = self.lookup(surface, fuzzy)
+        if fam is not None:
+            return f"family:{fam}"
+        return f"id:{c}" if c is not None else f"raw:{normalize(surface)}"
+
+    def same(self, a: str, b: str) -> bool:
+        return self.key(a) == self.key(b)
+
+    def match_ids(self, surface: str) -> np.ndarray:
+        """
+        제품 매칭용 사전 id 배열.
+        - 기존 부분 문자열 매칭(ids_containing)은 그대로 유지
+        - 성분군 이름/별칭이면 군 전체, 개별 성분이면 농도 표기가 붙은 변형까지 추가 (오타는 보정 후)
+        """
+        base = self.vocab.ids_containing(surface)
+        c, fam = self.lookup(surface, fuzzy=True)
+        extra: List[np.ndarray] = []
+        if c is None and fam is not None:
+            extra.append(self._family_ids[fam])
+        elif c is not None:
+            extra.append(np.array(self._variants.get(c, [c]), dtype=np.int64))
+        if not extra:
+            return base
+        return np.union1d(base, np.concatenate(extra))
+
+    def dedupe_names(self, surfaces: Iterable[str]) -> List[str]:
+        """표시용 정규명으로 바꾸고 같은 성분은 한 번만 (UI 배지 / 카드 성분 목록)."""
+        seen, out = set(), []
+        for s in surfaces:
+            if not str(s or "").strip():
+                continue
+            k = self.key(s)
+            if k not in seen:
+                seen.add(k)
+                out.append(self.name(s))
+        return out
+
+    def _family_rep(self, fam: str) -> Optional[int]:
+        ids = self._family_ids.get(fam)
+        if ids is None or not len(ids):
+            return None
+        canon = np.unique(self.canon_of[ids])
+        return int(canon[np.argmax(self._freq[canon])])
+
+
+# =========================
+# 로딩
+# =========================
+def _read_aliases(*paths: Path) -> List[Tuple[str, str]]:
+    out: List[Tuple[str, str]] = []
+    for path in paths:
+        if not Path(path).exists():
+            continue
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            for r in csv.DictReader(f):
+                out.append(((r.get("한국어성분명") or "").strip(), (r.get("영문표준명") or "").strip()))
+    return out
+
+_INDEXES: Dict[str, Tuple[str, CanonIndex]] = {}
+
+def load_canon(csv_path) -> CanonIndex:
+    """카탈로그 버전별로 한 번만 생성."""
+    catalog = load_catalog(csv_path)
+    cached = _INDEXES.get(str(csv_path))
+    if cached and cached[0] == catalog.version:
+        return cached[1]
+    freq = np.bincount(np.asarray(catalog.ing_ids, dtype=np.int64), minlength=len(catalog.vocab))
+    index = CanonIndex(catalog.vocab, _read_aliases(ICNI_PATH, INGREDIENT_DATA_PATH), freq)
+    _INDEXES[str(csv_path)] = (catalog.version, index)
+    return index
@@ -0,0 +1,134 @@
+# ingredient_vocab.py
+"""
+전역 성분 사전(한국어성분명 ↔ 영문표준명(INCI) ↔ 정수 id)과
+제품별 성분 id 배열(CSR) 위의 집합 연산을 제공합니다.
+
+- 사전: ICNI_mapping.csv 항목이 먼저 id를 받고, 카탈로그에만 있는 성분은 뒤에 추가
+- 제품 성분: ids(uint16/uint32) + offsets(int64)  → 제품 i의 성분 = ids[offsets[i]:offsets[i+1]]
+- 매칭/제외/유사도는 문자열 대신 정수 배열로 계산
+"""
+from pathlib import Path
+from typing import Dict, List, Optional, Iterable
+
+import numpy as np
+
+ICNI_PATH = Path(__file__).parent.parent / "ICNI_mapping.csv"
+
+
+# =========================
+# 성분 사전
+# =========================
+class IngredientVocab:
+    def __init__(self):
+        self.names: List[str] = []   # id → 한국어성분명
+        self.inci: List[str] = []    # id → 영문표준명 (모르면 "")
+        self._lookup: Dict[str, int] = {}
+        self._substr_cache: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_icni(cls, path: Path = ICNI_PATH) -> "IngredientVocab":
+        """ICNI_mapping.csv로 초기화. 파일이 없으면 빈 사전(카탈로그 성분만 사용)."""
+        vocab = cls()
+        if Path(path).exists():
+            import pandas as pd
+            df = pd.read_csv(path, dtype=str, keep_default_na=False)
+            for _, r in df.iterrows():
+                vocab.add(r["한국어성분명"], r["영문표준명"])
+        return vocab
+
+    @classmethod
+    def from_lists(cls, names: List[str], inci: List[str]) -> "IngredientVocab":
+        vocab = cls()
+        for n, e in zip(names, inci):
+            vocab.add(n, e)
+        return vocab
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @staticmethod
+    def _key(s: str) -> str:
+        return str(s or "").strip().lower()
+
+    def add(self, name: str, inci: str = "") -> int:
+        """성분 등록(이미 있으면 기존 id). 한국어명/INCI 어느 쪽으로도 조회되게 색인."""
+        name = str(name or "").strip()
+        idx = self._lookup.get(self._key(name))
+        if idx is None:
+            idx = len(self.names)
+            self.names.append(name)
+            self.inci.append(str(inci or "").strip())
+            self._lookup[self._key(name)] = idx
+            self._substr_cache.clear()
+        elif inci and not self.inci[idx]:
+            self.inci[idx] = str(inci).strip()
+        if self.inci[idx]:
+            self._lookup.setdefault(self._key(self.inci[idx]), idx)
+        return idx
+
+    def id_of(self, surface: str) -> Optional[int]:
+        """한국어성분명 또는 INCI(대소문자 무시) → id."""
+        return self._lookup.get(self._key(surface))
+
+    def encode(self, names: Iterable[str]) -> np.ndarray:
+        ids = [self.id_of(n) for n in names]
+        return np.array([i for i in ids if i is not None], dtype=np.int64)
+
+    def ids_containing(self, keyword: str) -> np.ndarray:
+        """
+        키워드를 부분 문자열로 포함하는 성분 id들 (한국어명/INCI, 소문자 기준).
+        기존 '전성분 문자열 안에 키워드 포함' 매칭과 같은 의미를 성분 단위로 계산.
+        """
+        kw = self._key(keyword)
+        if not kw:
+            return np.empty(0, dtype=np.int64)
+        hit = self._substr_cache.get(kw)
+        if hit is None:
+            hit = np.array([i for i, (n, e) in enumerate(zip(self.names, self.inci))
+                            if kw in n.lower() or (e and kw in e.lower())], dtype=np.int64)
+            self._substr_cache[kw] = hit
+        return hit
+
+
+# =========================
+# 제품 × 성분 (CSR)
+# =========================
+class IngredientMatrix:
+    """제품별 성분 id 배열(CSR). 집합 연산은 전부 정수 배열 위에서 수행."""
+
+    def __init__(self, ids: np.ndarray, offsets: np.ndarray):
+        self.ids = ids
+        self.offsets = offsets
+        # 각 성분 항목이 속한 제품 번호 (bincount 집계용)
+        self._row_of = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def row(self, i: int) -> np.ndarray:
+        return self.ids[self.offsets[i]:self.offsets[i + 1]]
+
+    def match_counts(self, query_ids: np.ndarray) -> np.ndarray:
+        """제품별로 query_ids에 속한 성분 개수."""
+        if len(query_ids) == 0:
+            return np.zeros(len(self), dtype=np.int64)
+        hit = np.isin(self.ids, query_ids)
+        return np.bincount(self._row_of[hit], minlength=len(self))
+
+    def contains_any(self, query_ids: np.ndarray) -> np.ndarray:
+        """query_ids 중 하나라도 포함한 제품 마스크 (매칭/제외 필터)."""
+        return self.match_counts(query_ids) > 0
+
+    def jaccard(self, i: int, j: int) -> float:
+        a, b = np.unique(self.row(i)), np.unique(self.row(j))
+        union = len(np.union1d(a, b))
+        return len(np.intersect1d(a, b, assume_unique=True)) / union if union else 0.0
+
+    def similar_to(self, i: int, top_k: int = 5) -> List[int]:
+        """제품 i와 성분 자카드 유사도가 높은 제품 번호 (자기 자신 제외)."""
+        base = np.unique(self.row(i))
+        uniq_sizes = np.array([len(np.unique(self.row(r))) for r in range(len(self))])
+        inter = np.bincount(self._row_of[np.isin(self.ids, base)], minlength=len(self))
+        sims = inter / np.maximum(uniq_sizes + len(base) - inter, 1)
+        sims[i] = -1.0
+        return [int(x) for x in np.argsort(-sims, kind="stable")[:top_k]]
@@ -11,12 +11,22 @@ from state import GraphState
 from nodes import (
     parse_user_input,
     check_parsing_status,
+    lookup_cached_recommendation,
+    check_cache_status,
     ask_for_clarification,
     get_ingredients,
+    filter_candidates,
     find_products,
+    check_products_found,
+    retrieve_products,
     create_recommendation_message,
-    # router,            # ← 지금 흐름에서는 사용 안 함
-    # handle_follow_up,  # ← 지금 흐름에서는 사용 안 함
+    add_categories,
+    prepare_routine,
+    fan_out_routine,
+    routine_branch,
+    assemble_routine,
+    router,
+    handle_follow_up,
 )
 
 load_dotenv()
@@ -25,28 +35,75 @@ load_dotenv()
 workflow = StateGraph(GraphState)
 
 workflow.add_node("parse_user_input", parse_user_input)
+workflow.add_node("lookup_cached_recommendation", lookup_cached_recommendation)
 workflow.add_node("ask_for_clarification", ask_for_clarification)
 workflow.add_node("get_ingredients", get_ingredients)
+workflow.add_node("filter_candidates", filter_candidates)
 workflow.add_node("find_products", find_products)
+workflow.add_node("retrieve_products", retrieve_products)
 workflow.add_node("create_recommendation_message", create_recommendation_message)
-# workflow.add_node("handle_follow_up", handle_follow_up)  # 사용 시에만 다시 추가
+workflow.add_node("handle_follow_up", handle_follow_up)
+workflow.add_node("add_categories", add_categories)
+workflow.add_node("prepare_routine", prepare_routine)
+workflow.add_node("routine_branch", routine_branch)
+workflow.add_node("assemble_routine", assemble_routine)
 
-workflow.add_edge(START, "parse_user_input")
+# 직전 추천(top_products)에 대한 후속 질문은 파이프라인을 다시 돌리지 않고 바로 응답
+workflow.add_conditional_edges(
+    START,
+    router,
+    {
+        "follow_up": "handle_follow_up",
+        "new_request": "parse_user_input",
+    },
+)
+workflow.add_edge("handle_follow_up", END)
 
 workflow.add_conditional_edges(
     "parse_user_input",
     check_parsing_status,
     {
-        "success": "get_ingredients",
+        "success": "lookup_cached_recommendation",
+        "add_categories": "add_categories",
+        "routine": "prepare_routine",
         "clarification_needed": "ask_for_clarification",
     },
 )
+# "토너도/선크림도": 새 카테고리만 계산해 이전 결과에 합침
+workflow.add_edge("add_categories", END)
+
+# 기초 라인: 카테고리별 Send 병렬 분기(map) → assemble_routine(reduce)
+workflow.add_conditional_edges("prepare_routine", fan_out_routine, ["routine_branch"])
+workflow.add_edge("routine_branch", "assemble_routine")
+workflow.add_edge("assemble_routine", END)
 
 # 질문 던진 뒤엔 사용자 입력을 기다리기 위해 종료
 workflow.add_edge("ask_for_clarification", END)
 
-workflow.add_edge("get_ingredients", "find_products")
-workflow.add_edge("find_products", "create_recommendation_message")
+# 같은 프로필의 추천이 캐시에 있으면 LLM/웹 호출 없이 바로 응답,
+# 미스면 핵심 성분 생성(LLM)과 후보 필터링을 병렬 실행 → find_products에서 합류해 점수화
+workflow.add_conditional_edges(
+    "lookup_cached_recommendation",
+    check_cache_status,
+    {
+        "hit": END,
+        "get_ingredients": "get_ingredients",
+        "filter_candidates": "filter_candidates",
+    },
+)
+
+workflow.add_edge(["get_ingredients", "filter_candidates"], "find_products")
+
+# 규칙 기반 랭킹이 비면 로컬 임베딩 검색(LLM 호출 없음)으로 후보 확보
+workflow.add_conditional_edges(
+    "find_products",
+    check_products_found,
+    {
+        "found": "create_recommendation_message",
+        "empty": "retrieve_products",
+    },
+)
+workflow.add_edge("retrieve_products", "create_recommendation_message")
 
 # ✅ 추천 생성 후 이 턴(run) 종료 → 다음 질문은 새 run에서 과거 messages를 참고
 workflow.add_edge("create_recommendation_message", END)
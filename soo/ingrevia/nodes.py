@@ -1,19 +1,27 @@
+import os
 import re
 import json
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
-from langchain_openai import ChatOpenAI
+import numpy as np
 from langchain_core.messages import HumanMessage, AIMessage
-
-from utils import find_and_rank_products
-
-# [ADD] 웹 검색 (가능하면 사용, 실패 시 자동 폴백)
-try:
-    from langchain_community.tools.tavily_search import TavilySearchResults
-    _search = TavilySearchResults(k=3)
-except Exception:
-    _search = None
+from langgraph.types import Send
+
+from utils import filter_candidate_positions, score_positions, product_record
+from catalog import load_catalog
+from ingredient_canon import load_canon, normalize
+from safety_kb import SafetyFact, load_safety_kb, format_warnings
+from warning_cache import IngredientWarningCache, cache_path_for
+from retrieval import hybrid_search
+from parse_cache import ParseCache
+from slot_classifier import load_slot_model, confident_slots, log_utterance, CONFIDENCE_THRESHOLD
+from result_cache import ResultCache, make_key
+from topk_table import load_topk_table
+from http_client import get_chat_model, search_available, web_search
+from deadline import new_deadline, run_within
+from resilience import ResilientCaller, CircuitBreaker
 
 SAFE_BENIGN_INGS = [
     "글리세린","히알루론산","소듐하이알루로네이트","하이알루로닉애씨드",
@@ -22,29 +30,57 @@ SAFE_BENIGN_INGS = [
     "하이드록시아세토페논","다이소듐이디티에이"
 ]
 
+# [ADD] 웹 검색 (가능하면 사용, 실패 시 자동 폴백) — Tavily REST를 공유 연결 풀로 호출
 _PREFERRED_SITES = ["hwahae.co.kr"]
 def _search_prefer(query: str):
-    if _search is None:
+    if not search_available():
         return ""
     # 우선 선호 사이트
     for site in _PREFERRED_SITES:
         try:
-            r = _search.run(f"site:{site} {query}")
+            r = web_search(f"site:{site} {query}")
             if (isinstance(r, str) and r.strip()) or (isinstance(r, list) and len(r) > 0):
                 return r
         except Exception:
             pass
     # 일반 검색
     try:
-        return _search.run(query)
+        return web_search(query)
     except Exception:
         return ""
 
 
 # =========================
-# 모델
+# 모델 (import 시점이 아니라 첫 호출 때 생성 → 워커 기동/콜드 스타트 단축)
 # =========================
-llm = ChatOpenAI(model="gpt-4o", temperature=0)
+def get_llm():
+    # 공유 연결 풀(http_client) 위의 ChatOpenAI, 프로세스당 한 번 생성 (재시도는 LLM_CALLER가 담당)
+    return get_chat_model("gpt-4o", 0.0, max_retries=0)
+
+# 재시도(지수 백오프+지터) / 서킷 브레이커 / 선택적 헤징(INGREVIA_LLM_HEDGE=1)
+LLM_CALLER = ResilientCaller(
+    "openai",
+    max_attempts=3,
+    breaker=CircuitBreaker("openai", failure_threshold=5, reset_after=30.0),
+    hedge=os.getenv("INGREVIA_LLM_HEDGE") == "1",
+)
+
+def _invoke_llm(prompt: str):
+    """모든 LLM 호출의 단일 진입점. 서킷이 열려 있으면 CircuitOpenError → 호출부 폴백."""
+    return LLM_CALLER.call(lambda: get_llm().invoke(prompt))
+
+# 오프라인(LLM/웹 0회) 모드: 요청 플래그(state["offline"]) / INGREVIA_OFFLINE=1 / 서킷 open이면 자동 전환
+# 파싱=규칙+저장된 prefs, 핵심 성분=고민별 효능 성분 표, 카드=매칭 성분 이유 + 안전성 KB 주의 성분
+OFFLINE_ENV = os.getenv("INGREVIA_OFFLINE") == "1"
+
+def _offline_requested(state: Dict[str, Any]) -> bool:
+    return bool(state.get("offline")) or OFFLINE_ENV or LLM_CALLER.breaker.is_open()
+
+def _is_offline(state: Dict[str, Any]) -> bool:
+    """턴 시작 때 정한 llm_mode 우선 (턴 도중 서킷이 바뀌어도 한 턴 안에서는 일관되게)."""
+    if state.get("llm_mode"):
+        return state["llm_mode"] == "offline"
+    return _offline_requested(state)
 
 # =========================
 # 라벨/동의어
@@ -175,8 +211,12 @@ def _extract_category_intent(raw_text: str):
       cats: 표준화된 카테고리 리스트
     """
     tx = _coerce_to_text(raw_text or "")
-    # '~도 / 또 / 역시'가 있으면 add 의도
+    # '~도 / 또 / 역시'가 있으면 add 의도 ("토너도", "선크림도"처럼 카테고리에 붙은 '도' 포함)
     add_mode = bool(re.search(r"(?:^|\s)(도|또|역시)(?:\s|$)", tx))
+    for w in re.split(r"[\s,]+", tx):
+        w = re.sub(r"[!?.~…·]+$", "", w)
+        if len(w) > 1 and w.endswith("도") and (w[:-1] in CATEGORY_SYNONYMS or w[:-1].endswith("토너")):
+            add_mode = True
     tokens = _normalize_tokens(tx)
 
     cats = []
@@ -287,8 +327,8 @@ def _llm_json_parse(s: str) -> Dict[str, Any]:
 
 입력: {s}
 """
-    resp = llm.invoke(prompt).content.strip()
     try:
+        resp = _invoke_llm(prompt).content.strip()
         if "{" in resp and "}" in resp:
             resp = resp[resp.index("{"): resp.rindex("}") + 1]
         data = json.loads(resp)
@@ -318,8 +358,8 @@ def _infer_prefs_from_history(messages) -> Dict[str, Any]:
 대화 기록:
 {history_text}
 """
-    resp = llm.invoke(prompt).content.strip()
     try:
+        resp = _invoke_llm(prompt).content.strip()
         if "{" in resp and "}" in resp:
             resp = resp[resp.index("{"): resp.rindex("}") + 1]
         data = json.loads(resp)
@@ -332,6 +372,62 @@ def _infer_prefs_from_history(messages) -> Dict[str, Any]:
     data["category"] = CATEGORY_SYNONYMS.get(cat, cat if cat else "알 수 없음")
     return data
 
+# =========================
+# 파싱 캐시 (LLM 파싱 결과 재사용)
+# =========================
+# 현재 문장 파싱: 정확 일치 + 로컬 임베딩 유사 일치
+PARSE_CACHE = ParseCache(threshold=0.93)
+# 대화 기록 기반 추론: 사용자 발화 토큰이 완전히 같을 때만 재사용
+HISTORY_CACHE = ParseCache(use_similarity=False)
+
+def _cached_llm_json_parse(s: str) -> Dict[str, Any]:
+    tokens = _normalize_tokens(s)
+    hit = PARSE_CACHE.lookup(tokens)
+    if hit is not None:
+        if PARSE_CACHE.should_verify(hit):
+            fresh = _llm_json_parse(s)
+            PARSE_CACHE.record_verification(tokens, hit, fresh)
+            return fresh
+        return hit.selections
+    data = _llm_json_parse(s)
+    PARSE_CACHE.store(tokens, data)
+    return data
+
+# =========================
+# 로컬 슬롯 분류기 (LLM JSON 파싱 앞단)
+# =========================
+# 신뢰도 ≥ 임계값인 칸은 분류기 값으로 확정, 미만인 칸만 LLM. INGREVIA_SLOT_LOG를 주면 LLM 파싱 결과를 학습용으로 기록
+# 카운터: resolved=분류기만으로 끝남, escalated=LLM 호출, offline_unresolved=오프라인이라 빈 칸으로 남김
+SLOT_THRESHOLD = float(os.getenv("INGREVIA_SLOT_THRESHOLD", str(CONFIDENCE_THRESHOLD)))
+SLOT_LOG_PATH = os.getenv("INGREVIA_SLOT_LOG")
+SLOT_COUNTERS = {"calls": 0, "resolved": 0, "escalated": 0, "offline_unresolved": 0}
+_SLOT_KEYS = ("skin_type", "concerns", "category")
+
+def _missing_slots(parsed: Dict[str, Any]) -> List[str]:
+    return [k for k in _SLOT_KEYS if parsed[k] in ("알 수 없음", ["알 수 없음"])]
+
+def _classify_slots(s: str, missing: List[str]) -> Dict[str, Any]:
+    """
+    빈 칸 중 분류기가 확정한 값 {칸: 값}. '알 수 없음'은 학습 어휘로 충분히 덮인 입력일 때만 확정.
+    모델이 아직 없으면(백그라운드 학습 중) 빈 dict → 전부 LLM.
+    """
+    model = load_slot_model()
+    if model is None:
+        return {}
+    return confident_slots(model.predict(s), missing, SLOT_THRESHOLD)
+
+def _cached_infer_prefs_from_history(messages) -> Dict[str, Any]:
+    tokens = []
+    for m in messages[-30:]:
+        if isinstance(m, HumanMessage):
+            tokens.extend(_normalize_tokens(_coerce_to_text(m.content)) + ["|"])
+    hit = HISTORY_CACHE.lookup(tokens)
+    if hit is not None:
+        return hit.selections
+    data = _infer_prefs_from_history(messages)
+    HISTORY_CACHE.store(tokens, data)
+    return data
+
 # =========================
 # LangGraph 노드
 # =========================
@@ -339,9 +435,15 @@ def parse_user_input(state: Dict[str, Any]):
     """
     1) 현재 문장 규칙 파싱
     2) 후속질문(같은 조건/도/또/역시 + 카테고리)일 때는 '이전 확정값'을 고정 유지하고 카테고리만 교체
-    3) 부족하면 과거대화로 백필 → 그래도 부족하면 LLM JSON 보정
+    3) 부족하면 과거대화로 백필 → 로컬 슬롯 분류기 → 분류기가 확신하지 못한 칸만 LLM JSON 보정
     4) 'prefs'에 이번 턴 선택값 저장 (다음 턴 후속질문에서 사용)
+    - 턴 시작 시각 기준으로 deadline(시간 예산)을 새로 정함
+    - 오프라인 모드(llm_mode="offline")면 3)의 LLM 단계 없이 규칙 + 저장된 prefs + 분류기만 사용
     """
+    offline = _offline_requested(state)
+    turn = {"deadline": new_deadline(), "degraded_steps": [], "category_mode": "switch",
+            "llm_mode": "offline" if offline else "online"}
+
     # 마지막 사용자 메시지
     last = ""
     for m in reversed(state.get("messages", [])):
@@ -357,8 +459,9 @@ def parse_user_input(state: Dict[str, Any]):
                 "skin_type": "알 수 없음",
                 "concerns": ["알 수 없음"],
                 "category": "알 수 없음",
-            }
-        }  
+            },
+            **turn,
+        }
 
     # 직전 확정 조건(있으면 최우선으로 사용)
     last_confirmed = state.get("last_confirmed_selections") or {}
@@ -375,6 +478,7 @@ def parse_user_input(state: Dict[str, Any]):
 
     # 카테고리 의도 추출 (switch / add)
     mode, cats = _extract_category_intent(last)
+    followup_signal = followup_signal or mode == "add"
     cat_from_intent = cats[0] if cats else (parsed.get("category") if parsed.get("category") != "알 수 없음" else None)
 
     # 사용자 입력에 '명시적' 피부타입/고민이 들어있는지 확인
@@ -396,13 +500,34 @@ def parse_user_input(state: Dict[str, Any]):
                 parsed["concerns"] = prev_concerns or parsed.get("concerns", ["알 수 없음"])
         parsed["category"] = cat_from_intent
 
-    # 3) 누락값 백필(이전 대화 → LLM JSON 순)
+    # 2-1) add 모드("토너도", "선크림도"): 이전 카테고리에 새 카테고리만 추가 → add_categories 노드에서 증분 계산
+    if mode == "add" and last_confirmed and (state.get("top_products") or state.get("top_products_by_cat")):
+        prev_multi = list(state.get("multi_categories") or [prev_category])
+        turn["category_mode"] = "add"
+        turn["multi_categories"] = list(dict.fromkeys(
+            c for c in prev_multi + cats if c and c != "알 수 없음"
+        ))
+    elif BASIC_SET_PATTERN.search(last):
+        # 2-2) 기초 라인: 카테고리별 병렬 분기(Send)로 계산 → assemble_routine에서 합침
+        turn["category_mode"] = "routine"
+        turn["multi_categories"] = list(ROUTINE_CATEGORIES)
+        turn["top_products_by_cat"] = []
+        parsed["category"] = ROUTINE_LABEL
+    else:
+        # 새 조건(switch) → 이전 멀티 카테고리 세션 초기화
+        turn["multi_categories"] = []
+        turn["top_products_by_cat"] = []
+
+    # 3) 누락값 백필(이전 대화 → LLM JSON 순, 오프라인이면 저장된 prefs/직전 확정값만)
     if (
         parsed["skin_type"] == "알 수 없음"
         or parsed["concerns"] == ["알 수 없음"]
         or parsed["category"] == "알 수 없음"
     ):
-        defaults = _infer_prefs_from_history(state.get("messages", []))
+        if offline:
+            defaults = {**(state.get("prefs") or {}), **last_confirmed}
+        else:
+            defaults = _cached_infer_prefs_from_history(state.get("messages", []))
         if parsed["skin_type"] == "알 수 없음":
             parsed["skin_type"] = defaults.get("skin_type", "알 수 없음")
         if parsed["concerns"] == ["알 수 없음"]:
@@ -410,18 +535,23 @@ def parse_user_input(state: Dict[str, Any]):
         if parsed["category"] == "알 수 없음":
             parsed["category"] = defaults.get("category", "알 수 없음")
 
-    if (
-        parsed["skin_type"] == "알 수 없음"
-        or parsed["concerns"] == ["알 수 없음"]
-        or parsed["category"] == "알 수 없음"
-    ):
-        fill = _llm_json_parse(last)
-        if parsed["skin_type"] == "알 수 없음":
-            parsed["skin_type"] = fill["skin_type"]
-        if parsed["concerns"] == ["알 수 없음"]:
-            parsed["concerns"] = fill["concerns"]
-        if parsed["category"] == "알 수 없음":
-            parsed["category"] = fill["category"]
+    missing = _missing_slots(parsed)
+    if missing:
+        SLOT_COUNTERS["calls"] += 1
+        sure = _classify_slots(last, missing)
+        parsed.update(sure)
+        unsure = [k for k in missing if k not in sure]
+        if unsure and not offline:
+            SLOT_COUNTERS["escalated"] += 1
+            fill = _cached_llm_json_parse(last)
+            for k in unsure:
+                parsed[k] = fill[k]
+            if SLOT_LOG_PATH:
+                log_utterance(SLOT_LOG_PATH, last, fill)
+        elif unsure:
+            SLOT_COUNTERS["offline_unresolved"] += 1
+        else:
+            SLOT_COUNTERS["resolved"] += 1
 
     # 안전 보정
     if not parsed.get("skin_type"):
@@ -433,7 +563,7 @@ def parse_user_input(state: Dict[str, Any]):
 
     # 다음 턴용 임시 메모
     state["prefs"] = parsed
-    return {"user_selections": parsed, "prefs": parsed}
+    return {"user_selections": parsed, "prefs": parsed, **turn}
 
 
 def check_parsing_status(state: Dict[str, Any]):
@@ -445,7 +575,14 @@ def check_parsing_status(state: Dict[str, Any]):
     has_cat = s.get("category") and s["category"] != "알 수 없음"
     has_skin = s.get("skin_type") and s["skin_type"] != "알 수 없음"
     has_conc = s.get("concerns") and s["concerns"] != ["알 수 없음"]
-    return "success" if (has_cat or has_skin or has_conc) else "clarification_needed"
+    if not (has_cat or has_skin or has_conc):
+        return "clarification_needed"
+    mode = state.get("category_mode")
+    if mode == "add":
+        return "add_categories"
+    if mode == "routine":
+        return "routine"
+    return "success"
 
 def ask_for_clarification(state: Dict[str, Any]):
     s = state["user_selections"]
@@ -459,8 +596,183 @@ def ask_for_clarification(state: Dict[str, Any]):
     return {"messages": [AIMessage(content=text)]}
 
 
+# =========================
+# 추천 결과 캐시 (stale-while-revalidate)
+# =========================
+RESULT_CACHE = ResultCache(fresh_ttl=600, stale_ttl=86400)
+
+def _result_cache_key(selections: Dict[str, Any], offline: bool = False):
+    # 카탈로그 버전(원본 CSV 해시)이 키에 포함 → 데이터 갱신 시 자동 무효화
+    # 오프라인 결과(웹 요약 없음)는 별도 키 → 온라인 응답을 덮어쓰지 않음
+    version = load_catalog(DATA_PATH).version
+    return make_key(selections, version + ":offline" if offline else version)
+
+def _recompute_recommendation(selections: Dict[str, Any], offline: bool = False):
+    """백그라운드 재계산. 저장은 create_recommendation_message가 직접 수행."""
+    st: Dict[str, Any] = {"user_selections": selections, "messages": [],
+                          "llm_mode": "offline" if offline else "online"}
+    st.update(get_ingredients(st))
+    st.update(find_products(st))
+    if st.get("top_products"):
+        create_recommendation_message(st)
+    return None
+
+def _cached_entry(sel: Dict[str, Any], offline: bool = False):
+    """
+    결과 캐시 조회(stale이면 백그라운드 재계산 예약). 없으면 None.
+    오프라인이면 온라인 결과(더 풍부함)를 먼저 찾고, 없으면 오프라인 결과.
+    """
+    for off in ([False, True] if offline else [False]):
+        key = _result_cache_key(sel, off)
+        got = RESULT_CACHE.get(key)
+        if got is None:
+            continue
+        entry, stale = got
+        if stale and off == offline:
+            RESULT_CACHE.revalidate(key, lambda: _recompute_recommendation(dict(sel), off))
+        return entry
+    return None
+
+def lookup_cached_recommendation(state: Dict[str, Any]):
+    """
+    같은 (피부/고민/카테고리/카탈로그 버전) 조합의 추천이 캐시에 있으면 즉시 응답.
+    - fresh: 그대로 반환
+    - stale: 그대로 반환 + 백그라운드 재계산 예약
+    """
+    sel = state.get("user_selections", {}) or {}
+    entry = _cached_entry(sel, _is_offline(state))
+    if entry is None:
+        return {"result_source": "miss"}
+    text = entry["recommendation_message"]
+    return {
+        "messages": [AIMessage(content=text)],
+        "recommendation_message": text,
+        "top_products": entry["top_products"],
+        "top_products_by_cat": [_cat_entry(sel, entry["top_products"], text)],
+        "key_ingredients": entry["key_ingredients"],
+        "last_confirmed_selections": sel,
+        "result_source": "cache",
+    }
+
+def _cat_entry(sel: Dict[str, Any], products: List[Dict[str, Any]], message: str) -> Dict[str, Any]:
+    """top_products_by_cat 한 칸 — 카드를 만든 시점에 카테고리/제품/메시지를 함께 기록."""
+    return {"category": sel.get("category", "알 수 없음"), "products": products, "message": message}
+
+def check_cache_status(state: Dict[str, Any]):
+    """적중이면 종료, 미스면 핵심 성분 생성(LLM)과 후보 필터링을 병렬로 시작."""
+    if state.get("result_source") == "cache":
+        return "hit"
+    return ["get_ingredients", "filter_candidates"]
+
+
 def get_ingredients(state: Dict[str, Any]):
     s = state["user_selections"]
+    # 미리 계산된 조합 테이블에 있으면 LLM 호출 생략
+    table = load_topk_table(DATA_PATH)
+    stored = table.key_ingredients(s) if table else None
+    if stored is not None:
+        return {"key_ingredients": list(stored)}
+    if _is_offline(state):
+        return {"key_ingredients": _offline_key_ingredients(s)}
+    return {"key_ingredients": _llm_key_ingredients(s)}
+
+# 오프라인 핵심 성분: 고민별 효능 성분 표 (노트북 efficacy_ingredients 기준 + 카탈로그 표기)
+EFFICACY_INGREDIENTS: Dict[str, List[str]] = {
+    "보습": ["하이알루로닉애씨드", "소듐하이알루로네이트", "세라마이드엔피", "글리세린", "스쿠알란", "베타-글루칸", "판테놀"],
+    "진정": ["병풀추출물", "마데카소사이드", "판테놀", "알란토인", "약모밀추출물", "베타-글루칸"],
+    "미백": ["나이아신아마이드", "알부틴", "아스코빅애씨드", "트라넥사믹애씨드", "아스코빌글루코사이드"],
+    "주름/탄력": ["아데노신", "아세틸헥사펩타이드-8", "트라이펩타이드-1", "레티놀", "토코페롤"],
+    "모공케어": ["나이아신아마이드", "살리실릭애씨드", "징크글루코네이트", "티트리잎추출물", "병풀추출물"],
+    "피지조절": ["나이아신아마이드", "살리실릭애씨드", "징크글루코네이트", "티트리잎추출물", "병풀추출물"],
+}
+# CONCERN_SYNONYMS가 그대로 두는 짧은 표기
+EFFICACY_INGREDIENTS["모공"] = EFFICACY_INGREDIENTS["모공케어"]
+EFFICACY_INGREDIENTS["피지"] = EFFICACY_INGREDIENTS["피지조절"]
+# 고민을 모를 때 피부 타입 기본 고민
+SKIN_DEFAULT_CONCERNS: Dict[str, List[str]] = {
+    "건성": ["보습"], "중성": ["보습"], "민감성": ["진정"], "아토피성": ["진정", "보습"],
+    "지성": ["피지조절"], "복합성": ["보습", "피지조절"],
+}
+
+@lru_cache(maxsize=512)
+def _offline_key_ingredients_cached(skin: str, concerns: tuple) -> tuple:
+    cs = [c for c in concerns if c in EFFICACY_INGREDIENTS] or SKIN_DEFAULT_CONCERNS.get(skin, ["보습"])
+    # 고민별 목록을 번갈아 뽑아 5개 (여러 고민이 고르게 반영되도록)
+    picked: List[str] = []
+    for rank in range(max(len(EFFICACY_INGREDIENTS[c]) for c in cs)):
+        for c in cs:
+            if rank < len(EFFICACY_INGREDIENTS[c]):
+                picked.append(EFFICACY_INGREDIENTS[c][rank])
+    return tuple(_resolve_to_catalog(list(dict.fromkeys(picked)))[:5])
+
+def _offline_key_ingredients(s: Dict[str, Any]) -> List[str]:
+    concerns = tuple(CONCERN_SYNONYMS.get(c, c) for c in (s.get("concerns") or []) if c and c != "알 수 없음")
+    return list(_offline_key_ingredients_cached(s.get("skin_type") or "알 수 없음", concerns))
+
+# 핵심 성분 후보 = 카탈로그에 실제로 들어 있는 성분 중 용매/보존제/점증제 등 기능성 베이스를 뺀 것
+BASE_INGREDIENT_KEYWORDS = (
+    "정제수", "글라이콜", "다이올", "이디티에이", "카보머", "잔탄검", "트로메타민", "폴리머",
+    "실록세인", "메티콘", "하이드록사이드", "페녹시에탄올", "하이드록시아세토페논", "에틸헥실글리세린",
+    "향료", "시트릭애씨드", "스테아레이트", "트라이글리세라이드", "세테아릴", "글루코사이드",
+)
+MAX_KEY_VOCAB = 400          # 구조화 출력 enum 상한(OpenAI: 값 1000개 / 문자 15,000 이내)
+MAX_KEY_VOCAB_CHARS = 14000
+
+@lru_cache(maxsize=4)
+def _key_ingredient_vocab(version: str) -> tuple:
+    """카탈로그 버전별 핵심 성분 후보(빈도순). enum 제약에 그대로 사용."""
+    catalog = load_catalog(DATA_PATH)
+    ids, counts = np.unique(np.asarray(catalog.ing_ids), return_counts=True)
+    out, chars = [], 0
+    for i in ids[np.argsort(-counts, kind="stable")]:
+        name = catalog.vocab.names[int(i)]
+        if not name or any(k in name for k in BASE_INGREDIENT_KEYWORDS):
+            continue
+        if len(out) >= MAX_KEY_VOCAB or chars + len(name) > MAX_KEY_VOCAB_CHARS:
+            break
+        out.append(name)
+        chars += len(name)
+    return tuple(out)
+
+def _resolve_to_catalog(terms: List[str]) -> List[str]:
+    """
+    자유 텍스트 성분명 → 카탈로그 성분명. (정규화 색인: 한국어/INCI/동의어/성분군/오타 → 부분 일치 중 가장 흔한 성분)
+    못 찾은 성분은 버림 → 매칭이 항상 카탈로그 위에서 이루어짐.
+    """
+    catalog = load_catalog(DATA_PATH)
+    canon = load_canon(DATA_PATH)
+    freq = np.bincount(np.asarray(catalog.ing_ids, dtype=np.int64), minlength=len(catalog.vocab))
+    out: List[str] = []
+    for t in terms:
+        t = str(t or "").strip()
+        idx = canon.resolve(t)
+        if idx is None:
+            cand = catalog.vocab.ids_containing(t)
+            cand = cand[cand < len(freq)]
+            if len(cand) and freq[cand].max() > 0:
+                idx = int(cand[np.argmax(freq[cand])])
+        if idx is not None and catalog.vocab.names[idx] not in out:
+            out.append(catalog.vocab.names[idx])
+    return out
+
+@lru_cache(maxsize=4)
+def _structured_key_llm(version: str):
+    """성분명을 카탈로그 후보 enum으로 제약한 구조화 출력 LLM."""
+    schema = {
+        "title": "KeyIngredients",
+        "type": "object",
+        "properties": {
+            "ingredients": {
+                "type": "array",
+                "items": {"type": "string", "enum": list(_key_ingredient_vocab(version))},
+            }
+        },
+        "required": ["ingredients"],
+        "additionalProperties": False,
+    }
+    return get_llm().with_structured_output(schema, method="json_schema", strict=True)
+
+def _llm_key_ingredients(s: Dict[str, Any]) -> List[str]:
     skin_type = s.get("skin_type", "알 수 없음")
     concerns = s.get("concerns", ["알 수 없음"])
     skin_label = skin_type if skin_type != "알 수 없음" else "일반적인"
@@ -479,55 +791,310 @@ def get_ingredients(state: Dict[str, Any]):
         지침: 근거 기반 활성 위주, 보조/용매/향/보존제/UV필터 제외.
         출력: 쉼표로만 구분된 한 줄
         """
-    resp = llm.invoke(prompt_text)
-    key_ingredients_str = resp.content.strip()
-    return {"key_ingredients": [ing.strip().lower() for ing in key_ingredients_str.split(",") if ing.strip()]}
+
+    # 1) 카탈로그 성분 enum으로 제약한 구조화 출력 → 항상 카탈로그에 있는 이름
+    version = load_catalog(DATA_PATH).version
+    try:
+        data = LLM_CALLER.call(lambda: _structured_key_llm(version).invoke(
+            prompt_text + "\n        (출력 형식 대신 ingredients 배열에 후보 목록의 성분명 그대로 5개)"))
+        picked = [str(x) for x in (data or {}).get("ingredients", []) if x]
+        if picked:
+            return list(dict.fromkeys(picked))[:5]
+    except Exception:
+        pass
+
+    # 2) 폴백: 자유 텍스트 → 카탈로그 성분명으로 해석
+    try:
+        key_ingredients_str = _invoke_llm(prompt_text).content.strip()
+    except Exception:
+        # LLM 장애/서킷 open → 고민별 효능 성분 표(오프라인 모드와 동일)
+        return _offline_key_ingredients(s)
+    return _resolve_to_catalog([ing.strip().lower() for ing in key_ingredients_str.split(",") if ing.strip()])
 
 from pathlib import Path
 DATA_PATH = Path(__file__).parent / "product_data.csv"
 
-def find_products(state: Dict[str, Any]):
+def filter_candidates(state: Dict[str, Any]):
+    """
+    카테고리/고민 조건으로 후보 행 번호만 추림 (핵심 성분 불필요 → get_ingredients와 병렬 실행).
+    - 카테고리가 없으면 전 카테고리별 후보
+    """
+    sel = state["user_selections"]
+    cat = sel.get("category")
+    cats = [cat] if cat and cat != "알 수 없음" else ALL_CATEGORIES
+    return {"candidates": {c: filter_candidate_positions(str(DATA_PATH), {**sel, "category": c}) for c in cats}}
+
+def _rank_live(sel: Dict[str, Any], key_ings: List[str], candidates: Dict[str, List[int]] = None):
     """
+    실시간 랭킹 → [(카탈로그 행 번호, 매칭 성분, 유해성 점수)]
     - 카테고리가 있으면: 해당 카테고리 상위 결과
     - 카테고리가 없으면: 전 카테고리를 훑어 카테고리별 후보 1개씩 수집 → 상위 3개
+    - candidates(filter_candidates 결과)가 있으면 필터링을 건너뛰고 점수화만
     """
-    sel = state["user_selections"]
-    key_ings = state.get("key_ingredients", [])
     cat = sel.get("category")
 
+    def _ranked(c: str):
+        if candidates is not None and c in candidates:
+            return score_positions(str(DATA_PATH), candidates[c], key_ings)
+        return score_positions(str(DATA_PATH), filter_candidate_positions(str(DATA_PATH), {**sel, "category": c}), key_ings)
+
     # 카테고리 지정 O → 단일 카테고리
     if cat and cat != "알 수 없음":
-        top = find_and_rank_products(str(DATA_PATH), sel, key_ings) or []
-        return {"top_products": top}
+        return _ranked(cat)
 
     # 카테고리 지정 X → 전 카테고리 스캔
     bucket = []
     for c in ALL_CATEGORIES:
-        sub_sel = {**sel, "category": c}
-        items = find_and_rank_products(str(DATA_PATH), sub_sel, key_ings) or []
+        items = _ranked(c)
         if items:
             bucket.append(items[0])
     # 상위 3개만 노출(없으면 빈 리스트)
-    return {"top_products": bucket[:3]}
+    return bucket[:3]
+
+def find_products(state: Dict[str, Any]):
+    """
+    get_ingredients + filter_candidates 합류(join) 후 점수화.
+    조합 테이블(topk_table) O(1) 조회 → 없거나 핵심 성분이 다르면 실시간 랭킹.
+    """
+    sel = state["user_selections"]
+    key_ings = state.get("key_ingredients", [])
+
+    table = load_topk_table(DATA_PATH)
+    ranked = table.ranked(sel, key_ings) if table else None
+    if ranked is None:
+        ranked = _rank_live(sel, key_ings, state.get("candidates"))
+    top = [product_record(str(DATA_PATH), pos, found, harm) for pos, found, harm in ranked]
+    return {"top_products": top, "result_source": "ranking"}
+
+def check_products_found(state: Dict[str, Any]):
+    """규칙 기반 랭킹 결과가 비었으면 로컬 임베딩 검색으로 우회."""
+    return "found" if state.get("top_products") else "empty"
+
+def retrieve_products(state: Dict[str, Any]):
+    """
+    자유 문장(예: '피부 진정에 좋은 토너')으로 로컬 하이브리드 검색(BM25 + 임베딩, RRF).
+    - LLM/외부 벡터 DB 호출 없음 (retrieval.hybrid_search)
+    - 카테고리가 확정돼 있으면 그 안에서만 검색
+    """
+    last = ""
+    for m in reversed(state.get("messages", [])):
+        if isinstance(m, HumanMessage):
+            last = _coerce_to_text(m.content)
+            break
+
+    sel = state.get("user_selections", {}) or {}
+    hits = hybrid_search(last, k=3, category=sel.get("category"), csv_path=DATA_PATH)
+
+    catalog = load_catalog(DATA_PATH)
+    canon = load_canon(DATA_PATH)
+    key_lw = [str(k).lower() for k in state.get("key_ingredients", []) if k]
+    top = []
+    for pos, score in hits:
+        row = catalog.matrix.row(pos)
+        found = [k for k in key_lw if np.isin(row, canon.match_ids(k)).any()]
+        price = catalog.price[pos]
+        top.append({
+            "brand": catalog.text("brand", pos),
+            "name": catalog.text("name", pos),
+            "price": int(price) if np.isfinite(price) else "?",
+            "volume": catalog.text("volume", pos),
+            "link": catalog.text("link", pos),
+            "match_count": len(found),
+            "harmfulness_score": float(catalog.harm[pos]),
+            "found_ingredients": found,
+            "retrieval_score": round(score, 4),
+        })
+    # 자유 문장 검색 결과는 프로필 키로 재사용할 수 없으므로 캐시 대상 아님
+    return {"top_products": top, "result_source": "retrieval"}
+
+# =========================
+# 멀티 카테고리 add 모드 ("토너도", "선크림도")
+# =========================
+def add_categories(state: Dict[str, Any]):
+    """
+    새로 추가된 카테고리만 랭킹 + 보강하고 이전 카드와 합쳐 top_products_by_cat에 누적.
+    - key_ingredients는 이전 턴 값을 재사용(LLM 호출 없음)
+    - 이전 카드는 top_products_by_cat만 사용 (추천 메시지를 만들 때 함께 기록됨)
+    - 카테고리별 결과는 결과 캐시(RESULT_CACHE)를 먼저 확인
+    - 랭킹이 비면 메인 경로와 같이 로컬 검색(retrieve_products)으로 우회
+    - top_products는 비어 있지 않은 가장 최근 카드 (후속 질문 라우팅이 끊기지 않도록)
+    """
+    sel = state.get("user_selections", {}) or {}
+    by_cat = list(state.get("top_products_by_cat") or [])
+    mode = state.get("llm_mode")
+    key_ings = state.get("key_ingredients") or get_ingredients({"user_selections": sel, "llm_mode": mode})["key_ingredients"]
+    done = {e["category"] for e in by_cat}
+    new_cats = [c for c in (state.get("multi_categories") or []) if c not in done]
+
+    degraded: List[str] = list(state.get("degraded_steps") or [])
+    added = []
+    for c in new_cats:
+        sub_sel = {**sel, "category": c}
+        cached = _cached_entry(sub_sel, _is_offline(state))
+        if cached is not None:
+            entry = {"category": c, "products": cached["top_products"], "message": cached["recommendation_message"]}
+        else:
+            sub = {"user_selections": sub_sel, "key_ingredients": key_ings, "llm_mode": mode,
+                   "deadline": state.get("deadline"), "degraded_steps": degraded,
+                   "messages": state.get("messages", [])}
+            sub.update(find_products(sub))
+            if not sub["top_products"]:
+                sub.update(retrieve_products(sub))
+            out = create_recommendation_message(sub)
+            degraded = out.get("degraded_steps", degraded)
+            entry = {"category": c, "products": sub["top_products"], "message": out["recommendation_message"]}
+        by_cat.append(entry)
+        added.append(entry)
+
+    if added:
+        lines = [f"➕ **{e['category']}** 추천을 추가했어요.\n\n{e['message']}" for e in added]
+    else:
+        lines = ["이미 추천해 드린 카테고리예요. 위 추천을 참고해 주세요. 🙂"]
+    prev_cats = [e["category"] for e in by_cat if e not in added]
+    if prev_cats:
+        lines.append(f"(이전 추천 유지: {', '.join(prev_cats)})")
+    text = "\n\n".join(lines)
+
+    shown = [e for e in added[::-1] + by_cat[::-1] if e["products"]]
+    last = shown[0] if shown else (added[-1] if added else by_cat[-1])
+    return {
+        "messages": [AIMessage(content=text)],
+        "recommendation_message": text,
+        "top_products": last["products"] or state.get("top_products", []),
+        "top_products_by_cat": by_cat,
+        "multi_categories": [e["category"] for e in by_cat],
+        "key_ingredients": key_ings,
+        "last_confirmed_selections": {**sel, "category": last["category"]},
+        "degraded_steps": degraded,
+    }
+
+
+# =========================
+# 기초 라인 (카테고리별 Send 병렬 분기 → assemble_routine)
+# =========================
+BASIC_SET_PATTERN = re.compile(r"기초\s*(화장품|제품|세트|라인|추천)?")
+ROUTINE_LABEL = "기초 라인"
+# 사용 순서(클렌징 → 토너 → 세럼 → 로션 → 크림 → 선크림)
+ROUTINE_CATEGORIES = ["클렌징 폼", "스킨/토너", "에센스/앰플/세럼", "로션/에멀전", "크림", "선크림"]
+
+def prepare_routine(state: Dict[str, Any]):
+    """분기 공통 입력(key_ingredients)을 한 번만 준비하고 이전 분기 결과를 비움."""
+    sel = state.get("user_selections", {}) or {}
+    key_ings = get_ingredients({"user_selections": {**sel, "category": "알 수 없음"},
+                                "llm_mode": state.get("llm_mode")})["key_ingredients"]
+    text = f"사용자 정보에 맞춰 **{ROUTINE_LABEL}** 분석을 시작할게요! 🔬"
+    return {"key_ingredients": key_ings, "routine_parts": None, "messages": [AIMessage(content=text)]}
+
+def fan_out_routine(state: Dict[str, Any]):
+    """카테고리마다 routine_branch로 Send (LangGraph 런타임이 병렬 실행)."""
+    sel = state.get("user_selections", {}) or {}
+    return [
+        Send("routine_branch", {
+            "user_selections": {**sel, "category": c},
+            "key_ingredients": state.get("key_ingredients", []),
+            "deadline": state.get("deadline"),
+            "llm_mode": state.get("llm_mode"),
+        })
+        for c in (state.get("multi_categories") or ROUTINE_CATEGORIES)
+    ]
+
+def routine_branch(state: Dict[str, Any]):
+    """
+    한 카테고리의 랭킹 + 보강(카테고리당 1개). 끝나는 대로 카드 메시지를 내보냄(스트리밍 조기 노출).
+    - 기초 라인용 1개 카드는 일반 추천(3개)과 모양이 달라 결과 캐시에 저장하지 않음
+    """
+    sel = state["user_selections"]
+    sub: Dict[str, Any] = {"user_selections": sel, "key_ingredients": state.get("key_ingredients", []),
+                           "deadline": state.get("deadline"), "degraded_steps": [],
+                           "llm_mode": state.get("llm_mode")}
+    sub.update(find_products(sub))
+    sub["top_products"] = sub["top_products"][:1]
+    sub["result_source"] = "routine"
+    part = {"category": sel["category"], "products": sub["top_products"], "message": "", "degraded": []}
+    if not sub["top_products"]:
+        return {"routine_parts": [part]}
+    out = create_recommendation_message(sub)
+    part["message"] = out["recommendation_message"]
+    part["degraded"] = out.get("degraded_steps", [])
+    card = f"🧴 **{sel['category']}**\n\n{part['message']}"
+    return {"routine_parts": [part], "messages": [AIMessage(content=card)]}
+
+def assemble_routine(state: Dict[str, Any]):
+    """분기 결과를 사용 순서대로 정렬해 루틴 요약을 만들고 top_products_by_cat에 저장."""
+    order = {c: i for i, c in enumerate(ROUTINE_CATEGORIES)}
+    parts = sorted(state.get("routine_parts") or [], key=lambda p: order.get(p["category"], len(order)))
+    found = [p for p in parts if p["products"]]
+    missing = [p["category"] for p in parts if not p["products"]]
+
+    lines = [f"✨ **{ROUTINE_LABEL}** 추천이 완성됐어요. (사용 순서)"]
+    for i, p in enumerate(found, 1):
+        top = p["products"][0]
+        lines.append(f"{i}. {p['category']} — {top.get('name', '')} ({top.get('brand', '-')}, {top.get('price', '?')}원)")
+    if missing:
+        lines.append(f"(조건에 맞는 제품이 없는 단계: {', '.join(missing)})")
+    text = "\n".join(lines)
+
+    degraded = list(state.get("degraded_steps") or [])
+    for p in parts:
+        degraded += [f"{p['category']}:{d}" for d in p.get("degraded", [])]
+    by_cat = [{"category": p["category"], "products": p["products"], "message": p["message"]} for p in found]
+    return {
+        "messages": [AIMessage(content=text)],
+        "recommendation_message": "\n\n".join([text] + [p["message"] for p in found]),
+        "top_products": [p["products"][0] for p in found],
+        "top_products_by_cat": by_cat,
+        "multi_categories": [p["category"] for p in found],
+        "last_confirmed_selections": state.get("user_selections", {}),
+        "degraded_steps": degraded,
+    }
+
 
 # [ADD] 제품별 '추천 이유' 웹 요약 (부족하면 성분 기반 폴백)
-def _fetch_reasons_for_products(products: List[dict], selections: Dict[str, Any], key_ingredients: List[str]) -> List[str]:
+def _fetch_reasons_for_products(products: List[dict], selections: Dict[str, Any], key_ingredients: List[str],
+                                deadline: float = None, degraded: List[str] = None,
+                                offline: bool = False) -> List[str]:
     reasons: List[str] = []
+    degraded = degraded if degraded is not None else []
+    canon = load_canon(DATA_PATH)
+    for i, p in enumerate(products[:3]):
+        # 카드의 '효능 성분'과 같은 기준(정규명 dedupe)으로 표기 통일
+        matched = ", ".join(sorted(canon.dedupe_names([m for m in (p.get("found_ingredients") or []) if m]))) \
+                  or ", ".join([k for k in (key_ingredients or []) if k])
+        if offline:
+            reasons.append(_local_reason(p, selections, matched))
+            continue
+        # 시간 예산 초과 시 매칭 성분 기반 한 줄로 대체
+        fallback = (lambda m=matched: f"{m} 함유로 조건에 부합" if m else "핵심 성분과 저자극 지표가 조건에 부합")
+        reasons.append(run_within(
+            f"reason:{i + 1}", deadline,
+            lambda p=p, m=matched: _reason_for_product(p, selections, m),
+            fallback, degraded,
+        ))
+    return reasons
+
+def _local_reason(p: dict, selections: Dict[str, Any], matched: str) -> str:
+    """오프라인 추천 이유: 매칭 성분 + 고민 + 유해성 점수로 한 줄 (웹/LLM 없음)."""
+    concerns = [c for c in selections.get("concerns", []) if c and c != "알 수 없음"]
+    bits = []
+    if matched:
+        names = [m.strip() for m in matched.split(",") if m.strip()]
+        bits.append(f"{', '.join(names[:3])} 함유" + (f"로 {'·'.join(concerns[:2])} 고민에 적합" if concerns else ""))
+    harm = p.get("harmfulness_score")
+    if isinstance(harm, (int, float)) and harm <= 1.0:
+        bits.append("유해성 지표 낮음")
+    return ", ".join(bits) or "핵심 성분과 저자극 지표가 조건에 부합"
+
+def _reason_for_product(p: dict, selections: Dict[str, Any], matched: str) -> str:
     skin = selections.get("skin_type", "알 수 없음")
     concerns = ", ".join([c for c in selections.get("concerns", []) if c and c != "알 수 없음"]) or "알 수 없음"
     category = selections.get("category", "알 수 없음")
+    brand = (p.get("brand") or p.get("브랜드명") or "").strip()
+    name = (p.get("name") or p.get("제품명") or "").strip()
 
-    for p in products[:3]:
-        brand = (p.get("brand") or p.get("브랜드명") or "").strip()
-        name = (p.get("name") or p.get("제품명") or "").strip()
-
-        matched = ", ".join(sorted(set([m for m in (p.get("found_ingredients") or []) if m]))) \
-                  or ", ".join([k for k in (key_ingredients or []) if k])
-
-        query = f"{brand} {name} 성분 효과 리뷰 장단점 {category} {skin} {concerns}"
-        web_results = _search_prefer(query)
+    query = f"{brand} {name} 성분 효과 리뷰 장단점 {category} {skin} {concerns}"
+    web_results = _search_prefer(query)
 
-        prompt = f"""
+    prompt = f"""
 역할: 당신은 화장품 추천 근거 요약가입니다.
 상황: 사용자는 {skin} 피부, 고민은 {concerns}, 카테고리는 {category}입니다.
 제품: {brand} {name}
@@ -545,17 +1112,14 @@ def _fetch_reasons_for_products(products: List[dict], selections: Dict[str, Any]
 - 자료 부족 시 매칭 성분 기반으로 작성
 - 출력: 한 줄만, 불릿/머리기호/따옴표 없이, 마침표 없이
 """
-        try:
-            resp = llm.invoke(prompt)
-            reason = (resp.content or "").strip().splitlines()[0]
-        except Exception:
-            reason = ""
+    try:
+        resp = _invoke_llm(prompt)
+        reason = (resp.content or "").strip().splitlines()[0]
+    except Exception:
+        reason = ""
 
-        import re as _re
-        reason = _re.sub(r"^[•\-\*\d\.\)\s]+", "", reason) or "핵심 성분과 저자극 지표가 조건에 부합"
-        reasons.append(reason)
-
-    return reasons
+    reason = re.sub(r"^[•\-\*\d\.\)\s]+", "", reason) or "핵심 성분과 저자극 지표가 조건에 부합"
+    return reason
 
 # --- [ADD] found_ingredients가 비었을 때, 웹 스니펫으로 효능 성분을 3~6개 추출하는 폴백 ---
 def infer_beneficial_ings_via_web(brand: str, name: str, fallback_key_ings: List[str]) -> List[str]:
@@ -577,7 +1141,7 @@ def infer_beneficial_ings_via_web(brand: str, name: str, fallback_key_ings: List
     ---
     """
     try:
-        resp = llm.invoke(prompt)
+        resp = _invoke_llm(prompt)
         txt = (resp.content or "").strip()
         # 줄바꿈으로 오는 경우도 대비해서 쉼표/줄바꿈을 모두 분리
         raw = [x.strip() for x in re.split(r"[,\n]", txt) if x.strip()]
@@ -601,11 +1165,20 @@ def infer_beneficial_ings_via_web(brand: str, name: str, fallback_key_ings: List
 
 
 # [ADD] 하단 '주의 성분' 생성 (효능 성분과 겹치면 [조건부]로 표기)
-def _fetch_warnings_for_ingredients(ingredients: List[str], efficacy_ings: List[str] = None) -> str:
-    if not ingredients:
-        return ""
-    efficacy_ings = [str(i or "").lower().strip() for i in (efficacy_ings or []) if str(i or "").strip()]
+# 로컬 안전성 KB(EWG 등급 + 큐레이션 표)로 결정적으로 계산, KB에 없는 성분만 웹+LLM 보강
+# 웹+LLM 판정은 성분 단위로 캐시(WARNING_CACHE) → 제품이 달라도 같은 성분은 다시 묻지 않음
+MAX_REMOTE_WARN_INGS = 8  # 웹+LLM에 넘기는 미등록 성분 수 (전성분 앞쪽 = 고함량 우선)
+WARNING_CACHE = IngredientWarningCache(cache_path_for(DATA_PATH))
 
+def _safety_kb():
+    return load_safety_kb(DATA_PATH, SAFE_BENIGN_INGS)
+
+def _remote_warnings(ingredients: List[str]) -> Optional[Dict[str, SafetyFact]]:
+    """
+    KB에 없는 성분만 웹 검색 + LLM으로 판정. 반환: {성분: SafetyFact} (경고 대상만).
+    호출 실패 또는 응답을 해석할 수 없으면(정확히 '없음'도 아니고 형식에 맞는 줄도 없음) None.
+    효능 성분/개수 제한/순서는 조립 시 로컬에서 적용하므로 프롬프트에 넣지 않음(성분 단위 캐시 가능).
+    """
     query = f"{', '.join(ingredients)} 화장품 유해성 주의사항"
     web_results = _search_prefer(query)
 
@@ -616,7 +1189,6 @@ def _fetch_warnings_for_ingredients(ingredients: List[str], efficacy_ings: List[
 {web_results}
 ---
 입력 성분(후보): {', '.join(ingredients)}
-효능 성분(겹치면 기본 [조건부]): {', '.join(efficacy_ings)}
 일반 안전/보습 성분(특별 근거 없으면 제외): {', '.join(SAFE_BENIGN_INGS)}
 
 지침:
@@ -624,24 +1196,89 @@ def _fetch_warnings_for_ingredients(ingredients: List[str], efficacy_ings: List[
    - 알레르기/자극 보고 빈도↑(향료/에센셜오일, 리모넨/리날룰/유제놀 등)
    - 산/레티노이드/벤조일퍼옥사이드 등 고농도·pH 의존 자극 가능
    - 논쟁성 UV 필터(옥시벤존/옥티녹세이트 등), 포름알데하이드 방출 방부제 등
-2) 효능 성분과 겹치면 기본 [조건부]로 표기하고 사유를 25자 이내로
+2) 사유는 25자 이내
 3) '일반 안전/보습' 리스트는 특별한 근거 없으면 제외
-4) 중복 제거, 3~5개 이내, 중요도 순
-출력(이 형식만):
+4) 경고할 성분이 없으면 '없음'만 출력
+출력(이 형식만, 후보 성분명 그대로):
 - 성분 — [위험|조건부] 한줄 이유
 - 성분 — [위험|조건부] 한줄 이유
 """
     try:
-        resp = llm.invoke(prompt)
+        resp = _invoke_llm(prompt)
         txt = (resp.content or "").strip()
     except Exception:
-        txt = ""
+        return None
+
+    if re.sub(r"[\s\-.'\"]", "", txt) == "없음":
+        return {}
+    out: Dict[str, SafetyFact] = {}
+    for ln in [ln.strip() for ln in txt.splitlines() if ln.strip()]:
+        # 구분자: — / – 또는 앞뒤 공백이 있는 - (성분명 속 하이픈 "1,2-헥산다이올"은 그대로)
+        m = re.match(r"^[-*•]?\s*(.+?)\s*(?:[—–]|\s-)\s*\[(위험|조건부)\]\s*(.*)$", ln)
+        if m:
+            out[m.group(1)] = SafetyFact(None, m.group(2), "web", m.group(3).strip())
+    return out or None
+
+def _warning_key(canon, ing: str) -> str:
+    # 정규 성분명(농도/구 표기 통일) 기준 — 사전 id와 달리 카탈로그가 갱신돼도 그대로 유효
+    return normalize(canon.name(ing, fuzzy=False))
+
+def _resolve_remote_warnings(ingredients: List[str], allow_remote: bool) -> Dict[str, SafetyFact]:
+    """
+    KB 밖 성분 → 성분별 SafetyFact (캐시 → 웹+LLM 순).
+    웹+LLM에서 언급되지 않은 후보는 '경고 없음'으로 캐시 (호출 실패/해석 불가 응답이면 캐시하지 않음).
+    응답의 성분명은 canon.key로 대조 (표기가 조금 바뀌어 돌아와도 같은 성분으로 인식).
+    """
+    canon = load_canon(DATA_PATH)
+    facts: Dict[str, SafetyFact] = {}
+    missing: List[str] = []
+    for ing in ingredients:
+        hit = WARNING_CACHE.get(_warning_key(canon, ing))
+        if hit is not None:
+            facts[ing] = hit
+        else:
+            missing.append(ing)
+    if not allow_remote or not missing:
+        return facts
+
+    batch = missing[:MAX_REMOTE_WARN_INGS]
+    remote = _remote_warnings(batch)
+    if remote is None:
+        return facts
+    by_key = {canon.key(k): v for k, v in remote.items()}
+    fresh = {}
+    for ing in batch:
+        facts[ing] = fresh[_warning_key(canon, ing)] = by_key.get(canon.key(ing)) or SafetyFact(None, "", "web", "")
+    WARNING_CACHE.put_many(fresh)
+    return facts
+
+def _fetch_warnings_for_ingredients(ingredients: List[str], efficacy_ings: List[str] = None,
+                                    allow_remote: bool = True) -> str:
+    """
+    제품 전성분 → '- 성분 — [위험|조건부] 이유' 최대 5줄.
+    성분별 판정(KB → 성분 캐시 → 웹+LLM)을 모은 뒤 순서/[조건부]/개수 규칙은 로컬에서 조립.
+    allow_remote=False: KB + 성분 캐시만 사용 (시간 예산 초과 시 폴백)
+    """
+    if not ingredients:
+        return ""
+    efficacy_ings = [str(i or "").strip() for i in (efficacy_ings or []) if str(i or "").strip()]
+    kb = _safety_kb()
+    uncovered = [i for i in dict.fromkeys(ingredients) if i and not kb.covers(i)]
+    extra = _resolve_remote_warnings(uncovered, allow_remote) if uncovered else {}
+    return format_warnings(kb.compose(ingredients, efficacy_ings, extra))
+
 
-    # 5줄 제한 & 불릿 정리
-    lines = [ln.strip() for ln in txt.splitlines() if ln.strip()]
-    if len(lines) > 5:
-        lines = lines[:5]
-    return "\n".join(lines)
+@lru_cache(maxsize=4)
+def _catalog_positions(version: str) -> Dict[str, int]:
+    catalog = load_catalog(DATA_PATH)
+    out: Dict[str, int] = {}
+    for i in range(len(catalog)):
+        out.setdefault(catalog.text("name", i), i)
+    return out
+
+def _catalog_pos(name: str):
+    """제품명 → 카탈로그 행 번호 (없으면 None)."""
+    return _catalog_positions(load_catalog(DATA_PATH).version).get(name)
 
 
 def create_recommendation_message(state: Dict[str, Any]):
@@ -653,6 +1290,7 @@ def create_recommendation_message(state: Dict[str, Any]):
         - 🧪 효능 성분  ← (매칭 성분이 있으면 우선 사용, 없으면 전성분에서 key_ingredients 교차검출)
         - ✅ 추천 이유(웹 요약)
         - ⚠️ 주의 성분  ← (제품별, 효능 성분과 겹치면 제외, [조건부] 표기 없음)
+    - 오프라인 모드: 추천 이유는 로컬 한 줄, 효능 성분은 key_ingredients, 주의 성분은 안전성 KB만
     """
     import re
     from langchain_core.messages import AIMessage
@@ -689,13 +1327,16 @@ def create_recommendation_message(state: Dict[str, Any]):
         lines.append(f"**🧪 효능 성분(분석 기준):** {', '.join(key_ings)}")
         lines.append("")
 
-    # 제품별 '추천 이유'
+    # 제품별 '추천 이유' (턴 시간 예산 안에서만 웹/LLM 보강, 초과 시 로컬 폴백)
+    deadline = state.get("deadline")
+    degraded: List[str] = list(state.get("degraded_steps") or [])
     selections = state.get("user_selections", {})
-    web_reasons = _fetch_reasons_for_products(top, selections, key_ings)
+    offline = _is_offline(state)
+    web_reasons = _fetch_reasons_for_products(top, selections, key_ings, deadline, degraded, offline)
 
     # 제품 카드
     medals = ["🥇", "🥈", "🥉"]
-    safe_set = {s.lower() for s in SAFE_BENIGN_INGS}
+    canon = load_canon(DATA_PATH)
 
     # 2) 제품 카드 (상위 3개)
     for i, p in enumerate(top[:3]):
@@ -712,20 +1353,37 @@ def create_recommendation_message(state: Dict[str, Any]):
 
         # --- 효능 성분: found_ingredients → 비었으면 웹 폴백 ---
         found = [m.strip() for m in p.get("found_ingredients", []) if m and str(m).strip()]
+        if not found and offline:
+            found = list(dict.fromkeys(key_ings))[:6]
         if not found:
             # 웹에서 3~6개 추출 + 마지막 안전망으로 key_ingredients 사용
-            found = infer_beneficial_ings_via_web(brand, name, state.get("key_ingredients", []))
-
-        eff_unique_list = sorted(set([x for x in found if x]))
+            fallback_ings = state.get("key_ingredients", [])
+            found = run_within(
+                f"efficacy:{i + 1}", deadline,
+                lambda b=brand, n=name, f=fallback_ings: infer_beneficial_ings_via_web(b, n, f),
+                lambda f=fallback_ings: list(dict.fromkeys(k.strip() for k in f if k and str(k).strip()))[:6],
+                degraded,
+            )
+
+        # 같은 성분의 다른 표기(INCI/염/농도 표기)는 정규명 하나로
+        eff_unique_list = sorted(canon.dedupe_names(found))
         eff_unique = ", ".join(eff_unique_list) if eff_unique_list else "정보 부족"
 
-        # --- 제품별 주의 성분: 효능 성분과 겹치면 제외 ---
-        caution_lines = _fetch_warnings_for_ingredients(eff_unique_list) if eff_unique_list else ""
+        # --- 제품별 주의 성분(전성분 기준, 카탈로그에 없으면 효능 성분 기준): 효능 성분과 겹치면 제외 ---
+        pos = _catalog_pos(name)
+        product_ings = load_catalog(DATA_PATH).ingredients(pos) if pos is not None else eff_unique_list
+        caution_lines = run_within(
+            f"warnings:{i + 1}", deadline,
+            lambda g=product_ings, e=eff_unique_list: _fetch_warnings_for_ingredients(g, e, allow_remote=not offline),
+            lambda g=product_ings, e=eff_unique_list: _fetch_warnings_for_ingredients(g, e, allow_remote=False),
+            degraded,
+        )
         caution_items = []
         if caution_lines:
+            eff_keys = {canon.key(e) for e in eff_unique_list}
             for ln in [ln.strip() for ln in caution_lines.splitlines() if ln.strip()]:
-                token = ln.split("—", 1)[0].replace("-", "").strip()
-                if token and token not in eff_unique_list and token not in caution_items:
+                token = ln.split("—", 1)[0].strip().lstrip("-").strip()
+                if token and canon.key(token) not in eff_keys and token not in caution_items:
                     caution_items.append(token)
         caution_text = ", ".join(caution_items) if caution_items else "없음"
 
@@ -742,9 +1400,196 @@ def create_recommendation_message(state: Dict[str, Any]):
             lines.append("")
 
     final_text = "\n".join(lines)
+    # 시간 예산 때문에 폴백된 결과는 캐시하지 않음
+    if state.get("result_source") == "ranking" and not degraded:
+        RESULT_CACHE.put(_result_cache_key(s, offline), {
+            "recommendation_message": final_text,
+            "top_products": top,
+            "key_ingredients": state.get("key_ingredients", []),
+        })
     return {
     "messages": [AIMessage(content=final_text)],
     "recommendation_message": final_text,
-    "last_confirmed_selections": s 
+    "top_products_by_cat": [_cat_entry(s, top, final_text)],
+    "last_confirmed_selections": s,
+    "degraded_steps": degraded,
 }
 
+
+# =========================
+# 후속 질문 (이전 추천 결과 재사용: 재랭킹/재보강 없음)
+# =========================
+FOLLOWUP_PATTERN = re.compile(
+    r"(\d\s*(번|위)|첫\s*번째|두\s*번째|세\s*번째|첫째|둘째|셋째|"
+    r"성분|더\s*싼|저렴|싼\s*거|가성비|가격|얼마|용량|링크|비교|차이|주의|자극)"
+)
+# 키워드가 없어도 직전 카드를 가리키는 지시어 / 의문형 ("이거 임산부가 써도 돼?")
+FOLLOWUP_REFERENCE = re.compile(
+    r"(이거|그거|저거|이것|그것|저것|이\s*제품|그\s*제품|얘|걔)|"
+    r"(\?|돼|될까|되나요|나요|까요|어때|인가요|는지)\s*[?.!~]*\s*$"
+)
+_ORDINALS = {"첫": 1, "두": 2, "세": 3, "첫째": 1, "둘째": 2, "셋째": 3}
+
+def _last_human_text(state: Dict[str, Any]) -> str:
+    for m in reversed(state.get("messages", [])):
+        if isinstance(m, HumanMessage):
+            return _coerce_to_text(m.content)
+    return ""
+
+def router(state: Dict[str, Any]):
+    """
+    직전 추천(top_products)에 대한 질문이면 follow_up, 아니면 new_request.
+    - 후속 키워드(가격/성분/n번 …) 또는 지시어·의문형(이거/그거/~돼?)이면 후속 질문
+    - 새 피부타입/카테고리를 말하면(조건 변경·추가) 새 요청. 지시어·의문형만 있는 경우는 새 고민도 새 요청
+    """
+    if not state.get("top_products"):
+        return "new_request"
+    text = _last_human_text(state)
+    keyword = bool(FOLLOWUP_PATTERN.search(text))
+    if not (keyword or FOLLOWUP_REFERENCE.search(text.strip())) or re.search(r"추천|찾아줘|골라줘", text):
+        return "new_request"
+    parsed = _rule_based_parse(text)
+    if parsed["skin_type"] != "알 수 없음" or parsed["category"] != "알 수 없음":
+        return "new_request"
+    if not keyword and parsed["concerns"] != ["알 수 없음"]:
+        return "new_request"
+    return "follow_up"
+
+def _referenced_index(text: str, n: int):
+    m = re.search(r"(\d)\s*(번|위)", text)
+    if m:
+        i = int(m.group(1)) - 1
+        return i if 0 <= i < n else None
+    m = re.search(r"(첫|두|세)\s*번째|(첫째|둘째|셋째)", text)
+    if m:
+        i = _ORDINALS[m.group(1) or m.group(2)] - 1
+        return i if i < n else None
+    return None
+
+def _cheaper_alternatives(state: Dict[str, Any], ref: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    """같은 카테고리·고민 조건에서 기준 가격보다 싼 제품 (가격 → 유해성 순, 카탈로그만 사용)."""
+    from utils import _normalize_category
+    top = state.get("top_products", []) or []
+    sel = state.get("user_selections", {}) or {}
+    prices = [float(p["price"]) for p in ([ref] if ref else top) if str(p.get("price", "")).replace(".", "", 1).isdigit()]
+    if not prices:
+        return []
+    limit = min(prices)
+
+    catalog = load_catalog(DATA_PATH)
+    cat = _normalize_category(sel.get("category") or "")
+    cat_code = catalog.categories.index(cat) if cat in catalog.categories else None
+    concerns = [c for c in (sel.get("concerns") or []) if c and c != "알 수 없음"]
+    shown = {p.get("name") for p in top}
+    canon = load_canon(DATA_PATH)
+    key_lw = [str(k).lower() for k in state.get("key_ingredients", []) if k]
+
+    picks = []
+    for i in range(len(catalog)):
+        price = catalog.price[i]
+        if not np.isfinite(price) or price >= limit:
+            continue
+        if cat_code is not None and int(catalog.category[i]) != cat_code:
+            continue
+        if any(c not in catalog.text("efficacy", i) for c in concerns):
+            continue
+        if catalog.text("name", i) in shown:
+            continue
+        picks.append((float(price), float(catalog.harm[i]), i))
+    picks.sort()
+
+    out = []
+    for _, harm, i in picks[:3]:
+        row = catalog.matrix.row(i)
+        found = [k for k in key_lw if np.isin(row, canon.match_ids(k)).any()]
+        out.append(product_record(str(DATA_PATH), i, found, harm))
+    return out
+
+def _product_brief(i: int, p: Dict[str, Any]) -> str:
+    link = (p.get("link") or "").strip()
+    return (f"{i + 1}. {p.get('name', '')} ({p.get('brand', '-')}) — {p.get('price', '?')}원 / "
+            f"{p.get('volume', '?')}" + (f" · [링크]({link})" if link else ""))
+
+def handle_follow_up(state: Dict[str, Any]):
+    """
+    직전 top_products에 대한 후속 질문을 상태 + 카탈로그만으로 응답.
+    - 성분 / 주의 성분 / 가격·용량·링크 / 비교 / 더 싼 제품: LLM 호출 없음
+    - 상태(top_products 등)는 바꾸지 않음 — 더 싼 제품도 메시지로만 안내
+    - 그 밖의 자유 질문: 이전 추천 카드 + 카탈로그 정보를 근거로 LLM 1회 (오프라인이면 카드 요약)
+    """
+    text = _last_human_text(state)
+    top = state.get("top_products", []) or []
+    idx = _referenced_index(text, len(top))
+    compare = bool(re.search(r"비교|차이", text))
+    targets = [(idx, top[idx])] if (idx is not None and not compare) else list(enumerate(top[:3]))
+    catalog = load_catalog(DATA_PATH)
+
+    # 1) 더 싼 제품
+    if re.search(r"더\s*싼|저렴|싼\s*거|가성비", text):
+        alts = _cheaper_alternatives(state, top[idx] if idx is not None else None)
+        if not alts:
+            answer = "같은 조건에서 더 저렴한 제품은 찾지 못했어요. 🙂"
+            return {"messages": [AIMessage(content=answer)]}
+        # 안내 메시지로만 보여 줌 — top_products/카드 상태는 그대로 (후속 "n번"은 추천 카드 기준)
+        lines = ["같은 조건에서 더 저렴한 제품이에요. 💸"] + [_product_brief(i, p) for i, p in enumerate(alts)]
+        lines.append("(번호로 물어보시면 위 추천 카드 기준으로 답해 드려요.)")
+        answer = "\n".join(lines)
+        return {"messages": [AIMessage(content=answer)]}
+
+    # 2) 성분
+    if "성분" in text and not re.search(r"주의|자극", text):
+        lines = []
+        for i, p in targets:
+            pos = _catalog_pos(p.get("name", ""))
+            ings = catalog.ingredients(pos) if pos is not None else []
+            found = ", ".join(p.get("found_ingredients") or []) or "없음"
+            lines.append(f"**{i + 1}. {p.get('name', '')}**")
+            lines.append(f"   🧪 매칭 성분: {found}")
+            lines.append(f"   📋 전성분: {', '.join(ings) if ings else '정보 없음'}")
+        return {"messages": [AIMessage(content="\n".join(lines))]}
+
+    # 3) 주의 성분 → 안전성 KB (웹/LLM 없음)
+    if re.search(r"주의|자극", text):
+        lines = []
+        for i, p in targets:
+            pos = _catalog_pos(p.get("name", ""))
+            ings = catalog.ingredients(pos) if pos is not None else []
+            warn = _fetch_warnings_for_ingredients(ings, p.get("found_ingredients") or [], allow_remote=False)
+            lines.append(f"**{i + 1}. {p.get('name', '')}**")
+            lines.append("\n".join("   " + ln for ln in warn.splitlines()) if warn else "   ⚠️ 특별히 주의할 성분은 없어요.")
+        return {"messages": [AIMessage(content="\n".join(lines))]}
+
+    # 4) 가격/용량/링크/비교
+    if re.search(r"가격|얼마|용량|링크|비교|차이", text):
+        lines = [_product_brief(i, p) for i, p in targets]
+        if compare:
+            lines += [f"   {i + 1}. 매칭 성분 {p.get('match_count', 0)}개 · 유해성 점수 {float(p.get('harmfulness_score', 0)):.2f}"
+                      for i, p in targets]
+        return {"messages": [AIMessage(content="\n".join(lines))]}
+
+    # 5) 자유 질문 → LLM 1회
+    if _offline_requested(state):
+        answer = "\n".join(["직전 추천 제품 정보예요."] + [_product_brief(i, p) for i, p in targets])
+        return {"messages": [AIMessage(content=answer)]}
+    context = []
+    for i, p in targets:
+        pos = _catalog_pos(p.get("name", ""))
+        ings = ", ".join(catalog.ingredients(pos)) if pos is not None else "정보 없음"
+        context.append(f"{_product_brief(i, p)}\n   효능: {catalog.text('efficacy', pos) if pos is not None else '-'}"
+                       f"\n   전성분: {ings}")
+    prompt = f"""
+역할: 화장품 추천 상담가. 아래 '직전 추천 제품 정보'만 근거로 사용자 질문에 3~5문장으로 답하세요.
+자료에 없는 사실은 만들지 말고, 모르면 모른다고 답하세요.
+
+직전 추천 제품 정보:
+{chr(10).join(context)}
+
+사용자 질문: {text}
+"""
+    try:
+        answer = (_invoke_llm(prompt).content or "").strip()
+    except Exception:
+        answer = ""
+    if not answer:
+        answer = "\n".join(["직전 추천 제품 정보예요."] + [_product_brief(i, p) for i, p in targets])
+    return {"messages": [AIMessage(content=answer)]}
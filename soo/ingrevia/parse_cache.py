@@ -0,0 +1,145 @@
+# parse_cache.py
+"""
+사용자 발화 파싱 결과(user_selections JSON) 캐시.
+
+- 1단계(정확 일치): 정규화 토큰 리스트가 같으면 저장된 결과 반환
+- 2단계(유사 일치): 로컬 임베딩(encoder.encode_query) 코사인 ≥ 임계값이면 반환
+  ("건성인데 보습 크림 추천" ≈ "건성 피부 수분크림 뭐가 좋아")
+- 계측: 조회/적중(정확·유사)/미스 카운트, 유사 적중 일부를 LLM으로 재검증해 오적중률 추정
+"""
+import random
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("ingrevia.parse_cache")
+
+
+@dataclass
+class CacheHit:
+    selections: Dict[str, Any]
+    layer: str            # "exact" | "similar"
+    score: float = 1.0
+
+
+class ParseCache:
+    def __init__(self, threshold: float = 0.93, max_entries: int = 5000,
+                 verify_rate: float = 0.05, use_similarity: bool = True, log_every: int = 100):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.verify_rate = verify_rate
+        self.use_similarity = use_similarity
+        self.log_every = log_every
+        self._exact: "OrderedDict[Tuple[str, ...], Dict[str, Any]]" = OrderedDict()
+        self._keys: List[Tuple[str, ...]] = []
+        self._vecs: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self.counters = {"lookups": 0, "exact_hits": 0, "similar_hits": 0, "misses": 0,
+                         "verified": 0, "false_hits": 0}
+
+    # ---- 임베딩 ----
+    def _embed(self, tokens: Tuple[str, ...]) -> Optional[np.ndarray]:
+        if not self.use_similarity:
+            return None
+        try:
+            from encoder import encode_query
+            return encode_query(" ".join(tokens))
+        except Exception:
+            # 로컬 인코더가 없으면 이후로는 정확 일치만 사용
+            self.use_similarity = False
+            return None
+
+    # ---- 조회/저장 ----
+    def lookup(self, tokens: List[str]) -> Optional[CacheHit]:
+        key = tuple(tokens)
+        with self._lock:
+            self.counters["lookups"] += 1
+            hit = self._exact.get(key)
+            if hit is not None:
+                self._exact.move_to_end(key)
+                self.counters["exact_hits"] += 1
+                self._maybe_log()
+                return CacheHit(dict(hit), "exact")
+            vecs, keys = self._vecs, list(self._keys)
+
+        if self.use_similarity and vecs is not None and len(keys):
+            q = self._embed(key)
+            if q is not None:
+                sims = vecs @ q
+                best = int(np.argmax(sims))
+                if float(sims[best]) >= self.threshold:
+                    with self._lock:
+                        data = self._exact.get(keys[best])
+                        if data is not None:
+                            self.counters["similar_hits"] += 1
+                            self._maybe_log()
+                            return CacheHit(dict(data), "similar", float(sims[best]))
+
+        with self._lock:
+            self.counters["misses"] += 1
+            self._maybe_log()
+        return None
+
+    def store(self, tokens: List[str], selections: Dict[str, Any]) -> None:
+        # 아무 것도 못 뽑은 결과는 저장하지 않음
+        if (selections.get("skin_type") in (None, "", "알 수 없음")
+                and selections.get("concerns") in (None, [], ["알 수 없음"])
+                and selections.get("category") in (None, "", "알 수 없음")):
+            return
+        key = tuple(tokens)
+        vec = self._embed(key)
+        with self._lock:
+            if key in self._exact:
+                self._exact[key] = dict(selections)
+                return
+            self._exact[key] = dict(selections)
+            if vec is not None:
+                self._keys.append(key)
+                row = vec[None, :].astype(np.float32)
+                self._vecs = row if self._vecs is None else np.vstack([self._vecs, row])
+            while len(self._exact) > self.max_entries:
+                self._evict_oldest()
+
+    def _evict_oldest(self) -> None:
+        old, _ = self._exact.popitem(last=False)
+        if old in self._keys:
+            i = self._keys.index(old)
+            self._keys.pop(i)
+            self._vecs = np.delete(self._vecs, i, axis=0) if self._keys else None
+
+    # ---- 오적중 계측 ----
+    def should_verify(self, hit: CacheHit) -> bool:
+        return hit.layer == "similar" and random.random() < self.verify_rate
+
+    def record_verification(self, tokens: List[str], hit: CacheHit, fresh: Dict[str, Any]) -> None:
+        """유사 적중 결과를 LLM 결과와 비교. 다르면 오적중으로 집계하고 이 문장은 정확 결과로 저장."""
+        same = (hit.selections.get("skin_type") == fresh.get("skin_type")
+                and sorted(hit.selections.get("concerns") or []) == sorted(fresh.get("concerns") or [])
+                and hit.selections.get("category") == fresh.get("category"))
+        with self._lock:
+            self.counters["verified"] += 1
+            if not same:
+                self.counters["false_hits"] += 1
+        if not same:
+            self.store(tokens, fresh)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            c = dict(self.counters)
+        hits = c["exact_hits"] + c["similar_hits"]
+        c["hit_rate"] = hits / c["lookups"] if c["lookups"] else 0.0
+        c["false_hit_rate"] = c["false_hits"] / c["verified"] if c["verified"] else 0.0
+        c["entries"] = len(self._exact)
+        return c
+
+    def _maybe_log(self) -> None:
+        n = self.counters["lookups"]
+        if self.log_every and n % self.log_every == 0:
+            hits = self.counters["exact_hits"] + self.counters["similar_hits"]
+            logger.info("parse cache: lookups=%d hit_rate=%.3f similar=%d false_hits=%d/%d",
+                        n, hits / n, self.counters["similar_hits"],
+                        self.counters["false_hits"], self.counters["verified"])
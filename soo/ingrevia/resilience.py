@@ -0,0 +1,151 @@
+# resilience.py
+"""
+외부 호출(LLM) 보호 계층.
+
+- 재시도: 일시적 오류(연결/타임아웃/429/5xx)만 지수 백오프 + full jitter로 재시도
+- 서킷 브레이커: 일시적 오류(연결/타임아웃/429/5xx)만 실패로 집계. 연속 실패가 임계값을 넘으면 open → 일정 시간 즉시 CircuitOpenError
+  (호출부는 이 예외를 잡아 로컬 폴백 사용) → half-open에서 1건 시험 후 복구/재차단
+- 헤징(선택): 최근 지연 분포의 상위 분위수(p95 등)를 넘기면 같은 요청을 한 번 더 보내
+  먼저 끝난 결과 사용 (멱등 요청에만 사용)
+"""
+import time
+import random
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+logger = logging.getLogger("ingrevia.resilience")
+
+_TRANSIENT_NAMES = {
+    "APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError",
+    "ConnectError", "ReadTimeout", "ConnectTimeout", "RemoteProtocolError", "TimeoutError",
+}
+
+
+class CircuitOpenError(RuntimeError):
+    """서킷이 열려 있어 호출하지 않음."""
+
+
+def is_transient(exc: BaseException) -> bool:
+    if type(exc).__name__ in _TRANSIENT_NAMES:
+        return True
+    status = getattr(exc, "status_code", None)
+    return isinstance(status, int) and (status in (408, 409, 429) or status >= 500)
+
+
+# =========================
+# 서킷 브레이커
+# =========================
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_after: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.state = "closed"          # closed | open | half_open
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open" and time.time() - self._opened_at >= self.reset_after:
+                self.state = "half_open"
+                return True            # 시험 호출 1건
+            return self.state == "closed"
+
+    def is_open(self) -> bool:
+        """차단 중인지(시험 호출 시각 전) — 상태를 바꾸지 않는 조회용."""
+        with self._lock:
+            return self.state == "open" and time.time() - self._opened_at < self.reset_after
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                logger.info("circuit %s closed", self.name)
+            self.state, self._failures = "closed", 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("circuit %s open (failures=%d)", self.name, self._failures)
+                self.state, self._opened_at = "open", time.time()
+
+
+# =========================
+# 재시도 + 헤징
+# =========================
+class ResilientCaller:
+    def __init__(self, name: str, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0,
+                 breaker: Optional[CircuitBreaker] = None, hedge: bool = False,
+                 hedge_quantile: float = 95.0, hedge_min_samples: int = 20, window: int = 200):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker(name)
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self._latencies: deque = deque(maxlen=window)
+        self._pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix=f"{name}-hedge")
+        self.counters = {"calls": 0, "retries": 0, "failures": 0, "short_circuited": 0, "hedged": 0}
+
+    def hedge_after(self) -> Optional[float]:
+        """헤지 요청을 보낼 대기 시간(초). 표본이 부족하면 None."""
+        if not self.hedge or len(self._latencies) < self.hedge_min_samples:
+            return None
+        return float(np.percentile(np.fromiter(self._latencies, dtype=np.float64), self.hedge_quantile))
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        self.counters["calls"] += 1
+        for attempt in range(1, self.max_attempts + 1):
+            if not self.breaker.allow():
+                self.counters["short_circuited"] += 1
+                raise CircuitOpenError(self.name)
+            t0 = time.perf_counter()
+            try:
+                result = self._once(fn)
+            except Exception as e:
+                if not is_transient(e):
+                    # 클라이언트 오류(400/인증/파싱 등): 업스트림은 응답했으므로 서킷에 실패로 세지 않음
+                    self.breaker.record_success()
+                    self.counters["failures"] += 1
+                    raise
+                self.breaker.record_failure()
+                if attempt == self.max_attempts:
+                    self.counters["failures"] += 1
+                    raise
+                self.counters["retries"] += 1
+                # full jitter: [0, min(max_delay, base * 2^(n-1))]
+                time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))))
+                continue
+            self._latencies.append(time.perf_counter() - t0)
+            self.breaker.record_success()
+            return result
+
+    def _once(self, fn: Callable[[], Any]) -> Any:
+        delay = self.hedge_after()
+        if delay is None:
+            return fn()
+        primary = self._pool.submit(fn)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+        self.counters["hedged"] += 1
+        futures = [primary, self._pool.submit(fn)]
+        while futures:
+            done, pending = wait(futures, return_when=FIRST_COMPLETED)
+            for f in done:
+                if f.exception() is None:
+                    for p in pending:
+                        p.cancel()
+                    return f.result()
+            futures = list(pending)
+            if not futures:
+                raise next(iter(done)).exception()
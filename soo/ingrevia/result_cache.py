@@ -0,0 +1,87 @@
+# result_cache.py
+"""
+추천 결과(렌더링된 recommendation_message + top_products) 캐시.
+
+- 키: (skin_type, 정렬된 concerns, category, 카탈로그 버전)
+  → 카탈로그(유해성_점수 등)가 바뀌면 버전이 바뀌어 자동 무효화
+- stale-while-revalidate:
+  * fresh_ttl 이내: 그대로 반환
+  * stale_ttl 이내: 오래된 값을 즉시 반환하고 백그라운드에서 재계산
+  * 그 이후: 미스
+"""
+import logging
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, Optional, Tuple
+
+logger = logging.getLogger("ingrevia.result_cache")
+
+CacheKey = Tuple[str, Tuple[str, ...], str, str]
+
+
+def make_key(selections: Dict[str, Any], catalog_version: str) -> CacheKey:
+    concerns = tuple(sorted(c for c in (selections.get("concerns") or []) if c and c != "알 수 없음"))
+    return (
+        selections.get("skin_type") or "알 수 없음",
+        concerns,
+        selections.get("category") or "알 수 없음",
+        catalog_version,
+    )
+
+
+class ResultCache:
+    def __init__(self, fresh_ttl: float = 600.0, stale_ttl: float = 86400.0,
+                 max_entries: int = 2000, workers: int = 2):
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._data: "OrderedDict[CacheKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: set = set()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="result-cache")
+        self.counters = {"fresh_hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0}
+
+    def get(self, key: CacheKey) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """(값, stale 여부) 또는 None."""
+        now = time.time()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or now - item[0] > self.stale_ttl:
+                if item is not None:
+                    del self._data[key]
+                self.counters["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            stale = now - item[0] > self.fresh_ttl
+            self.counters["stale_hits" if stale else "fresh_hits"] += 1
+            return dict(item[1]), stale
+
+    def put(self, key: CacheKey, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._data[key] = (time.time(), dict(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def revalidate(self, key: CacheKey, compute: Callable[[], Optional[Dict[str, Any]]]) -> None:
+        """백그라운드 재계산(같은 키는 동시에 하나만). 결과가 None이면 기존 값 유지."""
+        with self._lock:
+            if key in self._inflight:
+                return
+            self._inflight.add(key)
+            self.counters["refreshes"] += 1
+
+        def _run():
+            try:
+                value = compute()
+                if value:
+                    self.put(key, value)
+            except Exception as e:
+                logger.warning("result cache refresh failed (%s): %s", key, e)
+            finally:
+                with self._lock:
+                    self._inflight.discard(key)
+
+        self._pool.submit(_run)
@@ -0,0 +1,306 @@
+# retrieval.py
+"""
+bse/embedding.ipynb의 제품 검색(ko-sbert + ChromaDB)을 프로세스 내 검색으로 옮긴 모듈.
+
+- 오프라인: 제품 문서를 임베딩해 `<csv이름>.embeddings/vectors.npy`(float32, L2 정규화)로 저장
+  (문서 내용 해시 매니페스트를 함께 저장해 새로 생기거나 바뀐 제품만 다시 인코딩)
+- 서빙: 벡터 행렬을 메모리 매핑으로 열고 NumPy 내적 + argpartition으로 top-k
+  (질의 인코딩은 encoder.py의 ONNX int8 경로 + LRU 캐시)
+- 압축 저장: float16 / int8(차원별 스케일) 사본을 상주시키고, 상위 후보만 float32(mmap)로 재채점
+- 하이브리드: BM25(정확한 성분명에 강함) + 벡터 순위를 RRF(reciprocal rank fusion)로 결합
+- 외부 벡터 DB, LLM 호출 없음
+
+사용 예:
+    python retrieval.py                       # product_data.csv 임베딩 빌드
+    python retrieval.py --query "피부 진정에 좋은 토너"
+"""
+import os
+import json
+import hashlib
+import argparse
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from catalog import Catalog, load_catalog
+from utils import _normalize_category
+from encoder import EMBED_MODEL, encode_texts, encode_query
+from bm25 import BM25Index
+
+DATA_PATH = Path(__file__).parent / "product_data.csv"
+RRF_K = 60
+
+# 서빙 시 상주시킬 벡터 정밀도: "float32" | "float16" | "int8"
+STORE_DTYPE = os.getenv("INGREVIA_EMBED_DTYPE", "float32")
+RESCORE_FACTOR = 4      # 압축 점수로 k*4개 후보를 뽑아 float32로 재채점
+_SCORE_CHUNK = 4096     # int8/float16 → float32 변환을 청크 단위로(임시 메모리 제한)
+
+
+# =========================
+# 제품 문서 (embedding.ipynb와 같은 형식)
+# =========================
+def product_document(catalog: Catalog, i: int) -> str:
+    efficacy = catalog.text("efficacy", i).replace(";", ", ")
+    price = catalog.price[i]
+    price_txt = f"{int(price):,}원" if np.isfinite(price) else "정보 없음"
+    harm = catalog.harm[i]
+    harm_txt = f"{harm}" if np.isfinite(harm) else "정보 없음"
+    return (
+        f"제품명: {catalog.text('name', i)}\n"
+        f"브랜드명: {catalog.text('brand', i)}\n"
+        f"카테고리: {catalog.text('category_raw', i)}\n"
+        f"효능: {efficacy}\n"
+        f"가격: {price_txt}\n"
+        f"용량: {catalog.text('volume', i)}\n"
+        f"유해성 점수: {harm_txt}\n"
+        f"전성분: {', '.join(catalog.ingredients(i))}\n"
+        f"링크: {catalog.text('link', i)}"
+    )
+
+def product_documents(catalog: Catalog) -> List[str]:
+    return [product_document(catalog, i) for i in range(len(catalog))]
+
+
+# =========================
+# 임베딩 인덱스
+# =========================
+def index_dir_for(csv_path) -> Path:
+    p = Path(csv_path)
+    return p.with_name(p.stem + ".embeddings")
+
+def _doc_hash(doc: str) -> str:
+    return hashlib.sha1(doc.encode("utf-8")).hexdigest()
+
+def _load_previous(out_dir: Path) -> Tuple[Dict[str, int], Optional[np.ndarray]]:
+    """이전 빌드의 (문서 해시 → 행 번호, 벡터). 모델이 다르거나 없으면 빈 값."""
+    try:
+        meta = json.loads((out_dir / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("model") != EMBED_MODEL:
+            return {}, None
+        vecs = np.load(out_dir / "vectors.npy", mmap_mode="r")
+    except (OSError, ValueError):
+        return {}, None
+    hashes = meta.get("hashes") or []
+    if len(hashes) != vecs.shape[0]:
+        return {}, None
+    return {h: i for i, h in enumerate(hashes)}, vecs
+
+def build_embeddings(csv_path=DATA_PATH, out_dir: Optional[Path] = None,
+                     batch_size: int = 32) -> Dict[str, Any]:
+    """
+    증분 임베딩 빌드(오프라인 단계).
+    - 제품 문서별 sha1 해시를 이전 매니페스트와 비교
+    - 같은 해시는 기존 벡터 재사용, 새로 생기거나 바뀐 문서만 배치 인코딩
+    반환: {"dir", "rows", "reused", "encoded"}
+    """
+    catalog = load_catalog(csv_path)
+    out_dir = Path(out_dir) if out_dir else index_dir_for(csv_path)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    docs = product_documents(catalog)
+    hashes = [_doc_hash(d) for d in docs]
+    prev_rows, prev_vecs = _load_previous(out_dir)
+
+    todo = [i for i, h in enumerate(hashes) if h not in prev_rows]
+    new_vecs: Dict[int, np.ndarray] = {}
+    for start in range(0, len(todo), batch_size):
+        batch = todo[start:start + batch_size]
+        for i, v in zip(batch, encode_texts([docs[i] for i in batch], batch_size=batch_size)):
+            new_vecs[i] = v
+
+    dim = prev_vecs.shape[1] if prev_vecs is not None else (
+        next(iter(new_vecs.values())).shape[0] if new_vecs else 0)
+    vecs = np.zeros((len(docs), dim), dtype=np.float32)
+    for i, h in enumerate(hashes):
+        vecs[i] = new_vecs[i] if i in new_vecs else prev_vecs[prev_rows[h]]
+
+    # 읽는 쪽(mmap)이 깨지지 않도록 임시 파일에 쓰고 교체
+    tmp = out_dir / "vectors.tmp.npy"
+    np.save(tmp, vecs)
+    os.replace(tmp, out_dir / "vectors.npy")
+    write_compressed(out_dir, vecs)
+    meta = {"model": EMBED_MODEL, "dim": int(dim), "rows": len(docs),
+            "catalog_version": catalog.version, "hashes": hashes}
+    (out_dir / "meta.json").write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+    return {"dir": str(out_dir), "rows": len(docs), "reused": len(docs) - len(todo), "encoded": len(todo)}
+
+
+def quantize_int8(vecs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """차원별 대칭 스칼라 양자화: x ≈ codes * scales, codes ∈ [-127, 127]."""
+    scales = np.abs(vecs).max(axis=0).astype(np.float32) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vecs / scales), -127, 127).astype(np.int8)
+    return codes, scales
+
+def write_compressed(out_dir: Path, vecs: np.ndarray) -> None:
+    np.save(out_dir / "vectors.f16.npy", vecs.astype(np.float16))
+    codes, scales = quantize_int8(vecs)
+    np.save(out_dir / "vectors.i8.npy", codes)
+    np.save(out_dir / "scales.npy", scales)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    k = min(k, int(np.isfinite(scores).sum()))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+
+class EmbeddingIndex:
+    """
+    (N, D) 정규화 벡터 위의 top-k (내적 = 코사인).
+    - float32: 메모리 매핑 행렬로 정확 검색
+    - float16 / int8: 압축 사본을 메모리에 올려 1차 점수 → 상위 k*RESCORE_FACTOR개만
+      float32(mmap, 해당 행만 읽힘)로 재채점
+    """
+
+    def __init__(self, vectors: np.ndarray, meta: Dict[str, Any],
+                 codes: Optional[np.ndarray] = None, scales: Optional[np.ndarray] = None):
+        self.vectors = vectors
+        self.meta = meta
+        self.codes = codes
+        self.scales = scales
+
+    @classmethod
+    def open(cls, index_dir: Path, dtype: str = "float32") -> "EmbeddingIndex":
+        index_dir = Path(index_dir)
+        meta = json.loads((index_dir / "meta.json").read_text(encoding="utf-8"))
+        vectors = np.load(index_dir / "vectors.npy", mmap_mode="r")
+        codes = scales = None
+        try:
+            if dtype == "float16":
+                codes = np.load(index_dir / "vectors.f16.npy")
+            elif dtype == "int8":
+                codes = np.load(index_dir / "vectors.i8.npy")
+                scales = np.load(index_dir / "scales.npy")
+        except OSError:
+            codes = scales = None  # 압축본이 없으면 float32로 동작
+        return cls(vectors, meta, codes, scales)
+
+    @property
+    def resident_bytes(self) -> int:
+        """상주 메모리(압축 사본 기준; float32는 mmap 전체 크기)."""
+        if self.codes is None:
+            return int(self.vectors.nbytes)
+        return int(self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+
+    def _coarse_scores(self, q: np.ndarray) -> np.ndarray:
+        if self.codes is None:
+            return np.asarray(self.vectors @ q, dtype=np.float32)
+        qq = q * self.scales if self.scales is not None else q
+        out = np.empty(self.codes.shape[0], dtype=np.float32)
+        for s in range(0, self.codes.shape[0], _SCORE_CHUNK):
+            out[s:s + _SCORE_CHUNK] = self.codes[s:s + _SCORE_CHUNK].astype(np.float32) @ qq
+        return out
+
+    def search(self, query_vec: np.ndarray, k: int = 5,
+               mask: Optional[np.ndarray] = None, rescore: bool = True) -> List[Tuple[int, float]]:
+        q = np.asarray(query_vec, dtype=np.float32)
+        scores = self._coarse_scores(q)
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        if self.codes is None or not rescore:
+            top = _top_k(scores, k)
+            return [(int(i), float(scores[i])) for i in top]
+
+        cand = np.sort(_top_k(scores, max(k * RESCORE_FACTOR, k)))
+        if cand.size == 0:
+            return []
+        exact = np.asarray(self.vectors[cand], dtype=np.float32) @ q
+        order = np.argsort(-exact, kind="stable")[:k]
+        return [(int(cand[i]), float(exact[i])) for i in order]
+
+
+@lru_cache(maxsize=4)
+def _open_index(index_dir: str, catalog_version: str, meta_mtime: int) -> Optional[EmbeddingIndex]:
+    try:
+        index = EmbeddingIndex.open(Path(index_dir), dtype=STORE_DTYPE)
+    except (OSError, ValueError, KeyError):
+        return None
+    # 카탈로그가 바뀐 뒤 재빌드하지 않은 인덱스는 사용하지 않음(행 번호가 어긋남)
+    if index.meta.get("catalog_version") != catalog_version:
+        return None
+    return index
+
+def load_index(csv_path=DATA_PATH) -> Optional[EmbeddingIndex]:
+    """meta.json(빌드 마지막에 기록) mtime까지 키에 포함 → 실패(None)도 재빌드 후엔 다시 열어 봄."""
+    index_dir = index_dir_for(csv_path)
+    try:
+        meta_mtime = (index_dir / "meta.json").stat().st_mtime_ns
+    except OSError:
+        return None
+    return _open_index(str(index_dir), load_catalog(csv_path).version, meta_mtime)
+
+
+def _category_mask(catalog: Catalog, category: Optional[str]) -> Optional[np.ndarray]:
+    """정규화 카테고리 마스크. 카테고리 미지정이면 None, 카탈로그에 없으면 전부 False."""
+    if not category or category == "알 수 없음":
+        return None
+    norm = _normalize_category(category)
+    if norm not in catalog.categories:
+        return np.zeros(len(catalog), dtype=bool)
+    return np.asarray(catalog.category) == catalog.categories.index(norm)
+
+def semantic_search(query: str, k: int = 3, category: Optional[str] = None,
+                    csv_path=DATA_PATH) -> List[Tuple[int, float]]:
+    """
+    자유 문장 → (제품 행 번호, 코사인 점수) top-k.
+    카테고리가 주어지면 정규화 카테고리로 후보를 제한. 인덱스/모델이 없으면 빈 리스트.
+    """
+    index = load_index(csv_path)
+    if index is None or not (query or "").strip():
+        return []
+    catalog = load_catalog(csv_path)
+    mask = _category_mask(catalog, category)
+    if mask is not None and not mask.any():
+        return []
+    try:
+        qv = encode_query(query)
+    except Exception:
+        return []
+    return index.search(qv, k=k, mask=mask)
+
+
+@lru_cache(maxsize=4)
+def _bm25_index(csv_path: str, catalog_version: str) -> BM25Index:
+    return BM25Index(product_documents(load_catalog(csv_path)))
+
+def bm25_search(query: str, k: int = 3, category: Optional[str] = None,
+                csv_path=DATA_PATH) -> List[Tuple[int, float]]:
+    catalog = load_catalog(csv_path)
+    mask = _category_mask(catalog, category)
+    return _bm25_index(str(csv_path), catalog.version).search(query, k=k, mask=mask)
+
+def hybrid_search(query: str, k: int = 3, category: Optional[str] = None,
+                  csv_path=DATA_PATH, depth: int = 50) -> List[Tuple[int, float]]:
+    """
+    BM25 + 벡터 검색 결과를 RRF로 결합한 (제품 행 번호, RRF 점수) top-k.
+    벡터 인덱스/인코더가 없으면 BM25 순위만으로 동작.
+    """
+    if not (query or "").strip():
+        return []
+    fused: Dict[int, float] = {}
+    for ranking in (bm25_search(query, depth, category, csv_path),
+                    semantic_search(query, depth, category, csv_path)):
+        for rank, (pos, _) in enumerate(ranking):
+            fused[pos] = fused.get(pos, 0.0) + 1.0 / (RRF_K + rank + 1)
+    top = sorted(fused.items(), key=lambda x: -x[1])[:k]
+    return [(pos, float(score)) for pos, score in top]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="제품 임베딩 빌드/검색")
+    parser.add_argument("--csv", default=str(DATA_PATH))
+    parser.add_argument("--query", default=None)
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+    if args.query:
+        cat = load_catalog(args.csv)
+        for pos, score in hybrid_search(args.query, k=args.k, csv_path=args.csv):
+            print(f"{score:.3f}  {cat.text('brand', pos)} {cat.text('name', pos)}")
+    else:
+        stats = build_embeddings(args.csv)
+        print(f"✅ 임베딩 빌드 완료: {stats['dir']} (재사용 {stats['reused']}개, 인코딩 {stats['encoded']}개)")
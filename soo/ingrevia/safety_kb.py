@@ -0,0 +1,238 @@
+# safety_kb.py
+"""
+성분 안전성 지식베이스 (로컬 조회, 웹/LLM 없음).
+
+- 정규 성분 id(ingredient_canon) 기준으로 EWG 등급 · 위험 구분 · 한 줄 사유를 보관
+- 출처
+  * ewg_ratings.csv / ingredient_data.csv 의 EWG 등급 (3~6 → 조건부, 7 이상 → 위험)
+  * 큐레이션 표(CURATED): 향 알레르기 성분, UV 필터(논쟁성/광안정 신형/무기), 포름알데하이드 방출·접촉 알레르기 방부제,
+    에센셜오일, 고함량 알코올, 산/레티노이드 등 농도·pH 의존 활성
+  * 기능성 베이스(실리콘 · pH 조절제 · 용제)는 위험도 ""로 큐레이션 → EWG 3~6 '조건부'를 해제
+    (EWG 7 이상 '위험'은 그대로 유지)
+  * 일반 안전/보습 성분(benign) → '경고 없음'으로 확정
+- 주의 성분 조립(compose): 위험 → 조건부 순, 같은 구분은 등급 높은 순(같으면 전성분 순서).
+  효능 성분과 겹치면 [조건부]. 같은 성분의 다른 표기는 한 번만
+- KB가 모르는 성분(covers == False)만 호출부가 웹+LLM으로 보강해 extra로 넘김
+
+사용 예:
+    kb = load_safety_kb(DATA_PATH, benign=SAFE_BENIGN_INGS)
+    format_warnings(kb.compose(catalog.ingredients(pos), efficacy=["나이아신아마이드"]))
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Iterable, Tuple
+
+from catalog import load_catalog
+from ingredient_canon import CanonIndex, load_canon, normalize
+
+BASE_DIR = Path(__file__).parent
+INGREDIENT_DATA_PATH = BASE_DIR.parent / "ingredient_data.csv"
+EWG_RATINGS_PATH = BASE_DIR.parent / "ewg_ratings.csv"
+
+RISK_DANGER = "위험"
+RISK_CAUTION = "조건부"
+WARN_GRADE = 3.0
+DANGER_GRADE = 7.0
+MAX_WARNINGS = 5
+
+
+@dataclass(frozen=True)
+class SafetyFact:
+    grade: Optional[float]   # EWG 등급 (없으면 None)
+    risk: str                # "위험" | "조건부" | "" (경고 없음)
+    kind: str                # fragrance | uv_filter | preservative | essential_oil | alcohol | active | functional | ewg | benign | web
+    reason: str              # 25자 안팎 한 줄
+
+
+# (구분, 위험도, 사유, 표기들) — 표기는 한국어명/INCI/관용명 아무거나 (정규화 색인으로 해석)
+# 위험도 "" = '알려진 성분, 경고 없음' (EWG 조건부 등급을 덮어씀, 위험 등급은 유지)
+CURATED: List[Tuple[str, str, str, List[str]]] = [
+    ("fragrance", RISK_DANGER, "향 알레르기·자극 보고 빈도 높음", ["향료", "퍼퓸", "fragrance", "parfum"]),
+    ("fragrance", RISK_CAUTION, "향 알레르기 유발 성분(표시 대상)", [
+        "리모넨", "리날룰", "시트랄", "시트로넬올", "제라니올", "유제놀", "아이소유제놀", "쿠마린", "파네솔",
+        "헥실신남알", "벤질알코올", "벤질살리실레이트", "벤질벤조에이트", "벤질신나메이트", "신남알",
+        "신나밀알코올", "아밀신남알", "아밀신나밀알코올", "하이드록시시트로넬알", "부틸페닐메틸프로피오날",
+        "알파-아이소메틸아이오논", "아니스알코올", "참나무이끼추출물", "나무이끼추출물",
+    ]),
+    ("uv_filter", RISK_DANGER, "논쟁성 UV 필터(내분비 교란 우려)", ["옥시벤존", "벤조페논-3", "oxybenzone", "benzophenone-3"]),
+    ("uv_filter", RISK_CAUTION, "논쟁성 UV 필터(흡수·자극 논란)", [
+        "에칠헥실메톡시신나메이트", "옥티녹세이트", "octinoxate", "호모살레이트", "homosalate",
+        "옥토크릴렌", "octocrylene", "부틸메톡시다이벤조일메탄", "아보벤존", "avobenzone",
+        "에칠헥실살리실레이트", "옥티살레이트", "octisalate",
+    ]),
+    ("uv_filter", RISK_CAUTION, "논쟁성 UV 필터(내분비 교란 우려)", [
+        "4-메칠벤질리덴캠퍼", "4-메틸벤질리덴캠퍼", "4-methylbenzylidene camphor", "엔자카멘", "enzacamene",
+        "벤조페논-4", "벤조페논-5", "benzophenone-4",
+    ]),
+    ("uv_filter", RISK_CAUTION, "UV 필터 — 프탈레이트 불순물 논란", [
+        "디에칠아미노하이드록시벤조일헥실벤조에이트", "다이에틸아미노하이드록시벤조일헥실벤조에이트",
+        "diethylamino hydroxybenzoyl hexyl benzoate",
+    ]),
+    ("uv_filter", "", "광안정 UV 필터 — 흡수·자극 보고 적음", [
+        "메칠렌비스-벤조트리아졸릴테트라메칠부틸페놀", "메틸렌비스-벤조트리아졸릴테트라메틸부틸페놀",
+        "methylene bis-benzotriazolyl tetramethylbutylphenol", "비스-에칠헥실옥시페놀메톡시페닐트리아진",
+        "비스-에틸헥실옥시페놀메톡시페닐트라이아진", "bis-ethylhexyloxyphenol methoxyphenyl triazine",
+        "에칠헥실트리아존", "에틸헥실트라이아존", "ethylhexyl triazone", "다이에칠헥실부타미도트리아존",
+        "diethylhexyl butamido triazone", "드로메트리졸트리실록세인", "drometrizole trisiloxane",
+        "테레프탈릴리덴다이캠퍼설포닉애씨드", "테레프탈릴리덴디캠퍼설포닉애씨드", "terephthalylidene dicamphor sulfonic acid",
+        "페닐벤즈이미다졸설포닉애씨드", "phenylbenzimidazole sulfonic acid", "폴리실리콘-15", "polysilicone-15",
+    ]),
+    ("uv_filter", "", "무기 자외선 차단제 — 피부 흡수 거의 없음", [
+        "징크옥사이드", "zinc oxide", "티타늄디옥사이드", "titanium dioxide",
+    ]),
+    ("preservative", RISK_DANGER, "포름알데하이드 방출 방부제", [
+        "디엠디엠하이단토인", "dmdm hydantoin", "이미다졸리디닐우레아", "imidazolidinyl urea",
+        "다이아졸리디닐우레아", "diazolidinyl urea", "쿼터늄-15", "quaternium-15", "브로노폴", "bronopol",
+    ]),
+    ("preservative", RISK_DANGER, "접촉 알레르기 보고 많음", [
+        "메틸아이소티아졸리논", "methylisothiazolinone", "메틸클로로아이소티아졸리논", "methylchloroisothiazolinone",
+    ]),
+    ("preservative", RISK_CAUTION, "방부제 — 민감 피부 자극 가능", [
+        "페녹시에탄올", "클로페네신", "메틸파라벤", "에틸파라벤", "프로필파라벤", "부틸파라벤",
+        "소듐벤조에이트", "포타슘소르베이트",
+    ]),
+    ("essential_oil", RISK_CAUTION, "에센셜오일 — 민감 피부 자극 가능", [
+        "라벤더오일", "로즈마리잎오일", "유칼립투스잎오일", "티트리잎오일", "광곽향오일", "로즈우드오일",
+        "살비아오일", "페퍼민트오일", "일랑일랑꽃오일", "제라늄오일",
+    ]),
+    ("essential_oil", RISK_CAUTION, "감귤 오일 — 광독성·자극 가능", [
+        "레몬껍질오일", "오렌지껍질오일", "자몽껍질오일", "베르가못오일", "라임오일",
+    ]),
+    ("alcohol", RISK_CAUTION, "고함량 시 건조·자극 가능", ["에탄올", "변성알코올", "alcohol denat."]),
+    ("active", RISK_CAUTION, "자극·광민감 가능, 저농도부터", [
+        "레티놀", "레티닐팔미테이트", "하이드록시피나콜론레티노에이트", "레티날",
+    ]),
+    ("active", RISK_CAUTION, "산 성분 — pH·농도 의존 자극", [
+        "글라이콜릭애씨드", "락틱애씨드", "만델릭애씨드", "살리실릭애씨드", "아스코빅애씨드",
+    ]),
+    ("active", RISK_DANGER, "고농도 자극·건조 주의", ["벤조일퍼옥사이드", "benzoyl peroxide"]),
+    ("functional", "", "실리콘 베이스 — 사용감 개선용", [
+        "다이메티콘", "dimethicone", "사이클로헥사실록세인", "cyclohexasiloxane", "사이클로펜타실록세인",
+        "cyclopentasiloxane", "메틸트라이메티콘", "페닐트라이메티콘", "다이페닐다이메티콘", "카프릴릴메티콘",
+        "다이페닐실록시페닐트라이메티콘", "트라이메틸실록시실리케이트", "다이메티콘올",
+    ]),
+    ("functional", "", "pH 조절제 — 완제품에선 중화됨", [
+        "포타슘하이드록사이드", "potassium hydroxide", "소듐하이드록사이드", "sodium hydroxide",
+        "트로메타민", "tromethamine", "아르지닌", "시트릭애씨드", "소듐시트레이트",
+    ]),
+    ("functional", "", "용제·보습 베이스 — 통상 농도 안전", [
+        "t-부틸알코올", "t-butyl alcohol", "부틸렌글라이콜", "프로판다이올", "다이프로필렌글라이콜",
+        "펜틸렌글라이콜", "1,2-헥산다이올", "프로필렌카보네이트",
+    ]),
+]
+
+_RISK_ORDER = {RISK_DANGER: 0, RISK_CAUTION: 1}
+
+
+def _grade_risk(grade: Optional[float]) -> str:
+    if grade is None or grade < WARN_GRADE:
+        return ""
+    return RISK_DANGER if grade >= DANGER_GRADE else RISK_CAUTION
+
+def _worse(a: str, b: str) -> str:
+    return min((a, b), key=lambda r: _RISK_ORDER.get(r, 9))
+
+def _curated_risk(risk: str, grade: Optional[float]) -> str:
+    """큐레이션 위험도와 EWG 등급 결합: 경고 없음("")은 조건부 등급을 해제하되 위험 등급은 유지."""
+    if not risk:
+        return RISK_DANGER if grade is not None and grade >= DANGER_GRADE else ""
+    return _worse(risk, _grade_risk(grade))
+
+
+class SafetyKB:
+    def __init__(self, canon: CanonIndex, grades_kr: Dict[str, Optional[float]],
+                 grades_inci: Dict[str, Optional[float]], benign: Iterable[str] = ()):
+        self.canon = canon
+        self._by_id: Dict[int, SafetyFact] = {}
+        self._by_name: Dict[str, SafetyFact] = {}   # 카탈로그 사전에 없는 표기 (정규화 키)
+
+        # 1) EWG 등급
+        for table in (grades_kr, grades_inci):
+            for name, grade in table.items():
+                if grade is None:
+                    continue
+                risk = _grade_risk(grade)
+                reason = f"EWG {grade:g}등급" + (" — 유해성 우려" if risk == RISK_DANGER else "")
+                self._put(name, SafetyFact(grade, risk, "ewg", reason), override=False)
+
+        # 2) 큐레이션 표 (사유 우선, 위험도는 _curated_risk: 경고 대상은 EWG와 비교해 더 높은 쪽,
+        #    기능성 베이스 등 경고 없음은 EWG 위험 등급일 때만 위험)
+        for kind, risk, reason, names in CURATED:
+            for name in names:
+                prev = self.fact(name)
+                grade = prev.grade if prev else None
+                self._put(name, SafetyFact(grade, _curated_risk(risk, grade), kind, reason), override=True)
+
+        # 3) 일반 안전/보습 성분: 다른 근거가 없을 때만 '경고 없음'
+        for name in benign:
+            self._put(name, SafetyFact(None, "", "benign", "일반 안전/보습 성분"), override=False)
+
+    def _put(self, surface: str, fact: SafetyFact, override: bool) -> None:
+        c = self.canon.resolve(surface, fuzzy=False)
+        target, key = (self._by_id, c) if c is not None else (self._by_name, normalize(surface))
+        if override or key not in target:
+            target[key] = fact
+
+    # -------------------------
+    # 조회
+    # -------------------------
+    def fact(self, surface: str) -> Optional[SafetyFact]:
+        """정확/별칭 일치만 (오타 보정 없음: 다른 성분의 등급을 잘못 붙이지 않도록)."""
+        c = self.canon.resolve(surface, fuzzy=False)
+        if c is not None and c in self._by_id:
+            return self._by_id[c]
+        return self._by_name.get(normalize(surface))
+
+    def covers(self, surface: str) -> bool:
+        return self.fact(surface) is not None
+
+    def compose(self, ingredients: Iterable[str], efficacy: Iterable[str] = (),
+                extra: Optional[Dict[str, SafetyFact]] = None,
+                limit: int = MAX_WARNINGS) -> List[Tuple[str, SafetyFact]]:
+        """
+        제품 전성분 → 주의 성분 [(표시명, 사실)] (중요도 순, 최대 limit개).
+        extra: KB 밖 성분에 대해 호출부가 구한 사실(웹+LLM 등).
+        """
+        eff_keys = {self.canon.key(e) for e in efficacy if str(e or "").strip()}
+        extra_facts = {normalize(k): v for k, v in (extra or {}).items()}
+        seen, picked = set(), []
+        for order, ing in enumerate(ingredients):
+            ing = str(ing or "").strip()
+            key = self.canon.key(ing)
+            if not ing or key in seen:
+                continue
+            seen.add(key)
+            fact = self.fact(ing) or extra_facts.get(normalize(ing))
+            if fact is None or not fact.risk:
+                continue
+            if key in eff_keys and fact.risk != RISK_CAUTION:
+                fact = SafetyFact(fact.grade, RISK_CAUTION, fact.kind, fact.reason)
+            picked.append((_RISK_ORDER[fact.risk], -(fact.grade or 0.0), order, ing, fact))
+        picked.sort(key=lambda x: x[:3])
+        return [(ing, fact) for *_, ing, fact in picked[:limit]]
+
+
+def format_warnings(items: List[Tuple[str, SafetyFact]]) -> str:
+    """카드/프롬프트 공용 형식: '- 성분 — [위험|조건부] 한줄 이유'."""
+    return "\n".join(f"- {ing} — [{fact.risk}] {fact.reason}" for ing, fact in items)
+
+
+# =========================
+# 로딩
+# =========================
+_KBS: Dict[str, Tuple[Tuple, SafetyKB]] = {}
+
+def load_safety_kb(csv_path, benign: Iterable[str] = ()) -> SafetyKB:
+    """카탈로그 버전 + 등급표 mtime 기준으로 재생성 (harm_score.py로 등급이 바뀌면 자동 반영)."""
+    benign = tuple(benign)
+    stamp = (load_catalog(csv_path).version, benign) + tuple(
+        p.stat().st_mtime if p.exists() else 0.0 for p in (INGREDIENT_DATA_PATH, EWG_RATINGS_PATH))
+    cached = _KBS.get(str(csv_path))
+    if cached and cached[0] == stamp:
+        return cached[1]
+    from harm_score import load_ingredient_ratings, load_ewg_ratings
+    grades_kr = load_ingredient_ratings(INGREDIENT_DATA_PATH) if INGREDIENT_DATA_PATH.exists() else {}
+    grades_inci = load_ewg_ratings(EWG_RATINGS_PATH) if EWG_RATINGS_PATH.exists() else {}
+    kb = SafetyKB(load_canon(csv_path), grades_kr, grades_inci, benign)
+    _KBS[str(csv_path)] = (stamp, kb)
+    return kb
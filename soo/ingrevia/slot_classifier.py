@@ -0,0 +1,451 @@
+# slot_classifier.py
+"""
+발화 → (피부 타입, 고민, 카테고리) 로컬 분류기. 규칙 파서가 못 채운 칸을 LLM 대신 채움.
+
+- 특징: 음절 n-gram(1~3, 공백 포함)을 crc32로 해싱한 고정 차원 벡터 (log TF, L2 정규화)
+- 모델: 선형 3-헤드 — 피부 타입/카테고리는 softmax("알 수 없음" 포함), 고민은 라벨별 sigmoid
+- 학습: 템플릿 합성 발화 + (있으면) 로그 발화 JSONL, numpy 미니배치 Adam → slot_model.npz
+- 신뢰도: 피부/카테고리는 최대 확률, 고민은 라벨별 max(p, 1-p)의 최소값
+  호출부는 confident_slots로 확정된 칸만 쓰고 나머지는 LLM으로 보냄. 예측 1건 0.1ms 안팎 (CPU, numpy)
+- '알 수 없음' 예측은 입력 n-gram이 학습 어휘로 충분히 덮일 때만 확정
+  (처음 보는 표현은 bias만으로 '알 수 없음' 확률이 높게 나오므로 → LLM)
+- 학습된 모델(slot_model.npz)은 저장소에 포함. 파일이 없으면 백그라운드로 학습하고 그동안은 None(→ LLM)
+
+사용 예:
+    python slot_classifier.py                          # 합성 발화로 학습 → slot_model.npz
+    python slot_classifier.py --logs slot_log.jsonl    # LLM 파싱 로그(INGREVIA_SLOT_LOG)도 함께 학습
+"""
+import re
+import json
+import time
+import zlib
+import random
+import logging
+import argparse
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("ingrevia.slot_classifier")
+
+MODEL_PATH = Path(__file__).parent / "slot_model.npz"
+UNKNOWN = "알 수 없음"
+DIM = 1 << 15
+NGRAMS = (1, 2, 3)
+CONFIDENCE_THRESHOLD = 0.8
+MIN_UNKNOWN_COVERAGE = 0.85   # '알 수 없음' 확정에 필요한 2~3-gram 학습 어휘 포함률
+
+SKIN_LABELS = [UNKNOWN, "민감성", "지성", "건성", "복합성", "아토피성", "중성"]
+CONCERN_LABELS = ["보습", "진정", "미백", "주름/탄력", "모공케어", "피지조절"]
+CATEGORY_LABELS = [UNKNOWN, "스킨/토너", "로션/에멀전", "에센스/앰플/세럼", "크림",
+                   "밤/멀티밤", "클렌징 폼", "시트마스크", "선크림"]
+
+
+# =========================
+# 합성 발화 사전
+# =========================
+SKIN_PHRASES: Dict[str, List[str]] = {
+    "민감성": ["민감성", "민감성 피부", "민감한 피부", "예민한 피부", "피부가 예민해서", "피부가 민감한 편",
+             "자극에 약한 피부", "쉽게 빨개지는 피부", "민감 피부", "예민 피부"],
+    "지성": ["지성", "지성 피부", "지성피부", "기름진 피부", "개기름 많은 피부", "얼굴이 번들거리는 편",
+           "지성 타입", "기름이 잘 도는 피부"],
+    "건성": ["건성", "건성 피부", "건성피부", "건조한 피부", "피부가 건조해서", "속당김 심한 피부",
+           "각질 많은 피부", "피부가 땡기는 편", "악건성", "푸석한 피부"],
+    "복합성": ["복합성", "복합성 피부", "복합성피부", "수부지", "T존만 번들거리고 볼은 건조한",
+             "티존은 기름지고 볼은 건조한", "부위마다 다른 피부"],
+    "아토피성": ["아토피", "아토피성", "아토피성 피부", "아토피 있는", "아토피 피부", "피부염 있는"],
+    "중성": ["중성", "중성 피부", "중성피부", "평범한 피부", "보통 피부", "특별한 문제 없는 피부"],
+}
+CONCERN_PHRASES: Dict[str, List[str]] = {
+    "보습": ["보습", "수분", "촉촉하게", "건조함", "속건조", "수분 충전", "당김", "보습력", "촉촉함", "수분감"],
+    "진정": ["진정", "붉은기", "홍조", "열감", "자극 완화", "울긋불긋", "쿨링", "붉어짐", "예민해진 피부 진정"],
+    "미백": ["미백", "톤업", "잡티", "기미", "칙칙함", "피부톤 개선", "브라이트닝", "맑은 피부톤", "색소침착"],
+    "주름/탄력": ["주름", "탄력", "잔주름", "처짐", "리프팅", "안티에이징", "노화", "팔자주름", "탄력 저하"],
+    "모공케어": ["모공", "넓은 모공", "블랙헤드", "모공 관리", "화이트헤드", "모공이 넓어서", "늘어진 모공"],
+    "피지조절": ["피지", "유분", "번들거림", "여드름", "트러블", "뾰루지", "기름기", "좁쌀", "유분 조절"],
+}
+CATEGORY_PHRASES: Dict[str, List[str]] = {
+    "스킨/토너": ["토너", "스킨", "토너패드", "닦토", "스킨토너", "화장수", "토너 패드"],
+    "로션/에멀전": ["로션", "에멀전", "에멀젼", "유액", "플루이드", "데일리 로션"],
+    "에센스/앰플/세럼": ["세럼", "앰플", "에센스", "부스터", "세럼이나 앰플"],
+    "크림": ["크림", "수분크림", "보습크림", "젤크림", "영양크림", "수딩크림", "아이크림", "진정크림"],
+    "밤/멀티밤": ["밤", "멀티밤", "스틱밤", "멀티 밤"],
+    "클렌징 폼": ["클렌징폼", "폼클렌징", "클렌저", "세안제", "폼클렌저", "클렌징", "세안폼"],
+    "시트마스크": ["마스크팩", "시트마스크", "팩", "시트팩", "마스크 시트"],
+    "선크림": ["선크림", "썬크림", "선블록", "자외선 차단제", "선스크린", "자차", "선로션", "선스틱"],
+}
+# 카테고리 표기에 고민이 들어 있는 경우 (LLM 파싱도 같은 고민을 채움)
+CATEGORY_IMPLIED = {"수분크림": "보습", "보습크림": "보습", "수딩크림": "진정", "진정크림": "진정"}
+
+_SKIN_FORMS = ["{}인데", "{}이라", "{}이고", "저는 {}이에요.", "{}", "제 피부는 {}", "{} 쓰기 좋은"]
+_CONCERN_FORMS = ["{} 고민이 있어서", "{}에 좋은", "{} 때문에", "{} 케어되는", "{} 신경 쓰여서", "{}"]
+_CONCERN_PAIR = ["{}랑 {} 둘 다 신경 쓰여서", "{}, {} 고민", "{}하고 {}에 좋은", "{} {}"]
+_CATEGORY_FORMS = ["{} 추천해줘", "{} 추천해 주세요", "{} 뭐가 좋아?", "{} 골라줘", "{} 찾고 있어요",
+                   "{} 알려줘", "{} 있을까요?", "쓸만한 {} 있어?", "{}", "{} 하나 사려고"]
+_BARE_REQUESTS = ["추천해줘", "뭐가 좋을까요?", "제품 골라줘", "뭐 쓰면 좋아?", "화장품 추천 부탁해요", ""]
+# 회귀 점검: 템플릿 밖 실제 표현 — 어느 칸도 '알 수 없음'으로 확정되면 안 됨(LLM이 판단할 몫)
+HARD_UTTERANCES = [
+    "얼굴에 뭐가 자꾸 나요 바를만한거", "좀 싼 거", "겨울에 쓸 거", "요즘 피부가 푸석푸석해",
+    "아기 피부에 쓸 로션", "화장이 자꾸 들떠요", "세안하고 나면 얼굴이 땡겨요 뭐 발라야 돼",
+    "코 주변이 까매요", "피부가 뒤집어졌어요", "임산부도 쓸 수 있는 거", "출근 전에 바르기 좋은 거",
+    "남자가 쓰기 좋은 올인원", "운동하고 나서 얼굴이 화끈거려",
+]
+_NO_SLOT = ["안녕", "고마워", "그냥 아무거나", "잘 모르겠어", "음 글쎄요", "다시 해볼게", "오늘 날씨 어때",
+            "처음이라 잘 몰라요", "네", "아니요"]
+
+
+def synthesize(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """템플릿 조합 발화 n개 (각 칸을 확률적으로 생략 → '알 수 없음' 예시 포함)."""
+    rng = random.Random(seed)
+    out: List[Dict[str, Any]] = []
+    for _ in range(n):
+        if rng.random() < 0.04:
+            out.append({"text": rng.choice(_NO_SLOT), "skin_type": UNKNOWN, "concerns": [], "category": UNKNOWN})
+            continue
+        parts, skin, concerns, category = [], UNKNOWN, [], UNKNOWN
+        if rng.random() < 0.65:
+            skin = rng.choice(list(SKIN_PHRASES))
+            parts.append(rng.choice(_SKIN_FORMS).format(rng.choice(SKIN_PHRASES[skin])))
+        k = rng.choices([0, 1, 2], weights=[0.3, 0.5, 0.2])[0]
+        if k:
+            concerns = rng.sample(list(CONCERN_PHRASES), k)
+            surfaces = [rng.choice(CONCERN_PHRASES[c]) for c in concerns]
+            form = rng.choice(_CONCERN_FORMS) if k == 1 else rng.choice(_CONCERN_PAIR)
+            parts.append(form.format(*surfaces))
+        if rng.random() < 0.7:
+            category = rng.choice(list(CATEGORY_PHRASES))
+            surface = rng.choice(CATEGORY_PHRASES[category])
+            if surface in CATEGORY_IMPLIED and CATEGORY_IMPLIED[surface] not in concerns:
+                concerns.append(CATEGORY_IMPLIED[surface])
+            parts.append(rng.choice(_CATEGORY_FORMS).format(surface))
+        else:
+            parts.append(rng.choice(_BARE_REQUESTS))
+        if len(parts) > 2 and rng.random() < 0.2:
+            rng.shuffle(parts)
+        out.append({"text": " ".join(p for p in parts if p), "skin_type": skin,
+                    "concerns": concerns, "category": category})
+    return out
+
+def read_logs(paths: List[str]) -> List[Dict[str, Any]]:
+    """LLM 파싱 로그(JSONL: text/skin_type/concerns/category). 라벨 밖 값은 '알 수 없음'/제외."""
+    out: List[Dict[str, Any]] = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    r = json.loads(line)
+                except ValueError:
+                    continue
+                if not r.get("text"):
+                    continue
+                concerns = r.get("concerns") or []
+                out.append({
+                    "text": r["text"],
+                    "skin_type": r.get("skin_type") if r.get("skin_type") in SKIN_LABELS else UNKNOWN,
+                    "concerns": [c for c in concerns if c in CONCERN_LABELS],
+                    "category": r.get("category") if r.get("category") in CATEGORY_LABELS else UNKNOWN,
+                })
+    return out
+
+def log_utterance(path, text: str, selections: Dict[str, Any]) -> None:
+    """LLM이 파싱한 발화를 학습용 JSONL에 추가 (재학습 시 --logs로 사용)."""
+    row = {"text": text, "skin_type": selections.get("skin_type"),
+           "concerns": selections.get("concerns") or [], "category": selections.get("category")}
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    except OSError as e:
+        logger.warning("slot log write failed (%s): %s", path, e)
+
+
+# =========================
+# 특징 (해싱 음절 n-gram)
+# =========================
+_GRAM_HASH: Dict[str, int] = {}   # n-gram → crc32 (음절 n-gram 종류가 유한해 금방 포화)
+MAX_GRAM_HASH = 500_000
+
+def _gram_hash(g: str) -> int:
+    h = _GRAM_HASH.get(g)
+    if h is None:
+        if len(_GRAM_HASH) >= MAX_GRAM_HASH:
+            _GRAM_HASH.clear()
+        h = _GRAM_HASH[g] = zlib.crc32(g.encode("utf-8"))
+    return h
+
+def _grams(text: str) -> List[str]:
+    s = re.sub(r"[^\w\s/]", " ", str(text or "").lower())
+    s = " " + re.sub(r"\s+", " ", s).strip() + " "
+    return [s[i:i + n] for n in NGRAMS for i in range(len(s) - n + 1)]
+
+def vocab_hashes(text: str) -> np.ndarray:
+    """어휘 포함률 계산용: 공백만이 아닌 2~3-gram의 crc32 (해시 차원으로 접지 않아 충돌 없음)."""
+    return np.unique(np.fromiter((_gram_hash(g) for g in _grams(text) if len(g) > 1 and g.strip()),
+                                 dtype=np.uint32))
+
+def featurize(text: str, dim: int = DIM) -> Tuple[np.ndarray, np.ndarray]:
+    """(해시 인덱스, 가중치) — 같은 인덱스는 합쳐서 log TF 후 L2 정규화."""
+    grams = _grams(text)
+    idx = np.fromiter(map(_gram_hash, grams), dtype=np.int64, count=len(grams)) % dim
+    idx, counts = np.unique(idx, return_counts=True)
+    val = np.log1p(counts.astype(np.float32))
+    return idx, val / np.linalg.norm(val)
+
+
+# =========================
+# 모델
+# =========================
+class SlotClassifier:
+    def __init__(self, W: np.ndarray, b: np.ndarray, skin_labels: List[str] = SKIN_LABELS,
+                 concern_labels: List[str] = CONCERN_LABELS, category_labels: List[str] = CATEGORY_LABELS,
+                 seen: Optional[np.ndarray] = None):
+        self.W = W
+        self.b = b
+        self.seen = np.sort(np.asarray(seen if seen is not None else [], dtype=np.uint32))  # 학습 어휘 해시
+        self.skin_labels = list(skin_labels)
+        self.concern_labels = list(concern_labels)
+        self.category_labels = list(category_labels)
+        ns, nc = len(self.skin_labels), len(self.concern_labels)
+        self._skin = slice(0, ns)
+        self._concern = slice(ns, ns + nc)
+        self._category = slice(ns + nc, W.shape[1])
+
+    def _logits(self, text: str) -> np.ndarray:
+        idx, val = featurize(text, self.W.shape[0])
+        return val @ self.W[idx] + self.b
+
+    def predict(self, text: str) -> Dict[str, Any]:
+        """
+        {"skin_type", "concerns", "category", "confidence": {칸: 0~1}, "coverage": 0~1}
+        concerns는 빈 리스트면 '알 수 없음'으로 돌려줌(_rule_based_parse와 같은 모양).
+        coverage: 입력 2~3-gram 중 학습 어휘에 있는 비율.
+        """
+        z = self._logits(text)
+        skin_p = _softmax(z[self._skin])
+        cat_p = _softmax(z[self._category])
+        con_p = 1.0 / (1.0 + np.exp(-z[self._concern]))
+        concerns = [c for c, p in zip(self.concern_labels, con_p) if p >= 0.5]
+        return {
+            "skin_type": self.skin_labels[int(skin_p.argmax())],
+            "concerns": concerns or [UNKNOWN],
+            "category": self.category_labels[int(cat_p.argmax())],
+            "confidence": {
+                "skin_type": float(skin_p.max()),
+                "concerns": float(np.maximum(con_p, 1.0 - con_p).min()),
+                "category": float(cat_p.max()),
+            },
+            "coverage": self.coverage(text),
+        }
+
+    def coverage(self, text: str) -> float:
+        h = vocab_hashes(text)
+        if not len(h) or not len(self.seen):
+            return 0.0
+        pos = np.minimum(np.searchsorted(self.seen, h), len(self.seen) - 1)
+        return float((self.seen[pos] == h).mean())
+
+    def save(self, path=MODEL_PATH) -> Path:
+        path = Path(path)
+        tmp = path.with_name(path.stem + ".tmp.npz")
+        np.savez_compressed(tmp, W=self.W.astype(np.float16), b=self.b,
+                            skin=np.array(self.skin_labels), concern=np.array(self.concern_labels),
+                            category=np.array(self.category_labels), seen=self.seen)
+        tmp.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path=MODEL_PATH) -> "SlotClassifier":
+        with np.load(path) as z:
+            return cls(z["W"].astype(np.float32), z["b"], [str(x) for x in z["skin"]],
+                       [str(x) for x in z["concern"]], [str(x) for x in z["category"]],
+                       z["seen"] if "seen" in z.files else None)
+
+def confident_slots(pred: Dict[str, Any], keys, threshold: float = CONFIDENCE_THRESHOLD) -> Dict[str, Any]:
+    """
+    확정해도 되는 칸만 {칸: 값}. 신뢰도 ≥ threshold,
+    '알 수 없음'은 추가로 어휘 포함률 ≥ MIN_UNKNOWN_COVERAGE일 때만 (낯선 표현은 LLM이 판단).
+    """
+    out: Dict[str, Any] = {}
+    for k in keys:
+        if pred["confidence"][k] < threshold:
+            continue
+        if pred[k] in (UNKNOWN, [UNKNOWN]) and pred["coverage"] < MIN_UNKNOWN_COVERAGE:
+            continue
+        out[k] = pred[k]
+    return out
+
+def check_hard_utterances(model: "SlotClassifier", threshold: float = CONFIDENCE_THRESHOLD) -> List[str]:
+    """HARD_UTTERANCES 중 '알 수 없음'이 확정된 발화 (비어 있어야 통과)."""
+    keys = ("skin_type", "concerns", "category")
+    return [t for t in HARD_UTTERANCES
+            if any(v in (UNKNOWN, [UNKNOWN]) for v in confident_slots(model.predict(t), keys, threshold).values())]
+
+def _softmax(z: np.ndarray) -> np.ndarray:
+    e = np.exp(z - z.max())
+    return e / e.sum()
+
+
+# =========================
+# 학습 (numpy 미니배치 Adam, 희소 입력)
+# =========================
+def _targets(rows: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    skin = np.array([SKIN_LABELS.index(r["skin_type"]) for r in rows])
+    cat = np.array([CATEGORY_LABELS.index(r["category"]) for r in rows])
+    con = np.array([[c in r["concerns"] for c in CONCERN_LABELS] for r in rows], dtype=np.float32)
+    return skin, con, cat
+
+def train(rows: List[Dict[str, Any]], epochs: int = 12, batch_size: int = 128, lr: float = 0.05,
+          l2: float = 1e-6, dim: int = DIM, seed: int = 0) -> SlotClassifier:
+    feats = [featurize(r["text"], dim) for r in rows]
+    skin_y, con_y, cat_y = _targets(rows)
+    ns, nc, nk = len(SKIN_LABELS), len(CONCERN_LABELS), len(CATEGORY_LABELS)
+    W = np.zeros((dim, ns + nc + nk), dtype=np.float32)
+    b = np.zeros(ns + nc + nk, dtype=np.float32)
+    mW, vW = np.zeros_like(W), np.zeros_like(W)
+    mb, vb = np.zeros_like(b), np.zeros_like(b)
+    beta1, beta2, eps, step = 0.9, 0.999, 1e-8, 0
+    rng = np.random.default_rng(seed)
+
+    for _ in range(epochs):
+        order = rng.permutation(len(rows))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            idx = np.concatenate([feats[i][0] for i in batch])
+            val = np.concatenate([feats[i][1] for i in batch])
+            lens = np.array([len(feats[i][0]) for i in batch])
+            row = np.repeat(np.arange(len(batch)), lens)
+
+            # 순전파: 행별 Σ val · W[idx] (행이 연속 구간이라 reduceat)
+            Z = np.add.reduceat(val[:, None] * W[idx], np.concatenate(([0], np.cumsum(lens)[:-1]))) + b
+
+            # 손실 기울기: softmax CE(피부/카테고리) + sigmoid BCE(고민)
+            G = np.empty_like(Z)
+            for sl, y in ((slice(0, ns), skin_y[batch]), (slice(ns + nc, ns + nc + nk), cat_y[batch])):
+                P = np.exp(Z[:, sl] - Z[:, sl].max(axis=1, keepdims=True))
+                P /= P.sum(axis=1, keepdims=True)
+                P[np.arange(len(batch)), y] -= 1.0
+                G[:, sl] = P
+            G[:, ns:ns + nc] = 1.0 / (1.0 + np.exp(-Z[:, ns:ns + nc])) - con_y[batch]
+            G /= len(batch)
+
+            # 역전파: 배치에 나온 해시 행만 갱신 (lazy Adam — 전체 W를 매 스텝 건드리지 않음)
+            touched, inv, counts = np.unique(idx, return_inverse=True, return_counts=True)
+            by_row = np.argsort(inv, kind="stable")
+            contrib = val[by_row, None] * G[row[by_row]]
+            gW = np.add.reduceat(contrib, np.concatenate(([0], np.cumsum(counts)[:-1])))
+            gW += l2 * W[touched]
+            gb = G.sum(axis=0)
+
+            step += 1
+            c1, c2 = 1 - beta1 ** step, 1 - beta2 ** step
+            m = mW[touched] * beta1 + (1 - beta1) * gW
+            v = vW[touched] * beta2 + (1 - beta2) * gW * gW
+            mW[touched], vW[touched] = m, v
+            W[touched] -= lr * (m / c1) / (np.sqrt(v / c2) + eps)
+            mb[:] = mb * beta1 + (1 - beta1) * gb
+            vb[:] = vb * beta2 + (1 - beta2) * gb * gb
+            b -= lr * (mb / c1) / (np.sqrt(vb / c2) + eps)
+    seen = np.unique(np.concatenate([vocab_hashes(r["text"]) for r in rows]))
+    return SlotClassifier(W, b, seen=seen)
+
+def evaluate(model: SlotClassifier, rows: List[Dict[str, Any]],
+             threshold: float = CONFIDENCE_THRESHOLD) -> Dict[str, float]:
+    """칸별 정확도, 임계값 이상으로 확정된 칸의 정확도, LLM 위임률, 예측 지연."""
+    n = len(rows)
+    correct = {"skin_type": 0, "concerns": 0, "category": 0}
+    sure, sure_correct, escalated = 0, 0, 0
+    t0 = time.perf_counter()
+    for r in rows:
+        pred = model.predict(r["text"])
+        gold = {"skin_type": r["skin_type"], "concerns": sorted(r["concerns"]) or [UNKNOWN], "category": r["category"]}
+        any_unsure = False
+        sure_slots = confident_slots(pred, correct, threshold)
+        for k in correct:
+            ok = (sorted(pred[k]) if k == "concerns" else pred[k]) == gold[k]
+            correct[k] += ok
+            if k in sure_slots:
+                sure += 1
+                sure_correct += ok
+            else:
+                any_unsure = True
+        escalated += any_unsure
+    elapsed = time.perf_counter() - t0
+    return {
+        **{f"acc_{k}": round(v / n, 4) for k, v in correct.items()},
+        "acc_confident": round(sure_correct / sure, 4) if sure else 0.0,
+        "escalation_rate": round(escalated / n, 4),
+        "predict_us": round(elapsed / n * 1e6, 1),
+    }
+
+
+# =========================
+# 로딩 (프로세스 단위 메모이즈)
+# =========================
+_MODEL: Dict[str, Tuple[float, SlotClassifier]] = {}
+_MODEL_LOCK = threading.Lock()
+_TRAINING: Dict[str, threading.Thread] = {}
+
+def _train_in_background(key: str) -> None:
+    t0 = time.perf_counter()
+    try:
+        model = train(synthesize(6000))
+    except Exception as e:
+        logger.warning("slot model background training failed: %s", e)
+        return
+    with _MODEL_LOCK:
+        _MODEL[key] = (0.0, model)
+    logger.info("slot model trained in background (%.2fs); run slot_classifier.py to persist",
+                time.perf_counter() - t0)
+
+def load_slot_model(path=MODEL_PATH) -> Optional[SlotClassifier]:
+    """
+    저장된 모델(mtime 기준 재로딩). 파일이 없으면 백그라운드 학습을 한 번 시작하고
+    끝날 때까지 None — 요청 경로(턴 시간 예산)에서 학습하지 않음. None이면 호출부는 LLM 폴백.
+    """
+    path = Path(path)
+    stamp = path.stat().st_mtime if path.exists() else 0.0
+    key = str(path)
+    with _MODEL_LOCK:
+        cached = _MODEL.get(key)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        if not stamp:
+            if key not in _TRAINING:
+                _TRAINING[key] = threading.Thread(target=_train_in_background, args=(key,),
+                                                  name="slot-model-train", daemon=True)
+                _TRAINING[key].start()
+            return None
+        try:
+            model = SlotClassifier.load(path)
+        except Exception as e:
+            logger.warning("slot model unavailable (%s): %s", path, e)
+            return None
+        _MODEL[key] = (stamp, model)
+        return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="발화 슬롯(피부/고민/카테고리) 분류기 학습")
+    parser.add_argument("--synthetic", type=int, default=6000, help="합성 발화 수")
+    parser.add_argument("--logs", action="append", default=[], help="LLM 파싱 로그 JSONL (여러 번 지정 가능)")
+    parser.add_argument("--epochs", type=int, default=12)
+    parser.add_argument("--threshold", type=float, default=CONFIDENCE_THRESHOLD)
+    parser.add_argument("--out", default=str(MODEL_PATH))
+    parser.add_argument("--force", action="store_true", help="회귀 점검 실패해도 저장")
+    args = parser.parse_args()
+
+    rows = synthesize(args.synthetic) + read_logs(args.logs)
+    random.Random(1).shuffle(rows)
+    cut = int(len(rows) * 0.9)
+    t0 = time.perf_counter()
+    model = train(rows[:cut], epochs=args.epochs)
+    print(f"학습 {cut}건, {time.perf_counter() - t0:.1f}s")
+    print(f"검증 {len(rows) - cut}건: {evaluate(model, rows[cut:], args.threshold)}")
+    held_out = synthesize(1000, seed=99)
+    print(f"새 합성 발화 1000건: {evaluate(model, held_out, args.threshold)}")
+    failed = check_hard_utterances(model, args.threshold)
+    print(f"템플릿 밖 발화 {len(HARD_UTTERANCES)}건 중 '알 수 없음' 확정: {len(failed)}건 {failed}")
+    if failed and not args.force:
+        raise SystemExit("❌ 회귀 점검 실패 — 저장하지 않음 (--force로 강제 저장)")
+    print(f"✅ 저장: {model.save(args.out)}")
@@ -1,10 +1,16 @@
 # state.py
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from typing_extensions import Annotated, TypedDict
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
 
+def merge_routine_parts(left: Optional[List[Dict[str, Any]]], right: Optional[List[Dict[str, Any]]]):
+    """기초 라인 분기 결과 누적. None을 받으면 초기화(새 루틴 시작)."""
+    if right is None:
+        return []
+    return (left or []) + right
+
 class GraphState(TypedDict, total=False):
     messages: Annotated[List[BaseMessage], add_messages]
     user_selections: Dict[str, Any]
@@ -15,3 +21,19 @@ class GraphState(TypedDict, total=False):
     __reset__: bool
     # ✅ 후속 질의(“토너도/선크림도/기초”)를 전달하기 위한 상태 필드
     multi_categories: List[str]
+    # 추천 결과 출처: "cache" | "miss" | "ranking" | "retrieval" (ranking 결과만 결과 캐시에 저장)
+    result_source: str
+    # 턴 시간 예산: 마감 시각(epoch 초)과 예산 초과로 로컬 폴백된 단계 목록
+    deadline: float
+    degraded_steps: List[str]
+    # 직전 턴 확정 조건(후속 질문/add 모드 기준)과 카테고리 전환 방식("add" | "switch")
+    last_confirmed_selections: Dict[str, Any]
+    prefs: Dict[str, Any]
+    category_mode: str
+    # 기초 라인 병렬 분기(routine_branch) 결과 — 분기들이 동시에 쓰므로 리듀서로 합침
+    routine_parts: Annotated[List[Dict[str, Any]], merge_routine_parts]
+    # 카테고리별 후보 제품(카탈로그 행 번호) — filter_candidates가 get_ingredients와 병렬로 계산
+    candidates: Dict[str, List[int]]
+    # 오프라인(LLM/웹 0회) 모드: offline=요청별 스위치, llm_mode="online"|"offline"(턴 시작 때 결정)
+    offline: bool
+    llm_mode: str
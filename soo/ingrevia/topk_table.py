@@ -0,0 +1,141 @@
+# topk_table.py
+"""
+(피부 타입 × 고민 조합 × 카테고리) 전 조합의 상위 제품을 미리 계산해 둔 조회 테이블.
+
+- 입력 공간이 작음: 피부 7(알 수 없음 포함) × 고민 조합(0~2개) × 카테고리 9(알 수 없음=전 카테고리)
+- 조합마다 핵심 성분(get_ingredients)과 랭킹 결과(카탈로그 행 번호 + 매칭 성분 + 유해성 점수)를 저장
+- 서빙 시 get_ingredients / find_products는 O(1) 조회, 테이블에 없는 조합만 실시간 계산
+- 카탈로그 버전이 다르면(데이터 갱신) 테이블을 쓰지 않음
+
+사용 예:
+    python topk_table.py                  # product_data.topk.json 생성 (조합당 LLM 1회: 피부×고민 단위)
+    python topk_table.py --max-concerns 3
+"""
+import json
+import time
+import argparse
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from catalog import load_catalog
+
+UNKNOWN = "알 수 없음"
+Ranked = List[Tuple[int, List[str], float]]
+
+
+def table_path_for(csv_path) -> Path:
+    p = Path(csv_path)
+    return p.with_name(p.stem + ".topk.json")
+
+def _norm(v: Optional[str]) -> str:
+    return v if v else UNKNOWN
+
+def profile_key(skin_type: Optional[str], concerns: Optional[List[str]]) -> str:
+    cs = sorted({c for c in (concerns or []) if c and c != UNKNOWN})
+    return f"{_norm(skin_type)}|{','.join(cs)}"
+
+def entry_key(selections: Dict[str, Any]) -> str:
+    return profile_key(selections.get("skin_type"), selections.get("concerns")) + "|" + _norm(selections.get("category"))
+
+
+# =========================
+# 조회
+# =========================
+class TopKTable:
+    def __init__(self, data: Dict[str, Any]):
+        self.catalog_version: str = data.get("catalog_version", "")
+        self.profiles: Dict[str, List[str]] = data.get("profiles", {})
+        self.entries: Dict[str, Ranked] = {
+            k: [(int(p), list(f), float(h)) for p, f, h in v] for k, v in data.get("entries", {}).items()
+        }
+
+    def key_ingredients(self, selections: Dict[str, Any]) -> Optional[List[str]]:
+        return self.profiles.get(profile_key(selections.get("skin_type"), selections.get("concerns")))
+
+    def ranked(self, selections: Dict[str, Any], key_ingredients: List[str]) -> Optional[Ranked]:
+        """저장된 핵심 성분과 같을 때만 결과를 돌려줌(다르면 None → 실시간 랭킹)."""
+        if self.key_ingredients(selections) != list(key_ingredients or []):
+            return None
+        return self.entries.get(entry_key(selections))
+
+
+_TABLES: Dict[str, Tuple[Tuple[float, str], Optional[TopKTable]]] = {}
+
+def load_topk_table(csv_path) -> Optional[TopKTable]:
+    """테이블 파일이 없거나 카탈로그 버전이 다르면 None. 파일 mtime 기준으로 재적재."""
+    path = table_path_for(csv_path)
+    try:
+        stamp = (path.stat().st_mtime, load_catalog(csv_path).version)
+    except (FileNotFoundError, OSError):
+        return None
+    cached = _TABLES.get(str(path))
+    if cached and cached[0] == stamp:
+        return cached[1]
+    table = TopKTable(json.loads(path.read_text(encoding="utf-8")))
+    if table.catalog_version != stamp[1]:
+        table = None
+    _TABLES[str(path)] = (stamp, table)
+    return table
+
+
+# =========================
+# 오프라인 생성
+# =========================
+def concern_sets(concerns: List[str], max_concerns: int = 2) -> List[Tuple[str, ...]]:
+    out: List[Tuple[str, ...]] = [()]
+    for n in range(1, max_concerns + 1):
+        out.extend(combinations(sorted(concerns), n))
+    return out
+
+def materialize(csv_path, skin_types: List[str], concerns: List[str], categories: List[str],
+                key_ingredients_fn: Callable[[Dict[str, Any]], List[str]],
+                rank_fn: Callable[[Dict[str, Any], List[str]], Ranked],
+                max_concerns: int = 2, out_path: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    전 조합을 순회하며 테이블 생성.
+    - key_ingredients_fn: 피부×고민 단위로 1회 호출(카테고리와 무관)
+    - rank_fn: 조합별 랭킹 (nodes._rank_live)
+    """
+    catalog = load_catalog(csv_path)
+    profiles: Dict[str, List[str]] = {}
+    entries: Dict[str, Ranked] = {}
+    for skin in [UNKNOWN] + list(skin_types):
+        for cs in concern_sets(concerns, max_concerns):
+            sel = {"skin_type": skin, "concerns": list(cs) or [UNKNOWN]}
+            if skin == UNKNOWN and not cs:
+                continue  # check_parsing_status에서 되묻는 조합
+            key_ings = list(key_ingredients_fn(sel))
+            profiles[profile_key(skin, list(cs))] = key_ings
+            for cat in [UNKNOWN] + list(categories):
+                full = {**sel, "category": cat}
+                entries[entry_key(full)] = rank_fn(full, key_ings)
+
+    data = {
+        "catalog_version": catalog.version,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "profiles": profiles,
+        "entries": entries,
+    }
+    out_path = Path(out_path or table_path_for(csv_path))
+    tmp = out_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(out_path)
+    return {"path": str(out_path), "profiles": len(profiles), "entries": len(entries)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="조합별 상위 제품 테이블 생성")
+    parser.add_argument("--max-concerns", type=int, default=2)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    import nodes
+    concerns = sorted((nodes.CONCERNS - {"주름", "탄력"}) | set(nodes.CONCERN_SYNONYMS.values()))
+    stats = materialize(
+        nodes.DATA_PATH, sorted(nodes.SKIN_TYPES), concerns, nodes.ALL_CATEGORIES,
+        key_ingredients_fn=nodes._llm_key_ingredients,
+        rank_fn=nodes._rank_live,
+        max_concerns=args.max_concerns, out_path=args.out,
+    )
+    print(f"✅ 조합 테이블 생성: {stats}")
@@ -1,5 +1,7 @@
-import pandas as pd
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
+
+from catalog import load_catalog
+from ingredient_canon import load_canon
 
 # 카테고리 정규화(데이터와 사용자 입력을 같은 축으로 맞춤)
 def _normalize_category(cat: str) -> str:
@@ -26,20 +28,20 @@ def _normalize_category(cat: str) -> str:
         return "크림"
     return "알 수 없음"
 
-def find_and_rank_products(filepath, user_selections, key_ingredients):
-    """CSV에서 조건/성분 기준으로 제품을 필터링하고 상위 3개를 점수화해 반환."""
-    skin_type = user_selections.get("skin_type") or ""
+def filter_candidate_positions(filepath, user_selections) -> List[int]:
+    """카테고리(정확 일치) + 고민(모두 포함) 조건을 만족하는 제품의 카탈로그 행 번호. 핵심 성분과 무관."""
     concerns = user_selections.get("concerns", []) or []
     category_in = (user_selections.get("category") or "").strip()
 
     try:
-        df = pd.read_csv(filepath)
+        # 컬럼형 바이너리 카탈로그(없거나 오래됐으면 CSV) — 카테고리_norm은 빌드 시 미리 계산됨
+        catalog = load_catalog(filepath)
+        df = catalog.to_frame()
     except FileNotFoundError:
         print(f"❌ '{filepath}' 파일을 찾을 수 없습니다.")
         return []
 
-    # 1) 데이터 카테고리 정규화 컬럼 생성
-    df["카테고리_norm"] = df["카테고리"].fillna("").astype(str).map(_normalize_category)
+    # 1) 데이터 카테고리 정규화 컬럼은 카탈로그에 포함
 
     # 2) 사용자 카테고리도 정규화 후 **정확 일치**로 필터
     category_norm = _normalize_category(category_in)
@@ -50,29 +52,50 @@ def find_and_rank_products(filepath, user_selections, key_ingredients):
         if c and c != "알 수 없음":
             filtered = filtered[filtered["효능"].fillna("").astype(str).str.contains(c, na=False)]
 
-    if filtered.empty:
+    return [int(pos) for pos in filtered.index]
+
+def score_positions(filepath, positions: List[int], key_ingredients) -> List[Tuple[int, List[str], float]]:
+    """후보 행 번호를 점수화해 상위 3개의 (행 번호, 매칭 성분, 유해성 점수) 반환."""
+    if not positions:
         return []
+    catalog = load_catalog(filepath)
 
     # 점수 계산: 매칭된 핵심성분 개수(내림차순) → 유해성_점수(오름차순)
-    scored: List[Dict[str, Any]] = []
+    scored: List[Tuple[int, List[str], float]] = []
     key_lw = [str(k).lower() for k in key_ingredients if k]
-    for _, row in filtered.iterrows():
-        ingredients = str(row.get("전성분", "")).lower()
-        found = [k for k in key_lw if k and k in ingredients]
-        try:
-            harm = float(row.get("유해성_점수", 999))
-        except (TypeError, ValueError):
-            harm = 999.0
-        scored.append({
-            "brand": row.get("브랜드명"),
-            "name": row.get("제품명"),
-            "price": row.get("가격"),
-            "volume": row.get("용량"),
-            "link": row.get("링크"),
-            "match_count": len(found),
-            "harmfulness_score": harm,
-            "found_ingredients": found,
-        })
+    # 핵심성분 → 성분 id 집합(부분일치 + 동의어/성분군) → 제품별 포함 여부를 정수 배열 연산으로 한 번에 계산
+    canon = load_canon(filepath)
+    hits = {k: catalog.matrix.contains_any(canon.match_ids(k)) for k in dict.fromkeys(key_lw)}
+    for pos in positions:
+        found = [k for k in key_lw if k and hits[k][pos]]
+        scored.append((int(pos), found, float(catalog.harm[pos])))
 
-    scored.sort(key=lambda p: (-p["match_count"], p["harmfulness_score"]))
+    scored.sort(key=lambda r: (-len(r[1]), r[2]))
     return scored[:3]
+
+def rank_product_positions(filepath, user_selections, key_ingredients) -> List[Tuple[int, List[str], float]]:
+    """조건/성분 기준 상위 3개 제품의 (카탈로그 행 번호, 매칭 성분, 유해성 점수)."""
+    return score_positions(filepath, filter_candidate_positions(filepath, user_selections), key_ingredients)
+
+def product_record(filepath, pos: int, found: List[str], harm: float) -> Dict[str, Any]:
+    """카탈로그 행 번호 → 추천 카드용 제품 dict."""
+    df = load_catalog(filepath).to_frame()
+
+    def col(c):
+        v = df.at[pos, c] if c in df.columns else None
+        return v.item() if hasattr(v, "item") else v  # numpy 스칼라 → 파이썬 값
+    return {
+        "brand": col("브랜드명"),
+        "name": col("제품명"),
+        "price": col("가격"),
+        "volume": col("용량"),
+        "link": col("링크"),
+        "match_count": len(found),
+        "harmfulness_score": harm,
+        "found_ingredients": list(found),
+    }
+
+def find_and_rank_products(filepath, user_selections, key_ingredients):
+    """CSV에서 조건/성분 기준으로 제품을 필터링하고 상위 3개를 점수화해 반환."""
+    return [product_record(filepath, pos, found, harm)
+            for pos, found, harm in rank_product_positions(filepath, user_selections, key_ingredients)]
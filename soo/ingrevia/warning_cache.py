@@ -0,0 +1,104 @@
+# warning_cache.py
+"""
+성분 단위 주의 판정 캐시 (안전성 KB 밖 성분의 웹+LLM 결과).
+
+- 키: 정규 성분명(ingredient_canon 정규화) → 제품이 달라도 같은 성분이면 재사용
+  (성분 5개 중 4개가 겹치는 두 제품 → 두 번째 제품은 새 성분 1개만 조회)
+- 값: SafetyFact. 경고 없음(risk == "")도 저장해 같은 성분을 다시 묻지 않음
+- TTL이 긺(성분 안전성은 거의 바뀌지 않음): 경고 30일, 경고 없음 7일
+- 파일(<csv이름>.warnings.json)에 저장 → 재시작 후에도 유지
+- 순서/[조건부] 규칙은 캐시에 넣지 않고 조립 시(SafetyKB.compose) 로컬 적용
+"""
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from safety_kb import SafetyFact
+
+logger = logging.getLogger("ingrevia.warning_cache")
+
+WARN_TTL = 30 * 86400.0
+CLEAR_TTL = 7 * 86400.0
+
+
+def cache_path_for(csv_path) -> Path:
+    p = Path(csv_path)
+    return p.with_name(p.stem + ".warnings.json")
+
+
+class IngredientWarningCache:
+    def __init__(self, path: Optional[Path] = None, warn_ttl: float = WARN_TTL,
+                 clear_ttl: float = CLEAR_TTL, max_entries: int = 20000):
+        self.path = Path(path) if path else None
+        self.warn_ttl = warn_ttl
+        self.clear_ttl = clear_ttl
+        self.max_entries = max_entries
+        self._data: Dict[str, Tuple[float, SafetyFact]] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.counters = {"lookups": 0, "hits": 0, "misses": 0, "stored": 0}
+        self._load()
+
+    def _ttl(self, fact: SafetyFact) -> float:
+        return self.warn_ttl if fact.risk else self.clear_ttl
+
+    def get(self, key: str) -> Optional[SafetyFact]:
+        now = time.time()
+        with self._lock:
+            self.counters["lookups"] += 1
+            item = self._data.get(key)
+            if item is None or now - item[0] > self._ttl(item[1]):
+                if item is not None:
+                    del self._data[key]
+                self.counters["misses"] += 1
+                return None
+            self.counters["hits"] += 1
+            return item[1]
+
+    def put_many(self, facts: Dict[str, SafetyFact]) -> None:
+        """판정 결과 저장 후 파일에 한 번 기록."""
+        if not facts:
+            return
+        now = time.time()
+        with self._lock:
+            for key, fact in facts.items():
+                self._data[key] = (now, fact)
+            self.counters["stored"] += len(facts)
+            if len(self._data) > self.max_entries:
+                for key, _ in sorted(self._data.items(), key=lambda kv: kv[1][0])[:len(self._data) - self.max_entries]:
+                    del self._data[key]
+        # 스냅샷과 기록을 같은 잠금 안에서 → 나중에 기록되는 쪽이 항상 더 최신 (동시 호출 시 항목 유실 없음)
+        with self._save_lock:
+            with self._lock:
+                snapshot = dict(self._data)
+            self._save(snapshot)
+
+    def hit_rate(self) -> float:
+        return self.counters["hits"] / self.counters["lookups"] if self.counters["lookups"] else 0.0
+
+    # -------------------------
+    # 파일 저장/로딩
+    # -------------------------
+    def _load(self) -> None:
+        if not self.path or not self.path.exists():
+            return
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+            self._data = {k: (float(ts), SafetyFact(grade, risk, kind, reason))
+                          for k, (ts, grade, risk, kind, reason) in raw.items()}
+        except (ValueError, TypeError) as e:
+            logger.warning("warning cache load failed (%s): %s", self.path, e)
+
+    def _save(self, data: Dict[str, Tuple[float, SafetyFact]]) -> None:
+        if not self.path:
+            return
+        payload = {k: [ts, f.grade, f.risk, f.kind, f.reason] for k, (ts, f) in data.items()}
+        try:
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(self.path)
+        except OSError as e:
+            logger.warning("warning cache save failed (%s): %s", self.path, e)